@@ -1,23 +1,39 @@
+import multiprocessing
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from concurrent.futures.process import ProcessPoolExecutor
 from contextlib import asynccontextmanager
 from loguru import logger
 
 from settings import settings
 from api.routers import routers
+from modules.parser.v1.libreoffice import libreoffice_pool
+from modules.parser.v1.middleware import UploadLimitMiddleware
+from modules.parser.v1.worker import init_worker, ping
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize shared resources for request handling and background tasks."""
     logger.info("Запуск сервиса document-parser")
-    app.state.executor = ProcessPoolExecutor(max_workers=settings.PARSER_WORKERS)
+    app.state.warm_workers = multiprocessing.Value("i", 0)
+    app.state.failed_workers = multiprocessing.Value("i", 0)
+    app.state.executor = ProcessPoolExecutor(
+        max_workers=settings.PARSER_WORKERS,
+        initializer=init_worker,
+        initargs=(app.state.warm_workers, app.state.failed_workers, settings.PARSER_WARMUP),
+    )
+    # Поднимаем все воркеры сразу, чтобы прогрев шёл до первого запроса.
+    for _ in range(settings.PARSER_WORKERS):
+        app.state.executor.submit(ping)
+    await libreoffice_pool.start()
     yield
     logger.info("Остановка сервиса document-parser")
+    await libreoffice_pool.stop()
     app.state.executor.shutdown()
 
 app = FastAPI(
@@ -87,6 +103,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(UploadLimitMiddleware)
     
 for router in routers:
     app.include_router(router)
@@ -104,6 +121,21 @@ async def health_check():
         'status': "Ok",
     }
 
+@app.get('/ready', tags=['System'])
+async def readiness_check(request: Request):
+    warm_workers = request.app.state.warm_workers.value
+    failed_workers = request.app.state.failed_workers.value
+    body = {
+        'warm_workers': warm_workers,
+        'failed_workers': failed_workers,
+        'workers': settings.PARSER_WORKERS,
+    }
+    if failed_workers:
+        return JSONResponse(status_code=503, content={'status': "Warmup failed", **body})
+    if warm_workers < settings.PARSER_WORKERS:
+        return JSONResponse(status_code=503, content={'status': "Warming up", **body})
+    return {'status': "Ok", **body}
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
@@ -1,23 +1,28 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import Optional
 from PIL.Image import Image
-import re
 import unicodedata
 
 import chardet
-import ftfy
 from loguru import logger
 from docling.document_converter import DocumentConverter
 from docling_core.types.doc import (
-    ImageRefMode
+    ImageRefMode, DoclingDocument
 )
 
 from settings import settings
+from modules.parser.v1 import normalization
+from modules.parser.v1.exporters import DocumentExporter
 from modules.parser.v1.schemas import ParserParams, ParserMods
 
 
 
 class ParserABC(ABC):
+    # Результат парсера — `DoclingDocument`, который можно положить в `DocumentCache`.
+    # Парсеры сбрасывают признак, если результат частичный или документ не строился.
+    cacheable: bool = True
+
     def __init__(
         self,
         parser_params: ParserParams
@@ -26,12 +31,13 @@ class ParserABC(ABC):
         self.source_file = parser_params.file_path
         self.image_mode = ImageRefMode.REFERENCED if self.parser_params.include_image_in_output else ImageRefMode.PLACEHOLDER
         self.artifacts_path=settings.ARTIFACTS_PATH
-        self.converter = DocumentConverter()
+        self.converter: Optional[DocumentConverter] = None
         self.page_break_placeholder = "\n---\n\n\n\n"
 
     def parse_with_docling(self, file_path: Path) -> str:
         try:
-            doc = self.converter.convert(file_path).document
+            converter = self.converter or DocumentConverter()
+            doc = converter.convert(file_path).document
             logger.debug("Standard Docling conversion completed")
             for item in doc.iterate_items(traverse_pictures=True):
                 logger.warning(item)
@@ -58,7 +64,7 @@ class ParserABC(ABC):
         
         if isinstance(text, str):
            
-            return ftfy.fix_text(text)
+            return normalization.fix_text(text)
 
         return str(text)
 
@@ -69,45 +75,28 @@ class ParserABC(ABC):
         return unicodedata.normalize("NFC", text)
     
     def clean_text(self, text: str):
-            
-        def replace_uni(match):
-            try:
-                return chr(int(match.group(1), 16))
-            except ValueError:
-                return match.group(0)
-        
-        text = re.sub(r'/uni([0-9A-Fa-f]{4})', replace_uni, text)
-        invisible_spaces = [
-            '\u00A0',  # неразрывный пробел
-            '\u1680',  # Ogham space mark
-            '\u2000',  # en quad
-            '\u2001',  # em quad
-            '\u2002',  # en space
-            '\u2003',  # em space
-            '\u2004',  # three-per-em space
-            '\u2005',  # four-per-em space
-            '\u2006',  # six-per-em space
-            '\u2007',  # figure space
-            '\u2008',  # punctuation space
-            '\u2009',  # thin space
-            '\u200A',  # hair space
-            '\u202F',  # narrow no-break space
-            '\u205F',  # medium mathematical space
-            '\u3000',  # IDEOGRAPHIC SPACE
-            '\u00AD',  # мягкий перенос (часто мешает)
-            '\u2060',  # word joiner
-            '\uFEFF',  # BOM / zero width no-break space
-            '\u200B',  # zero width space
-            '\u200C',  # zero width non-joiner
-            '\u200D',  # zero width joiner
-            '\u0009'
-        ]
-        
-        text = text.replace('�', '.')
-        for sp in invisible_spaces:
-            text = text.replace(sp, ' ')
-        return text
+        return normalization.clean_text(text)
 
     @abstractmethod
+    def build_document(self) -> DoclingDocument:
+        """Сконвертировать исходный файл в очищенный `DoclingDocument`."""
+
+    @property
+    def exporter(self) -> DocumentExporter:
+        """Выгрузка документов этого парсера (см. `DocumentExporter`)."""
+        return DocumentExporter(self.image_mode, self.page_break_placeholder, self.artifacts_path)
+
+    def export(self, doc: DoclingDocument, mode: ParserMods):
+        """Выгрузить готовый `DoclingDocument` в режиме `mode`."""
+        return self.exporter.export(doc, mode)
+
+    def streams(self, mode: ParserMods) -> bool:
+        """Выгружает ли `parse(mode)` результат потоково (`stream`), минуя `DoclingDocument`."""
+        return False
+
+    def stream(self, mode: ParserMods):
+        """Потоковая выгрузка в режиме `mode`, для которого `streams(mode)`."""
+        raise NotImplementedError
+
     def parse(self, mode: ParserMods = ParserMods.TO_TEXT.value):
-        pass
\ No newline at end of file
+        return self.export(self.build_document(), mode)
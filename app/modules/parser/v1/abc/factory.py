@@ -4,8 +4,8 @@ from loguru import logger
 
 from modules.parser.v1.schemas import FileFormats, ParserParams
 from modules.parser.v1.exceptions import ContentNotSupportedError, ServiceUnavailable, TimeoutError
-from modules.parser.v1.file_parsers import ImageParser, PPTXParser, DocParser, XLSXParser,PDFParser, HTMLParser, TXTParser, PDFVLMParser
-from modules.parser.v1.utils import convert_doc_to
+from modules.parser.v1.file_parsers import ImageParser, PPTXParser, DocParser, XLSXParser,PDFParser, HTMLParser, TXTParser, PDFVLMParser, PDFHybridParser
+from modules.parser.v1.abc.abc import ParserABC
 
 
 class ParserFactory():
@@ -20,48 +20,37 @@ class ParserFactory():
         self.HTML_FORMATS = FileFormats.HTML.value
         self.TXT_FORMATS = FileFormats.TXT.value
 
-    def get_parser(self):
-        if not isinstance(self.parser_params.file_path, Path):
-            self.parser_params.file_path = Path(self.parser_params.file_path)
-        source_file_format = self.parser_params.file_path.suffix.lower()
-        logger.success(f"Current file format: {source_file_format}")
-        logger.debug("Creating Parser...")
+    def get_parser_cls(self) -> type[ParserABC]:
+        source_file_format = Path(self.parser_params.file_path).suffix.lower()
         match source_file_format:
             case file_format if file_format in self.IMAGE_FORMATS:
-                logger.debug("Image Parser Created!")
-                return ImageParser(self.parser_params.file_path)
-            
+                return ImageParser
             case file_format if file_format in self.XLSX_FORMATS:
-                self.parser_params.file_path = convert_doc_to(self.parser_params.file_path, "xlsx")
-                logger.debug("XLSX Parser Created!")
-                return XLSXParser(self.parser_params)
-            
+                return XLSXParser
             case file_format if file_format in self.DOC_FORMATS:
-                self.parser_params.file_path = convert_doc_to(self.parser_params.file_path, "docx")
-                logger.debug("Doc Parser Created!")
-                return DocParser(self.parser_params)
-            
+                return DocParser
             case file_format if file_format in self.PPTX_FORMATS:
-                self.parser_params.file_path = convert_doc_to(self.parser_params.file_path, "pptx")
-                logger.debug("PPTX Parser Created!")
-                return PPTXParser(self.parser_params)
-            
-            case file_format if file_format in self.PDF_FORMATS and not self.parser_params.full_vlm_pdf_parse:
-                logger.debug("PDF Parser Created!")
-                return PDFParser(self.parser_params)
-            
+                return PPTXParser
             case file_format if file_format in self.PDF_FORMATS and self.parser_params.full_vlm_pdf_parse:
-                logger.debug("PDF VLM Parser Created!")
-                return PDFVLMParser(self.parser_params.file_path)
-            
+                return PDFVLMParser
+            case file_format if file_format in self.PDF_FORMATS and self.parser_params.hybrid_pdf_parse:
+                return PDFHybridParser
+            case file_format if file_format in self.PDF_FORMATS:
+                return PDFParser
             case file_format if file_format in self.HTML_FORMATS:
-                logger.debug("HTML Parser Created!")
-                return HTMLParser(self.parser_params)
-            
+                return HTMLParser
             case file_format if file_format in self.TXT_FORMATS:
-                logger.debug("TXT Parser Created!")
-                return TXTParser(self.parser_params)
-            
+                return TXTParser
             case _:
                 raise ContentNotSupportedError(f"Формат \"{source_file_format}\" не поддерживается!")
-        
\ No newline at end of file
+
+    def get_parser(self):
+        if not isinstance(self.parser_params.file_path, Path):
+            self.parser_params.file_path = Path(self.parser_params.file_path)
+        logger.success(f"Current file format: {self.parser_params.file_path.suffix.lower()}")
+        logger.debug("Creating Parser...")
+        parser_cls = self.get_parser_cls()
+        logger.debug(f"{parser_cls.__name__} Created!")
+        if parser_cls in (ImageParser, PDFVLMParser):
+            return parser_cls(self.parser_params.file_path)
+        return parser_cls(self.parser_params)
@@ -0,0 +1,247 @@
+from pathlib import Path
+from typing import Optional, Union
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from loguru import logger
+from PIL import Image
+from docling_core.types.doc import DoclingDocument
+
+from settings import settings
+from modules.parser.v1.schemas import ParserParams
+
+# Увеличить при изменении пайплайнов парсеров, чтобы не отдавать документы,
+# разобранные старой версией.
+DOCUMENT_CACHE_VERSION = 1
+# Как часто пересчитывать размер кэша по диску: записи других процессов в
+# счётчик текущего процесса не попадают.
+CACHE_RESCAN_SECS = 60
+# Вытеснение освобождает место с запасом, чтобы следующие записи не
+# запускали его снова.
+CACHE_EVICT_TO_RATIO = 0.9
+
+
+class DiskCache:
+    """Кэш на локальном диске с TTL и LRU-вытеснением по суммарному размеру.
+
+    Записи общие для всех процессов сервиса: запись идёт во временный файл и
+    атомарно переименовывается, время создания хранится в mtime файла, время
+    последнего чтения — в atime (выставляется явно, не зависит от `relatime`).
+    Счётчики попаданий и промахов — в пределах процесса.
+
+    Суммарный размер ведётся счётчиком, поэтому запись не обходит каталог:
+    `scan` выполняется, только когда счётчик превышает `max_bytes` или
+    устарел (`CACHE_RESCAN_SECS`).
+    """
+
+    suffix = ".bin"
+
+    def __init__(self, cache_dir: Union[Path, str], max_bytes: int, ttl_secs: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.ttl_secs = ttl_secs
+        self.hits = 0
+        self.misses = 0
+        self.size_bytes: Optional[int] = None
+        self.scanned_at = 0.0
+        self.lock = threading.Lock()
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{self.suffix}"
+
+    def is_expired(self, stat: os.stat_result, now: float) -> bool:
+        return self.ttl_secs > 0 and now - stat.st_mtime > self.ttl_secs
+
+    def read_bytes(self, key: str) -> Optional[bytes]:
+        path = self.path_for(key)
+        try:
+            stat = path.stat()
+            now = time.time()
+            if self.is_expired(stat, now):
+                path.unlink(missing_ok=True)
+                self.misses += 1
+                return None
+            data = path.read_bytes()
+            os.utime(path, (now, stat.st_mtime))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def write_bytes(self, key: str, data: bytes):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(key)
+        try:
+            replaced_bytes = path.stat().st_size
+        except FileNotFoundError:
+            replaced_bytes = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp_")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        with self.lock:
+            if self.size_bytes is not None:
+                self.size_bytes += len(data) - replaced_bytes
+            stale = self.size_bytes is None or time.monotonic() - self.scanned_at > CACHE_RESCAN_SECS
+            if not stale and self.size_bytes <= self.max_bytes:
+                return
+            self.evict()
+
+    def scan(self) -> list[tuple[float, int, Path]]:
+        """Удалить просроченные записи и вернуть оставшиеся как `(atime, size, path)`."""
+        entries = []
+        if not self.cache_dir.exists():
+            return entries
+        now = time.time()
+        for path in self.cache_dir.glob(f"*{self.suffix}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if self.is_expired(stat, now):
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        entries = self.scan()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes if total <= self.max_bytes else self.max_bytes * CACHE_EVICT_TO_RATIO
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            logger.debug(f"Evicted cache entry {path.name}")
+        self.size_bytes = total
+        self.scanned_at = time.monotonic()
+
+    def stats(self) -> dict:
+        entries = self.scan()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "size_bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "ttl_secs": self.ttl_secs,
+        }
+
+
+class DocumentCache(DiskCache):
+    """Кэш разобранных `DoclingDocument` по содержимому файла.
+
+    Документ хранится как JSON, сжатый gzip. Ключ зависит от sha256 файла, его
+    формата по содержимому и параметров, влияющих на разбор: профиля и того,
+    рендерились ли изображения картинок (`parse_images` или
+    `include_image_in_output`). Режим выдачи в ключ не входит, поэтому один
+    документ обслуживает и Markdown, и Word, и перевод.
+    """
+
+    suffix = ".json.gz"
+
+    @staticmethod
+    def make_key(parser_params: ParserParams, file_format: str) -> str:
+        fingerprint = ":".join(
+            str(part)
+            for part in (
+                DOCUMENT_CACHE_VERSION,
+                parser_params.content_hash,
+                file_format,
+                bool(parser_params.parse_images),
+                bool(parser_params.full_vlm_pdf_parse),
+                bool(parser_params.hybrid_pdf_parse),
+                parser_params.profile.value,
+                parser_params.render_pictures,
+            )
+        )
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[DoclingDocument]:
+        data = self.read_bytes(key)
+        if data is None:
+            return None
+        try:
+            return DoclingDocument.model_validate_json(gzip.decompress(data))
+        except Exception as e:
+            logger.warning(f"Broken document cache entry {key}: {e}")
+            self.path_for(key).unlink(missing_ok=True)
+            self.hits -= 1
+            self.misses += 1
+            return None
+
+    def put(self, key: str, doc: DoclingDocument):
+        self.write_bytes(key, gzip.compress(doc.model_dump_json().encode("utf-8"), compresslevel=6))
+
+
+class OCRCache(DiskCache):
+    """Кэш Markdown, распознанного VLM, по содержимому изображения.
+
+    Основной ключ — sha256 пикселей изображения (в RGB, не зависит от формата
+    файла) и отпечаток запроса: промпт, модель, `max_tokens`. Опциональный
+    перцептивный слой (`OCR_CACHE_PERCEPTUAL`) добавляет ключ по dHash и
+    размерам изображения, чтобы попадали и перекодированные копии.
+    """
+
+    suffix = ".md"
+
+    @staticmethod
+    def request_fingerprint(prompt: str, model_name: str, max_tokens: int, variant: str = "") -> str:
+        """`variant` — всё остальное, что меняет запрос к VLM (например, предобработка изображения)."""
+        return hashlib.sha256(f"{model_name}:{max_tokens}:{variant}:{prompt}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def content_key(image: Image.Image, request_fingerprint: str) -> str:
+        digest = hashlib.sha256(f"content:{request_fingerprint}:{image.width}x{image.height}:".encode("utf-8"))
+        digest.update(image.convert("RGB").tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def perceptual_key(image: Image.Image, request_fingerprint: str) -> str:
+        pixels = list(image.convert("L").resize((9, 8), Image.Resampling.LANCZOS).getdata())
+        dhash = 0
+        for row in range(8):
+            for column in range(8):
+                dhash = (dhash << 1) | (pixels[row * 9 + column] > pixels[row * 9 + column + 1])
+        fingerprint = f"dhash:{request_fingerprint}:{image.width}x{image.height}:{dhash:016x}"
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+    def keys_for(self, image: Image.Image, request_fingerprint: str) -> list[str]:
+        keys = [self.content_key(image, request_fingerprint)]
+        if settings.OCR_CACHE_PERCEPTUAL:
+            keys.append(self.perceptual_key(image, request_fingerprint))
+        return keys
+
+    def get_text(self, image: Image.Image, request_fingerprint: str) -> Optional[str]:
+        for key in self.keys_for(image, request_fingerprint):
+            data = self.read_bytes(key)
+            if data is not None:
+                return data.decode("utf-8")
+        return None
+
+    def put_text(self, image: Image.Image, request_fingerprint: str, text: str):
+        for key in self.keys_for(image, request_fingerprint):
+            self.write_bytes(key, text.encode("utf-8"))
+
+
+document_cache = DocumentCache(
+    settings.DOCUMENT_CACHE_DIR,
+    max_bytes=settings.DOCUMENT_CACHE_MAX_BYTES,
+    ttl_secs=settings.DOCUMENT_CACHE_TTL_SECS,
+)
+
+ocr_cache = OCRCache(
+    settings.OCR_CACHE_DIR,
+    max_bytes=settings.OCR_CACHE_MAX_BYTES,
+    ttl_secs=settings.OCR_CACHE_TTL_SECS,
+)
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+import hashlib
+import threading
+
+from loguru import logger
+from docling.datamodel.base_models import InputFormat
+from docling.document_converter import DocumentConverter, FormatOption
+
+from settings import settings
+
+
+class ConverterCache:
+    """LRU-кэш инициализированных `DocumentConverter` в пределах одного процесса.
+
+    Каждый воркер `ProcessPoolExecutor` держит собственный экземпляр кэша, поэтому
+    пайплайны Docling и модели из `ARTIFACTS_PATH` загружаются один раз на воркер,
+    а не на каждый запрос.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max(1, max_size)
+        self._converters: OrderedDict[tuple, DocumentConverter] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(input_format: InputFormat, format_option: FormatOption) -> tuple:
+        options_dump = "".join(
+            str(options.model_dump()) if options is not None else ""
+            for options in (format_option.pipeline_options, format_option.backend_options)
+        )
+        fingerprint = hashlib.md5(options_dump.encode("utf-8"), usedforsecurity=False).hexdigest()
+        return (input_format, format_option.pipeline_cls, format_option.backend, fingerprint)
+
+    def get(self, input_format: InputFormat, format_option: FormatOption) -> DocumentConverter:
+        key = self.make_key(input_format, format_option)
+        with self._lock:
+            converter = self._converters.get(key)
+            if converter is not None:
+                self._converters.move_to_end(key)
+                logger.debug(f"Reusing cached converter for {input_format.value} ({format_option.pipeline_cls.__name__})")
+                return converter
+
+            logger.debug(f"Creating converter for {input_format.value} ({format_option.pipeline_cls.__name__})")
+            converter = DocumentConverter(format_options={input_format: format_option})
+            self._converters[key] = converter
+            while len(self._converters) > self.max_size:
+                (evicted_format, evicted_pipeline, _, _), _ = self._converters.popitem(last=False)
+                logger.debug(f"Evicted converter for {evicted_format.value} ({evicted_pipeline.__name__})")
+            return converter
+
+    def clear(self):
+        with self._lock:
+            self._converters.clear()
+
+    def __len__(self) -> int:
+        return len(self._converters)
+
+
+converter_cache = ConverterCache(settings.CONVERTER_CACHE_SIZE)
+
+
+def get_converter(input_format: InputFormat, format_option: FormatOption) -> DocumentConverter:
+    return converter_cache.get(input_format, format_option)
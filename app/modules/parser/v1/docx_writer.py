@@ -0,0 +1,408 @@
+"""Выгрузка `DoclingDocument` в Word (.docx) без Markdown и pandoc.
+
+`DocxWriter` обходит дерево документа и сразу пишет WordprocessingML в
+документ `python-docx`: заголовки — стилями `Heading N` (как у pandoc:
+заголовок документа — `Heading 1`, раздел уровня N — `Heading N+1`), списки —
+стилями `List Bullet`/`List Number` с отдельной нумерацией у каждого
+нумерованного списка, таблицы — элементом `w:tbl` с объединёнными ячейками
+(`gridSpan`/`vMerge`), код — моноширинным шрифтом, ссылки — `w:hyperlink`.
+Картинки вставляются из памяти (`PictureItem.get_image`), без временных
+файлов; в режиме `ImageRefMode.PLACEHOLDER` они пропускаются, как и у pandoc.
+При смене страницы между элементами ставится разрыв страницы.
+
+Абзацы и фрагменты текста создаются элементами lxml напрямую: методы
+`python-docx` (`add_paragraph`, `add_run`, `relate_to`) на каждом вызове ищут
+место вставки, стиль или связь перебором, и на больших документах запись
+становится квадратичной.
+
+Прежний путь через Markdown и pandoc остаётся доступен: `WORD_EXPORT_ENGINE=pandoc`.
+"""
+from io import BytesIO
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Optional, Union
+from xml.sax.saxutils import escape
+import re
+import shutil
+import tempfile
+
+import docx
+import pypandoc
+from docx.opc.constants import RELATIONSHIP_TYPE
+from docx.oxml import OxmlElement, parse_xml
+from docx.oxml.ns import nsdecls, qn
+from docx.oxml.numbering import CT_Num
+from docx.shared import Emu
+from docx.text.paragraph import Paragraph
+from loguru import logger
+from lxml import etree
+from docling_core.types.doc import (
+    CodeItem,
+    ContentLayer,
+    DocItem,
+    DoclingDocument,
+    FloatingItem,
+    Formatting,
+    GroupItem,
+    ImageRefMode,
+    InlineGroup,
+    ListGroup,
+    ListItem,
+    NodeItem,
+    PictureItem,
+    RichTableCell,
+    Script,
+    SectionHeaderItem,
+    TableItem,
+    TextItem,
+    TitleItem,
+)
+
+from settings import settings
+
+# XML 1.0 не допускает управляющие символы, кроме табуляции и переводов строк.
+INVALID_XML_CHARS_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+LIST_NUMBER_RE = re.compile(r"\s*(\d+)")
+CODE_FONT = "Courier New"
+HYPERLINK_COLOR = "0563C1"
+MAX_LIST_STYLE_LEVEL = 3
+IMAGE_DPI = 96
+EMU_PER_INCH = 914400
+EMU_PER_TWIP = 635
+
+W_P, W_PPR, W_PSTYLE, W_NUMPR, W_ILVL, W_NUMID = (
+    qn("w:p"), qn("w:pPr"), qn("w:pStyle"), qn("w:numPr"), qn("w:ilvl"), qn("w:numId")
+)
+W_R, W_RPR, W_T, W_BR, W_VAL, W_TYPE = qn("w:r"), qn("w:rPr"), qn("w:t"), qn("w:br"), qn("w:val"), qn("w:type")
+W_HYPERLINK, R_ID = qn("w:hyperlink"), qn("r:id")
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+
+def xml_text(text: str) -> str:
+    return INVALID_XML_CHARS_RE.sub("", text)
+
+
+def list_start(marker: str) -> int:
+    """Номер первого пункта нумерованного списка по его маркеру (`3.`, `3)`)."""
+    match = LIST_NUMBER_RE.match(marker or "")
+    return int(match.group(1)) if match else 1
+
+
+def run_properties(formatting: Optional[Formatting], font: Optional[str] = None, hyperlink: bool = False) -> list:
+    """Дочерние элементы `w:rPr` в порядке схемы WordprocessingML."""
+    properties = []
+    if font:
+        properties.append(("w:rFonts", {"w:ascii": font, "w:hAnsi": font, "w:cs": font}))
+    if formatting is not None and formatting.bold:
+        properties.append(("w:b", {}))
+    if formatting is not None and formatting.italic:
+        properties.append(("w:i", {}))
+    if formatting is not None and formatting.strikethrough:
+        properties.append(("w:strike", {}))
+    if hyperlink:
+        properties.append(("w:color", {"w:val": HYPERLINK_COLOR}))
+    if hyperlink or (formatting is not None and formatting.underline):
+        properties.append(("w:u", {"w:val": "single"}))
+    if formatting is not None and formatting.script != Script.BASELINE:
+        script = "subscript" if formatting.script == Script.SUB else "superscript"
+        properties.append(("w:vertAlign", {"w:val": script}))
+    return properties
+
+
+class DocxWriter:
+    """Запись одного `DoclingDocument` в новый документ Word."""
+
+    def __init__(self, doc: DoclingDocument, image_mode: ImageRefMode, page_breaks: bool = True):
+        self.doc = doc
+        self.image_mode = image_mode
+        self.page_breaks = page_breaks
+        self.document = docx.Document()
+        self.section_properties = self.document.element.body.sectPr
+        section = self.document.sections[0]
+        self.content_width = section.page_width - section.left_margin - section.right_margin
+        self.style_ids: dict[str, str] = {}
+        self.abstract_num_ids: dict[str, Optional[int]] = {}
+        self.next_num_id: Optional[int] = None
+        self.hyperlinks: dict[str, str] = {}
+        self.written: set[str] = set()
+        self.page_no: Optional[int] = None
+
+    def save(self, path: Union[Path, str]):
+        self.write_children(self.doc.body, list_depth=0)
+        self.document.save(str(path))
+
+    def style_id(self, style: str) -> str:
+        if style not in self.style_ids:
+            self.style_ids[style] = self.document.styles[style].style_id
+        return self.style_ids[style]
+
+    def add_paragraph(self, style: Optional[str] = None, num_id: Optional[int] = None):
+        """Новый абзац `w:p` в конце документа, перед `w:sectPr`."""
+        p = etree.Element(W_P)
+        if style is not None or num_id is not None:
+            p_pr = etree.SubElement(p, W_PPR)
+            if style is not None:
+                etree.SubElement(p_pr, W_PSTYLE, {W_VAL: self.style_id(style)})
+            if num_id is not None:
+                num_pr = etree.SubElement(p_pr, W_NUMPR)
+                etree.SubElement(num_pr, W_ILVL, {W_VAL: "0"})
+                etree.SubElement(num_pr, W_NUMID, {W_VAL: str(num_id)})
+        self.section_properties.addprevious(p)
+        return p
+
+    @staticmethod
+    def add_run(parent, text: str, properties: list = ()):
+        r = etree.SubElement(parent, W_R)
+        if properties:
+            r_pr = etree.SubElement(r, W_RPR)
+            for tag, attributes in properties:
+                etree.SubElement(r_pr, qn(tag), {qn(name): value for name, value in attributes.items()})
+        for index, line in enumerate(xml_text(text).split("\n")):
+            if index:
+                etree.SubElement(r, W_BR)
+            t = etree.SubElement(r, W_T)
+            t.text = line
+            t.set(XML_SPACE, "preserve")
+        return r
+
+    def write_children(self, node: NodeItem, list_depth: int):
+        for child_ref in node.children:
+            item = child_ref.resolve(self.doc)
+            if item.self_ref in self.written or item.content_layer != ContentLayer.BODY:
+                continue
+            self.write_item(item, list_depth)
+
+    def write_item(self, item: NodeItem, list_depth: int):
+        if isinstance(item, ListGroup):
+            self.write_list(item, list_depth + 1)
+            return
+        if isinstance(item, InlineGroup):
+            self.break_page_before(item)
+            self.write_inline(self.add_paragraph(), item)
+            return
+        if isinstance(item, GroupItem):
+            self.write_children(item, list_depth)
+            return
+        self.break_page_before(item)
+        if isinstance(item, TableItem):
+            self.write_captions(item)
+            self.write_table(item)
+        elif isinstance(item, PictureItem):
+            self.write_captions(item)
+            self.write_picture(item)
+        elif isinstance(item, TitleItem):
+            self.write_text(self.add_paragraph("Heading 1"), item)
+        elif isinstance(item, SectionHeaderItem):
+            self.write_text(self.add_paragraph(f"Heading {min(item.level + 1, 9)}"), item)
+        elif isinstance(item, CodeItem):
+            self.add_run(self.add_paragraph(), item.text, run_properties(item.formatting, font=CODE_FONT))
+            self.written.add(item.self_ref)
+        elif isinstance(item, TextItem) and item.text:
+            self.write_text(self.add_paragraph(), item)
+        if not isinstance(item, FloatingItem):
+            self.write_children(item, list_depth)
+
+    def write_list(self, group: ListGroup, depth: int):
+        level = min(depth, MAX_LIST_STYLE_LEVEL)
+        num_id = None
+        for child_ref in group.children:
+            item = child_ref.resolve(self.doc)
+            if item.self_ref in self.written or item.content_layer != ContentLayer.BODY:
+                continue
+            if not isinstance(item, ListItem):
+                self.write_item(item, depth)
+                continue
+            self.break_page_before(item)
+            kind = "List Number" if item.enumerated else "List Bullet"
+            style = kind if level == 1 else f"{kind} {level}"
+            if item.enumerated and num_id is None:
+                num_id = self.restart_numbering(style, list_start(item.marker))
+            p = self.add_paragraph(style, num_id if item.enumerated else None)
+            self.write_text(p, item)
+            for nested_ref in item.children:
+                nested = nested_ref.resolve(self.doc)
+                if nested.content_layer != ContentLayer.BODY:
+                    continue
+                if isinstance(nested, InlineGroup):
+                    self.write_inline(p, nested)
+                else:
+                    self.write_item(nested, depth)
+
+    def restart_numbering(self, style: str, start: int) -> Optional[int]:
+        """Новая нумерация для нумерованного списка: иначе все списки документа
+        продолжали бы одну сквозную нумерацию стиля."""
+        numbering = self.document.part.numbering_part.element
+        if style not in self.abstract_num_ids:
+            p_pr = self.document.styles[style].element.pPr
+            num_pr = p_pr.numPr if p_pr is not None else None
+            if num_pr is None or num_pr.numId is None:
+                self.abstract_num_ids[style] = None
+            else:
+                self.abstract_num_ids[style] = numbering.num_having_numId(num_pr.numId.val).abstractNumId.val
+        abstract_id = self.abstract_num_ids[style]
+        if abstract_id is None:
+            return None
+        # `CT_Numbering.add_num` ищет свободный номер перебором всех `w:num`.
+        if self.next_num_id is None:
+            self.next_num_id = max((num.numId for num in numbering.num_lst), default=0) + 1
+        num = numbering._insert_num(CT_Num.new(self.next_num_id, abstract_id))
+        num.add_lvlOverride(ilvl=0).add_startOverride(start)
+        self.next_num_id += 1
+        return num.numId
+
+    def write_inline(self, p, group: InlineGroup):
+        has_text = any(child.tag != W_PPR for child in p)
+        for child_ref in group.children:
+            item = child_ref.resolve(self.doc)
+            if isinstance(item, TextItem) and item.text:
+                if has_text:
+                    self.add_run(p, " ")
+                self.write_text(p, item)
+                has_text = True
+            self.written.add(item.self_ref)
+        self.written.add(group.self_ref)
+
+    def write_text(self, p, item: TextItem):
+        if item.hyperlink is not None:
+            link = etree.SubElement(p, W_HYPERLINK, {R_ID: self.hyperlink_id(str(item.hyperlink))})
+            self.add_run(link, item.text, run_properties(item.formatting, hyperlink=True))
+        else:
+            self.add_run(p, item.text, run_properties(item.formatting))
+        self.written.add(item.self_ref)
+
+    def hyperlink_id(self, url: str) -> str:
+        # `Part.relate_to` ищет существующую связь перебором всех связей части.
+        if url not in self.hyperlinks:
+            relationship_id = f"rIdLink{len(self.hyperlinks) + 1}"
+            self.document.part.rels.add_relationship(
+                RELATIONSHIP_TYPE.HYPERLINK, url, relationship_id, is_external=True
+            )
+            self.hyperlinks[url] = relationship_id
+        return self.hyperlinks[url]
+
+    def write_captions(self, item: FloatingItem):
+        for caption_ref in item.captions:
+            caption = caption_ref.resolve(self.doc)
+            if isinstance(caption, TextItem) and caption.text:
+                self.write_text(self.add_paragraph("Caption"), caption)
+            self.written.add(caption.self_ref)
+
+    def cell_text(self, cell) -> str:
+        if isinstance(cell, RichTableCell):
+            return cell._get_text(doc=self.doc)
+        return cell.text or ""
+
+    def write_table(self, item: TableItem):
+        """Таблица собирается одной строкой XML и разбирается одним вызовом `parse_xml`."""
+        self.written.add(item.self_ref)
+        grid = item.data.grid
+        num_cols = max((len(row) for row in grid), default=0)
+        if not num_cols:
+            return
+        col_width = int(self.content_width / num_cols / EMU_PER_TWIP)
+        rows_xml = []
+        for row_idx, row in enumerate(grid):
+            cells_xml = []
+            col_idx = 0
+            while col_idx < len(row):
+                cell = row[col_idx]
+                span = 1
+                if cell.start_col_offset_idx == col_idx:
+                    span = max(min(cell.end_col_offset_idx, len(row)) - col_idx, 1)
+                properties = f'<w:tcW w:w="{col_width * span}" w:type="dxa"/>'
+                if span > 1:
+                    properties += f'<w:gridSpan w:val="{span}"/>'
+                continues_above = cell.start_row_offset_idx < row_idx < cell.end_row_offset_idx
+                if cell.row_span > 1:
+                    properties += '<w:vMerge/>' if continues_above else '<w:vMerge w:val="restart"/>'
+                text = "" if continues_above else xml_text(self.cell_text(cell))
+                bold = "<w:rPr><w:b/></w:rPr>" if cell.column_header else ""
+                runs = "<w:br/>".join(
+                    f'<w:t xml:space="preserve">{escape(line)}</w:t>' for line in text.split("\n")
+                )
+                cells_xml.append(f"<w:tc><w:tcPr>{properties}</w:tcPr><w:p><w:r>{bold}{runs}</w:r></w:p></w:tc>")
+                col_idx += span
+            rows_xml.append("<w:tr>" + "".join(cells_xml) + "</w:tr>")
+        table_xml = (
+            f'<w:tbl {nsdecls("w")}><w:tblPr><w:tblStyle w:val="{self.style_id("Table Grid")}"/>'
+            '<w:tblW w:w="0" w:type="auto"/></w:tblPr><w:tblGrid>'
+            + f'<w:gridCol w:w="{col_width}"/>' * num_cols
+            + "</w:tblGrid>" + "".join(rows_xml) + "</w:tbl>"
+        )
+        self.section_properties.addprevious(parse_xml(table_xml))
+
+    def write_picture(self, item: PictureItem):
+        self.written.add(item.self_ref)
+        if self.image_mode == ImageRefMode.PLACEHOLDER:
+            return
+        image = item.get_image(self.doc)
+        if image is None:
+            return
+        stream = BytesIO()
+        image.save(stream, format="PNG")
+        stream.seek(0)
+        width = min(Emu(int(image.width / IMAGE_DPI * EMU_PER_INCH)), self.content_width)
+        p = OxmlElement("w:p")
+        self.section_properties.addprevious(p)
+        Paragraph(p, self.document._body).add_run().add_picture(stream, width=width)
+
+    def break_page_before(self, item: NodeItem):
+        if not self.page_breaks or not isinstance(item, DocItem) or not item.prov:
+            return
+        page_no = item.prov[0].page_no
+        if self.page_no is not None and page_no > self.page_no:
+            r = etree.SubElement(self.add_paragraph(), W_R)
+            etree.SubElement(r, W_BR, {W_TYPE: "page"})
+        if self.page_no is None or page_no > self.page_no:
+            self.page_no = page_no
+
+
+def write_docx(doc: DoclingDocument, path: Union[Path, str], image_mode: ImageRefMode, page_breaks: bool = True):
+    DocxWriter(doc, image_mode, page_breaks).save(path)
+
+
+def convert_with_pandoc(
+    doc: DoclingDocument,
+    path: Union[Path, str],
+    image_mode: ImageRefMode,
+    page_break_placeholder: Optional[str],
+):
+    artifacts_dir = Path(tempfile.mkdtemp(prefix="artifacts_"))
+    try:
+        doc_with_refs = doc._make_copy_with_refmode(
+            reference_path=artifacts_dir,
+            artifacts_dir=artifacts_dir,
+            image_mode=image_mode,
+            page_no=None,
+        )
+        markdown = doc_with_refs.export_to_markdown(image_mode=image_mode, page_break_placeholder=page_break_placeholder)
+        pypandoc.convert_text(
+            markdown,
+            "docx",
+            format="md",
+            outputfile=str(path),
+            extra_args=["--standalone", f"--resource-path={artifacts_dir}", "--wrap=none"],
+        )
+    finally:
+        shutil.rmtree(artifacts_dir, ignore_errors=True)
+
+
+def export_to_word(
+    doc: DoclingDocument,
+    image_mode: ImageRefMode = ImageRefMode.PLACEHOLDER,
+    page_break_placeholder: Optional[str] = None,
+) -> str:
+    """Сохранить документ во временный `.docx` и вернуть путь к нему.
+
+    По умолчанию документ пишет `DocxWriter`; `WORD_EXPORT_ENGINE=pandoc`
+    возвращает прежнюю конвертацию через Markdown и pandoc. Разрывы страниц
+    ставятся, если задан `page_break_placeholder`.
+    """
+    logger.debug("Saving to Word")
+    with NamedTemporaryFile(suffix=".docx", delete=False) as tmp_file:
+        path = tmp_file.name
+    if settings.WORD_EXPORT_ENGINE == "pandoc":
+        convert_with_pandoc(doc, path, image_mode, page_break_placeholder)
+    else:
+        write_docx(doc, path, image_mode, page_breaks=page_break_placeholder is not None)
+    return path
@@ -23,6 +23,14 @@ class ContentNotSupportedError(HTTPException):
             detail=detail,
         )
         
+class PayloadTooLargeError(HTTPException):
+    def __init__(self, max_bytes: int):
+        logger.error(f"Upload exceeds {max_bytes} bytes!")
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Размер файла превышает допустимый ({max_bytes} байт)",
+        )
+
 class ServiceUnavailable(HTTPException):
     def __init__(self, service_name: str, service_url: str):
         logger.error(f"Servie \"{service_name}\" at {service_url} unavaialble! Check the connection!")
@@ -0,0 +1,250 @@
+"""Выгрузка готового `DoclingDocument` в форматы выдачи.
+
+`DocumentExporter` — общий слой для всех парсеров: `ParserABC.export`
+выгружает документ в режиме `ParserMods`, а `export_bundle` пишет из одного
+документа сразу несколько форматов (`OutputFormat`) для `/parse/bundle`, так
+что документ разбирается один раз, сколько бы форматов ни запросил клиент.
+
+JSON пишется сериализатором pydantic-core прямо из модели документа — без
+копии документа, промежуточного `dict` и отступов, как в `save_as_json`, — и
+при необходимости сжимается gzip или zstd (пакет `zstandard` необязателен).
+"""
+from contextlib import contextmanager
+from functools import cached_property
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Iterable, Iterator, Optional, Union
+import os
+import zlib
+
+from loguru import logger
+from pydantic import TypeAdapter, computed_field
+from docling_core.types.doc import DoclingDocument, ImageRefMode, TableCell
+from docling_core.types.doc.document import TableData
+
+from modules.parser.v1.docx_writer import export_to_word
+from modules.parser.v1.exceptions import BadRequestError
+from modules.parser.v1.schemas import DoclingJsonOptions, JsonCompression, JsonHeavyField, OutputFormat, ParserMods
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+OUTPUT_SUFFIXES = {
+    OutputFormat.TEXT: ".txt",
+    OutputFormat.MARKDOWN: ".md",
+    OutputFormat.WORD: ".docx",
+    OutputFormat.DOCLING_JSON: ".json",
+    OutputFormat.DOCTAGS: ".doctags",
+}
+
+
+JSON_SUFFIXES = {
+    JsonCompression.NONE: ".json",
+    JsonCompression.GZIP: ".json.gz",
+    JsonCompression.ZSTD: ".json.zst",
+}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+DOCUMENT_ADAPTER = TypeAdapter(DoclingDocument)
+
+
+def json_exclude(fields: Iterable[JsonHeavyField]) -> Optional[dict]:
+    """Аргумент `exclude` сериализатора для тяжёлых полей `fields`."""
+    fields = set(fields)
+    exclude = {}
+    table_fields = {}
+    if JsonHeavyField.PAGE_IMAGES in fields:
+        exclude["pages"] = {"__all__": {"image": True}}
+    if JsonHeavyField.PICTURE_IMAGES in fields:
+        exclude["pictures"] = {"__all__": {"image": True}}
+        table_fields["image"] = True
+    if JsonHeavyField.TABLE_GRIDS in fields:
+        table_fields["data"] = {"grid": True}
+    if table_fields:
+        exclude["tables"] = {"__all__": table_fields}
+    return exclude or None
+
+
+def document_json(doc: DoclingDocument, exclude: Iterable[JsonHeavyField] = ()) -> bytes:
+    """JSON документа в форме `save_as_json` (без отступов), без полей `exclude`.
+
+    Изображения в документах парсеров уже хранятся как data URI, поэтому
+    копия документа с `ImageRefMode.EMBEDDED` не нужна.
+    """
+    return DOCUMENT_ADAPTER.dump_json(doc, by_alias=True, exclude_none=True, exclude=json_exclude(exclude))
+
+
+def check_compression(compression: JsonCompression):
+    if compression == JsonCompression.ZSTD and zstandard is None:
+        raise BadRequestError("Сжатие zstd недоступно: не установлен пакет `zstandard`")
+
+
+class StreamCompressor:
+    """Сжатие потока фрагментов в gzip или zstd.
+
+    Результат каждого `compress` сбрасывается до границы блока, поэтому
+    клиент может распаковать фрагмент, не дожидаясь конца ответа.
+    """
+
+    def __init__(self, compression: JsonCompression):
+        check_compression(compression)
+        self.compression = compression
+        if compression == JsonCompression.GZIP:
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        elif compression == JsonCompression.ZSTD:
+            self.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        else:
+            self.compressor = None
+
+    def compress(self, data: bytes) -> bytes:
+        if self.compressor is None:
+            return data
+        if self.compression == JsonCompression.GZIP:
+            return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        return self.compressor.compress(data) + self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush() if self.compressor is not None else b""
+
+
+class GridCachedTableData(TableData):
+    """`TableData`, которая строит `grid` один раз.
+
+    `TableItem.export_to_otsl` обращается к `data.grid[i][j]` для каждой
+    ячейки, а исходное свойство каждый раз строит сетку заново, поэтому
+    выгрузка DocTags квадратична по числу ячеек таблицы.
+    """
+
+    @computed_field
+    @cached_property
+    def grid(self) -> list[list[TableCell]]:
+        return TableData.grid.fget(self)
+
+
+@contextmanager
+def cached_table_grids(doc: DoclingDocument) -> Iterator[DoclingDocument]:
+    """Подменить данные таблиц на `GridCachedTableData` на время выгрузки."""
+    originals = [(table, table.data) for table in doc.tables]
+    try:
+        for table, data in originals:
+            table.data = GridCachedTableData.model_construct(**dict(data))
+        yield doc
+    finally:
+        for table, data in originals:
+            table.data = data
+
+
+def temp_path(suffix: str) -> str:
+    with NamedTemporaryFile(suffix=suffix, delete=False) as tmp_file:
+        return tmp_file.name
+
+
+class DocumentExporter:
+    """Выгрузка документа с параметрами парсера.
+
+    `artifacts_dir` — каталог, куда `.md`-файл складывает изображения в
+    режиме `ImageRefMode.REFERENCED`; без него Markdown пишется как есть, без
+    сохранения картинок. `page_break_placeholder=None` отключает разделители
+    страниц в Markdown и разрывы страниц в Word.
+    """
+
+    def __init__(
+        self,
+        image_mode: ImageRefMode = ImageRefMode.PLACEHOLDER,
+        page_break_placeholder: Optional[str] = None,
+        artifacts_dir: Optional[Union[Path, str]] = None,
+    ):
+        self.image_mode = image_mode
+        self.page_break_placeholder = page_break_placeholder
+        self.artifacts_dir = artifacts_dir
+
+    def to_markdown(self, doc: DoclingDocument) -> str:
+        return doc.export_to_markdown(image_mode=self.image_mode, page_break_placeholder=self.page_break_placeholder)
+
+    def save_markdown(self, doc: DoclingDocument) -> str:
+        logger.debug("Saving to .md file")
+        path = temp_path(".md")
+        if self.artifacts_dir is None:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(self.to_markdown(doc))
+        else:
+            doc.save_as_markdown(
+                filename=path,
+                artifacts_dir=Path(self.artifacts_dir),
+                image_mode=self.image_mode,
+                page_break_placeholder=self.page_break_placeholder,
+            )
+        logger.success("File Saved!")
+        return path
+
+    def save_text(self, doc: DoclingDocument) -> str:
+        path = temp_path(".txt")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(doc.export_to_text(page_break_placeholder=self.page_break_placeholder))
+        return path
+
+    def save_word(self, doc: DoclingDocument) -> str:
+        return export_to_word(doc, self.image_mode, self.page_break_placeholder)
+
+    def save_json(self, doc: DoclingDocument, options: Optional[DoclingJsonOptions] = None) -> str:
+        options = options or DoclingJsonOptions()
+        compressor = StreamCompressor(options.compression)
+        path = temp_path(JSON_SUFFIXES[options.compression])
+        with open(path, "wb") as file:
+            file.write(compressor.compress(document_json(doc, options.exclude)))
+            file.write(compressor.finish())
+        return path
+
+    def save_doctags(self, doc: DoclingDocument) -> str:
+        path = temp_path(".doctags")
+        with cached_table_grids(doc):
+            doc.save_as_doctags(path)
+        return path
+
+    def save(self, doc: DoclingDocument, output: OutputFormat) -> str:
+        """Записать документ во временный файл формата `output` и вернуть путь к нему."""
+        match output:
+            case OutputFormat.TEXT:
+                return self.save_text(doc)
+            case OutputFormat.MARKDOWN:
+                return self.save_markdown(doc)
+            case OutputFormat.WORD:
+                return self.save_word(doc)
+            case OutputFormat.DOCLING_JSON:
+                return self.save_json(doc)
+            case OutputFormat.DOCTAGS:
+                return self.save_doctags(doc)
+            case _:
+                logger.error(f"Unknown output format: {output}")
+                raise ValueError
+
+    def export(self, doc: DoclingDocument, mode: ParserMods):
+        match mode:
+            case ParserMods.TO_FILE:
+                return self.save_markdown(doc)
+            case ParserMods.TO_TEXT:
+                return self.to_markdown(doc)
+            case ParserMods.TO_WORD:
+                return self.save_word(doc)
+            case ParserMods.TO_JSON:
+                return self.save_json(doc)
+            case ParserMods.TO_DOCLING:
+                return doc
+            case _:
+                logger.error("Unknown parse mode!")
+                raise ValueError
+
+    def export_bundle(self, doc: DoclingDocument, outputs: list[OutputFormat]) -> dict[OutputFormat, str]:
+        """Записать документ во все форматы `outputs`; при ошибке уже записанные файлы удаляются."""
+        paths: dict[OutputFormat, str] = {}
+        try:
+            for output in dict.fromkeys(outputs):
+                paths[output] = self.save(doc, output)
+        except BaseException:
+            for path in paths.values():
+                os.remove(path)
+            raise
+        logger.success(f"Bundle saved: {', '.join(output.value for output in paths)}")
+        return paths
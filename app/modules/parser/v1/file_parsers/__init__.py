@@ -5,4 +5,5 @@ from modules.parser.v1.file_parsers.xlsx_parser import XLSXParser
 from modules.parser.v1.file_parsers.pdf_parser import PDFParser
 from modules.parser.v1.file_parsers.html_parser import HTMLParser
 from modules.parser.v1.file_parsers.txt_parser import TXTParser
-from modules.parser.v1.file_parsers.pdf_parser_vlm import PDFVLMParser
\ No newline at end of file
+from modules.parser.v1.file_parsers.pdf_parser_vlm import PDFVLMParser
+from modules.parser.v1.file_parsers.pdf_parser_hybrid import PDFHybridParser
@@ -1,7 +1,7 @@
+from functools import cached_property
 from pathlib import Path
 from tempfile import NamedTemporaryFile
-import tempfile
-import shutil
+import os
 
 import pypandoc
 from docling.document_converter import DocumentConverter, HTMLFormatOption
@@ -10,84 +10,91 @@ from docling.document_converter import DocumentConverter, PowerpointFormatOption
 from docling.datamodel.base_models import  InputFormat
 from loguru import logger
 from docling_core.types.doc import (
-    ImageRef, PictureItem, TableItem, ImageRefMode, TextItem, DocItemLabel, TableData
+    ImageRef, PictureItem, TableItem, ImageRefMode, TextItem, DocItemLabel, TableData, DoclingDocument
 )
 
+from settings import settings
 from modules.parser.v1.schemas import ParserParams, ParserMods
-from modules.parser.v1.file_parsers.image_parser import ImageParser
+from modules.parser.v1.file_parsers.image_parser import ImageParser, ocr_pictures
+from modules.parser.v1.file_parsers.html_stream import STREAMABLE_SUFFIXES, UnsupportedHTML, iter_html_markdown
+from modules.parser.v1.file_parsers.txt_parser import detect_encoding
 from modules.parser.v1.abc.abc import ParserABC
+from modules.parser.v1.normalization import normalize_document
+from modules.parser.v1.converters import get_converter
+from modules.parser.v1.profiles import paginated_pipeline_options
 
 
 class HTMLParser(ParserABC):
     def __init__(self, parsers_params: ParserParams):
         super().__init__(parsers_params)
-        self.converter = DocumentConverter()
-        self.pipeline_options = PdfPipelineOptions(artifacts_path=self.artifacts_path,
-                                                         generate_page_images=True,
-                                                         generate_picture_images=True)
+        self.pipeline_options = paginated_pipeline_options(self.parser_params, self.artifacts_path)
 
     def set_converter_options(self):
-        self.converter = DocumentConverter(format_options={
-                InputFormat.HTML: HTMLFormatOption(pipeline_options=self.pipeline_options)
-                })
+        self.converter = get_converter(InputFormat.HTML,
+                HTMLFormatOption(pipeline_options=self.pipeline_options))
         
-    def parse(self, mode: ParserMods):
-        logger.debug(f"Parsing {self.parser_params.file_path}...")
+    @cached_property
+    def streamable(self) -> bool:
+        """Можно ли выгрузить Markdown потоково, минуя Docling (см. `html_stream`)."""
+        if not settings.HTML_STREAM_ENABLED or self.parser_params.parse_images or self.parser_params.include_image_in_output:
+            return False
+        return Path(self.source_file).suffix.lower() in STREAMABLE_SUFFIXES
+
+    def streams(self, mode: ParserMods) -> bool:
+        streamed_modes = (ParserMods.TO_TEXT, ParserMods.TO_FILE)
+        if settings.WORD_EXPORT_ENGINE == "pandoc":
+            # Собственный писатель `.docx` работает с `DoclingDocument`, pandoc — с Markdown.
+            streamed_modes += (ParserMods.TO_WORD,)
+        return mode in streamed_modes and self.streamable
+
+    def write_markdown(self) -> str:
+        encoding = detect_encoding(self.source_file)
+        with NamedTemporaryFile(suffix=".md", delete=False, mode="w", encoding="utf-8") as tmp_file:
+            try:
+                for chunk in iter_html_markdown(self.source_file, encoding):
+                    tmp_file.write(chunk)
+            except BaseException:
+                tmp_file.close()
+                os.remove(tmp_file.name)
+                raise
+            return tmp_file.name
+
+    def parse(self, mode: ParserMods = ParserMods.TO_TEXT):
+        if self.streams(mode):
+            try:
+                return self.stream(mode)
+            except UnsupportedHTML as e:
+                logger.debug(f"{Path(self.source_file).name}: streaming is not possible ({e}), using Docling")
+        return super().parse(mode)
+
+    def stream(self, mode: ParserMods):
+        """Выгрузить Markdown потоково; `UnsupportedHTML`, если нужен Docling."""
+        logger.debug(f"Streaming {self.source_file} to Markdown...")
+        if mode == ParserMods.TO_TEXT:
+            markdown = "".join(iter_html_markdown(self.source_file, detect_encoding(self.source_file)))
+        else:
+            markdown_path = self.write_markdown()
+        # Потоковый путь не строит `DoclingDocument`, класть в `DocumentCache` нечего.
+        self.cacheable = False
+        if mode == ParserMods.TO_TEXT:
+            return markdown
+        if mode == ParserMods.TO_FILE:
+            logger.success("File Saved!")
+            return markdown_path
+        try:
+            with NamedTemporaryFile(suffix=".docx", delete=False) as tmp_file:
+                pypandoc.convert_file(markdown_path, "docx", format="md", outputfile=tmp_file.name,
+                                      extra_args=['--standalone'])
+                return tmp_file.name
+        finally:
+            os.remove(markdown_path)
+
+    def build_document(self) -> DoclingDocument:
+        logger.debug(f"Parsing {self.source_file}...")
         self.set_converter_options()
-        doc = self.converter.convert(self.parser_params.file_path).document
+        doc = self.converter.convert(self.source_file).document
         logger.success(f"Document converted!")
-        for element, _level in doc.iterate_items():
-            if isinstance(element, TextItem):
-                element.orig = element.text
-                element.text = self.clean_text(text=element.text)
-                element.text = self.to_utf8(element.text)
-
-            elif isinstance(element, TableItem):
-                for cell in element.data.table_cells:
-                    cell.text = self.clean_text(text=cell.text)
-                    cell.text = self.to_utf8(cell.text)
-        logger.debug(f"Exctracting text from images...")
+        normalize_document(doc)
         if self.parser_params.parse_images:
-            for element, _level in doc.iterate_items():
-                if isinstance(element, PictureItem) or isinstance(element, TableItem):
-                    logger.success(f"Image or Table detected")
-                    image = element.get_image(doc)
-                    parser = ImageParser(image)
-                    parsed_text = parser.parse_image_for_element(image)
-                    doc.insert_text(element, text=parsed_text, orig=parsed_text, label=DocItemLabel.TEXT)
-        match mode:
-            case ParserMods.TO_FILE:
-                logger.debug("Saving to .md file")
-                with NamedTemporaryFile(suffix=".md", delete=False) as tmp_file:
-                    doc.save_as_markdown(filename=tmp_file.name,artifacts_dir=self.artifacts_path, image_mode=self.image_mode, page_break_placeholder=self.page_break_placeholder)
-                    logger.success("File Saved!")
-                    return tmp_file.name
-            case ParserMods.TO_TEXT:
-                markdown = doc.export_to_markdown(image_mode=self.image_mode, page_break_placeholder=self.page_break_placeholder)
-                return markdown
-            case ParserMods.TO_WORD:
-                artifacts_dir = Path(tempfile.mkdtemp(prefix="artifacts_"))
-                doc_with_refs = doc._make_copy_with_refmode(
-                                        reference_path=artifacts_dir,
-                                        artifacts_dir=artifacts_dir,
-                                        image_mode=self.image_mode,
-                                        page_no=None
-                                    )
-                markdown = doc_with_refs.export_to_markdown(image_mode=self.image_mode, 
-                                                page_break_placeholder=self.page_break_placeholder)
-                with NamedTemporaryFile(suffix=".docx", delete=False) as tmp_file:
-                    pypandoc.convert_text(markdown, 
-                "docx", 
-                format="md", 
-                outputfile=tmp_file.name,
-                extra_args=[
-                    '--standalone',
-                    f'--resource-path={artifacts_dir}'    
-                ])
-                    shutil.rmtree(artifacts_dir, ignore_errors=True)
-                    return tmp_file.name
-            case ParserMods.TO_DOCLING:
-                return doc
-            case _:
-                logger.error("Unknown parse mode!")
-                raise ValueError
\ No newline at end of file
+            ocr_pictures(doc)
+        return doc
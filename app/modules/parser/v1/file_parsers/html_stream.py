@@ -0,0 +1,351 @@
+"""Потоковая выгрузка HTML в Markdown без построения `DoclingDocument`.
+
+Файл декодируется блоками и разбирается `html.parser` из стандартной
+библиотеки; готовые блоки Markdown (абзацы, заголовки, пункты списков,
+таблицы, блоки кода) сразу отдаются вызывающему коду, поэтому в памяти
+держится только текущий блок или текущая таблица. Разметка повторяет
+выгрузку Docling: `<head>`, скрипты и стили пропускаются, ссылки выводятся как
+`[текст](href)`, `<b>`/`<i>`/`<code>` — как `**`/`*`/`` ` ``, `<br>` — пробелом,
+таблицы — `tabulate` с объединёнными ячейками, повторёнными по сетке,
+картинки — подписью из `alt` и `<!-- image -->`; в тексте вне кода
+экранируются `_` и HTML-символы, текст проходит `normalize_text`.
+
+В отличие от Docling, пробелы внутри абзаца схлопываются по правилам HTML, а
+переводы строк в исходном тексте не делят абзац. Вложенные таблицы и формулы
+MathML потоковый путь не обрабатывает: при их появлении разбор прерывается
+исключением `UnsupportedHTML`, и документ разбирает Docling.
+"""
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, Optional, Union
+import codecs
+import html
+import html.parser
+
+from tabulate import tabulate
+
+from modules.parser.v1.normalization import normalize_text
+
+STREAMABLE_SUFFIXES = {".html", ".htm", ".xhtml"}
+SKIPPED_TAGS = {"head", "title", "script", "style", "noscript", "template", "svg"}
+UNSUPPORTED_TAGS = {"math"}
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "header", "footer", "main", "nav", "aside", "blockquote",
+    "address", "center", "fieldset", "form", "figure", "figcaption", "dl", "dt", "dd", "hr", "body",
+}
+HEADING_TAGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+LIST_TAGS = {"ul", "ol"}
+FORMATTING_MARKS = {"b": "**", "strong": "**", "i": "*", "em": "*", "code": "`"}
+LIST_INDENT = "    "
+IMAGE_PLACEHOLDER = "<!-- image -->"
+CHUNK_BYTES = 1024 ** 2
+
+
+class UnsupportedHTML(Exception):
+    """В документе есть разметка, которую потоковый путь не переносит в Markdown."""
+
+
+@lru_cache(maxsize=65536)
+def clean_fragment(text: str) -> str:
+    return normalize_text(text)
+
+
+def escape_text(text: str) -> str:
+    return html.escape(text.replace("_", "\\_"), quote=False)
+
+
+def span(value: Optional[str]) -> int:
+    try:
+        return max(int(value), 1) if value else 1
+    except ValueError:
+        return 1
+
+
+class MarkdownConverter(html.parser.HTMLParser):
+    """Разбор HTML в блоки Markdown; готовые блоки копятся в `blocks` до `drain()`."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks: list[str] = []
+        self.has_output = False
+        self.previous_is_item = False
+        self.inline: list[str] = []
+        self.marks: list[tuple[str, int, Optional[str]]] = []
+        self.skip_depth = 0
+        self.pre_depth = 0
+        self.heading: Optional[int] = None
+        self.lists: list[list] = []  # [упорядоченный, номер следующего пункта]
+        self.item_prefix: Optional[str] = None
+        self.images: list[str] = []
+        self.table: Optional[dict] = None
+
+    def drain(self) -> list[str]:
+        blocks, self.blocks = self.blocks, []
+        return blocks
+
+    def emit(self, text: str, is_item: bool = False):
+        """Добавить блок; соседние пункты списка разделяются одним переводом строки."""
+        if self.has_output:
+            self.blocks.append("\n" if is_item and self.previous_is_item else "\n\n")
+        self.blocks.append(text)
+        self.has_output = True
+        self.previous_is_item = is_item
+
+    def inline_text(self) -> str:
+        text = " ".join("".join(self.inline).split())
+        self.inline = []
+        self.marks = []
+        return text
+
+    def flush(self):
+        text = self.inline_text()
+        if self.heading is not None:
+            if text:
+                self.emit("#" * self.heading + " " + text)
+        elif self.item_prefix is not None:
+            if text:
+                self.emit(self.item_prefix + text, is_item=True)
+                self.item_prefix = None
+        elif text:
+            self.emit(text)
+        for alt in self.images:
+            if alt:
+                self.emit(escape_text(clean_fragment(alt)))
+            self.emit(IMAGE_PLACEHOLDER)
+        self.images = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, Optional[str]]]):
+        if tag in UNSUPPORTED_TAGS:
+            raise UnsupportedHTML(f"<{tag}>")
+        if tag == "body":
+            # `</head>` часто не закрыт.
+            self.skip_depth = 0
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+        if self.skip_depth:
+            return
+        attributes = dict(attrs)
+        if self.table is not None:
+            self.table_starttag(tag, attributes)
+        elif tag == "table":
+            self.flush()
+            self.table = {"rows": [], "row": None, "cell": None, "spans": {}}
+        elif tag in HEADING_TAGS:
+            self.flush()
+            self.heading = HEADING_TAGS[tag]
+        elif tag in LIST_TAGS:
+            self.flush()
+            start = attributes.get("start")
+            self.lists.append([tag == "ol", int(start) if start and start.isdigit() else 1])
+        elif tag == "li":
+            self.flush()
+            self.item_prefix = self.list_prefix()
+        elif tag == "pre":
+            self.flush()
+            self.pre_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.flush()
+        elif tag == "br":
+            self.inline.append(" ")
+        elif tag == "img":
+            self.images.append(attributes.get("alt") or "")
+        elif not self.pre_depth and (tag in FORMATTING_MARKS or tag == "a"):
+            self.marks.append((tag, len(self.inline), attributes.get("href")))
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, Optional[str]]]):
+        self.handle_starttag(tag, attrs)
+        if tag not in ("br", "img", "hr"):
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str):
+        if self.skip_depth:
+            if tag in SKIPPED_TAGS:
+                self.skip_depth -= 1
+            return
+        if self.table is not None:
+            self.table_endtag(tag)
+        elif tag in HEADING_TAGS:
+            self.flush()
+            self.heading = None
+        elif tag in LIST_TAGS:
+            self.flush()
+            if self.lists:
+                self.lists.pop()
+            if not self.lists:
+                self.previous_is_item = False
+            self.item_prefix = None
+        elif tag == "li":
+            self.flush()
+            self.item_prefix = None
+        elif tag == "pre":
+            self.end_pre()
+        elif tag in BLOCK_TAGS:
+            self.flush()
+        elif self.marks and self.marks[-1][0] == tag:
+            self.close_mark()
+
+    def handle_data(self, data: str):
+        if self.skip_depth:
+            return
+        if self.table is not None:
+            if self.table["cell"] is not None:
+                self.table["cell"][0].append(data)
+            return
+        if self.pre_depth:
+            self.inline.append(data)
+        elif data.strip():
+            text = clean_fragment(data)
+            in_code = any(tag == "code" for tag, _, _ in self.marks)
+            self.inline.append(text if in_code else escape_text(text))
+        elif data and self.inline:
+            self.inline.append(" ")
+
+    def list_prefix(self) -> str:
+        if not self.lists:
+            return "- "
+        ordered, number = self.lists[-1]
+        indent = LIST_INDENT * (len(self.lists) - 1)
+        if not ordered:
+            return indent + "- "
+        self.lists[-1][1] += 1
+        return f"{indent}{number}. "
+
+    def close_mark(self):
+        tag, start, href = self.marks.pop()
+        raw = "".join(self.inline[start:])
+        del self.inline[start:]
+        inner = " ".join(raw.split())
+        if not inner:
+            return
+        lead = " " if raw[:1].isspace() else ""
+        trail = " " if raw[-1:].isspace() else ""
+        if tag == "a":
+            self.inline.append(f"{lead}[{inner}]({href}){trail}" if href else raw)
+        else:
+            mark = FORMATTING_MARKS[tag]
+            self.inline.append(f"{lead}{mark}{inner}{mark}{trail}")
+
+    def end_pre(self):
+        self.pre_depth = max(self.pre_depth - 1, 0)
+        if self.pre_depth:
+            return
+        code = clean_fragment("".join(self.inline).strip("\n"))
+        self.inline = []
+        self.marks = []
+        if code.strip():
+            self.emit(f"```\n{code}\n```")
+
+    def table_starttag(self, tag: str, attributes: dict):
+        table = self.table
+        if tag == "table":
+            raise UnsupportedHTML("nested table")
+        if tag == "tr":
+            self.end_cell()
+            self.end_row()
+            table["row"] = []
+        elif tag in ("td", "th"):
+            self.end_cell()
+            if table["row"] is None:
+                table["row"] = []
+            table["cell"] = ([], span(attributes.get("colspan")), span(attributes.get("rowspan")))
+        elif tag == "br" and table["cell"] is not None:
+            table["cell"][0].append(" ")
+
+    def table_endtag(self, tag: str):
+        if tag in ("td", "th"):
+            self.end_cell()
+        elif tag == "tr":
+            self.end_cell()
+            self.end_row()
+        elif tag == "table":
+            self.end_cell()
+            self.end_row()
+            self.end_table()
+
+    def end_cell(self):
+        table = self.table
+        if table["cell"] is None:
+            return
+        parts, colspan, rowspan = table["cell"]
+        table["cell"] = None
+        text = " ".join("".join(parts).split())
+        table["row"].append((clean_fragment(text), colspan, rowspan))
+
+    def end_row(self):
+        """Разложить ячейки строки по сетке с учётом `colspan` и `rowspan` строк выше."""
+        table = self.table
+        if table["row"] is None:
+            return
+        cells, table["row"] = table["row"], None
+        spans = table["spans"]
+        grid_row = []
+        column = 0
+        for text, colspan, rowspan in cells:
+            while column in spans:
+                grid_row.append(self.take_span(column))
+                column += 1
+            for _ in range(colspan):
+                grid_row.append(text)
+                if rowspan > 1:
+                    spans[column] = [text, rowspan - 1]
+                column += 1
+        while column in spans or any(key > column for key in spans):
+            grid_row.append(self.take_span(column) if column in spans else "")
+            column += 1
+        if grid_row:
+            table["rows"].append(grid_row)
+
+    def take_span(self, column: int) -> str:
+        spans = self.table["spans"]
+        text, remaining = spans[column]
+        if remaining > 1:
+            spans[column][1] -= 1
+        else:
+            del spans[column]
+        return text
+
+    def end_table(self):
+        rows = self.table["rows"]
+        self.table = None
+        if not rows:
+            return
+        width = max(len(row) for row in rows)
+        rows = [
+            [cell.replace("\n", " ").replace("|", "&#124;") for cell in row] + [""] * (width - len(row))
+            for row in rows
+        ]
+        try:
+            table_text = tabulate(rows[1:], headers=rows[0], tablefmt="github")
+        except ValueError:
+            table_text = tabulate(rows[1:], headers=rows[0], tablefmt="github", disable_numparse=True)
+        self.emit(table_text)
+
+    def close(self):
+        super().close()
+        if self.table is not None:
+            self.end_cell()
+            self.end_row()
+            self.end_table()
+        if self.pre_depth:
+            self.pre_depth = 1
+            self.end_pre()
+        self.flush()
+
+
+def iter_html_markdown(
+    file_path: Union[Path, str],
+    encoding: str,
+    chunk_bytes: int = CHUNK_BYTES,
+) -> Iterator[str]:
+    """Markdown документа фрагментами; `UnsupportedHTML`, если нужен Docling."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    converter = MarkdownConverter()
+    with open(file_path, "rb") as file:
+        while raw := file.read(chunk_bytes):
+            converter.feed(decoder.decode(raw))
+            if converter.blocks:
+                yield "".join(converter.drain())
+    converter.feed(decoder.decode(b"", final=True))
+    converter.close()
+    if converter.blocks:
+        yield "".join(converter.drain())
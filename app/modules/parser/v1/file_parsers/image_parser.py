@@ -1,12 +1,13 @@
-from typing import Optional, Union
+from typing import Callable, Optional, Union
 from pathlib import Path
-from PIL import Image
+from PIL import Image, ImageSequence
 from io import BytesIO
 import requests
 from uuid import uuid4
-from tempfile import NamedTemporaryFile
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
 
-import pypandoc
 from docling.pipeline.vlm_pipeline import VlmPipeline
 from docling.document_converter import DocumentConverter
 from docling.datamodel.pipeline_options import VlmPipelineOptions
@@ -17,8 +18,14 @@ from docling.backend.pypdfium2_backend import PyPdfiumDocumentBackend
 from docling.backend.image_backend import ImageDocumentBackend
 from loguru import logger
 from urllib3 import exceptions
+from docling_core.types.doc import DoclingDocument, DocItemLabel, PictureItem, TableItem
 
 from modules.parser.v1.abc.abc import ParserABC
+from modules.parser.v1.exporters import DocumentExporter
+from modules.parser.v1.cache import OCRCache, ocr_cache
+from modules.parser.v1.converters import get_converter
+from modules.parser.v1.preprocessing import prepare_image, preprocessing_signature
+from modules.parser.v1.vlm import VLMClient, get_vlm_client, markdown_to_document
 from settings import settings
 from modules.parser.v1.schemas import DocLingAPIVLMOptionsParams, ParserMods
 from modules.parser.v1.exceptions import ServiceUnavailable, TimeoutError
@@ -43,7 +50,7 @@ class ImageParser(ParserABC):
                                                 
                                                    )
         self.artifacts_path = settings.ARTIFACTS_PATH
-        self.converter = DocumentConverter()
+        self.converter = None
 
     def convert_image_to_bytes_io(self, image: Union[Path, str, Image.Image]):
         logger.debug(image)
@@ -106,49 +113,72 @@ class ImageParser(ParserABC):
         self.pipeline_options.vlm_options = self._openai_compatible_vlm_options(
                                                 prompt=prompt, format=ResponseFormat.MARKDOWN, max_tokens=settings.VLM_MAX_TOKENS
                                             )
-        self.converter = DocumentConverter(
-                            format_options={
-                                InputFormat.IMAGE: ImageFormatOption(
-                                    pipeline_options=self.pipeline_options,
-                                    backend=ImageDocumentBackend,
-                                    pipeline_cls=VlmPipeline
-                                )
-                            }
+        self.converter = get_converter(
+                            InputFormat.IMAGE,
+                            ImageFormatOption(
+                                pipeline_options=self.pipeline_options,
+                                backend=ImageDocumentBackend,
+                                pipeline_cls=VlmPipeline
+                            )
                         )
         
-    def parse(self, mode: ParserMods = ParserMods.TO_TEXT):
+    def build_document(self) -> DoclingDocument:
+        if not settings.VLM_DIRECT_CLIENT:
+            return self._build_document_with_docling()
         logger.debug("Parsing Image...")
-        self._set_converter_options()
-        try:
-            self.source_file = self.convert_image_to_bytes_io(self.source_file)
-            doc = self.converter.convert(self.source_file, raises_on_error=True)
-            converted = doc.document
-            markdown = converted.export_to_markdown()
-
+        client = get_vlm_client(self.vlm_base_url, self.vlm_model_name, self.vlm_api_key)
+        image = self.source_file if isinstance(self.source_file, Image.Image) else Image.open(self.source_file)
+        name = Path(self.source_file).name if isinstance(self.source_file, (Path, str)) else f"{uuid4()}.png"
+        source_path = self.source_file if isinstance(self.source_file, (Path, str)) else None
+        if getattr(image, "n_frames", 1) > 1:
+            source_path = None
+        page_docs = []
+        # Многостраничный TIFF распознаётся постранично, как в `ImageDocumentBackend`.
+        for page_no, frame in enumerate(ImageSequence.Iterator(image), start=1):
+            markdown = recognize_markdown(frame, self._get_prompt(), client, source_path)
             if not markdown.strip():
                 logger.error("VLM failed silently: returned empty markdown")
                 raise ServiceUnavailable("VLM", self.vlm_base_url)
-            logger.success("Document have been parsed!")
-            match mode:
-                case ParserMods.TO_FILE:
-                    logger.debug("Saving to .md file")
-                    with NamedTemporaryFile(suffix=".md", delete=False) as tmp_file:
-                        converted.save_as_markdown(filename=tmp_file.name,artifacts_dir=self.artifacts_path)
-                        logger.success("File Saved!")
-                        return tmp_file.name
-                case ParserMods.TO_TEXT:
-                    markdown = converted.export_to_markdown()
-                    return markdown
-                case ParserMods.TO_WORD:
-                    markdown = converted.export_to_markdown()
-                    with NamedTemporaryFile(suffix=".docx", delete=False) as tmp_file:
-                        pypandoc.convert_text(markdown, "docx", "md", outputfile=tmp_file.name)
-                        return tmp_file.name
-                case ParserMods.TO_DOCLING:
-                    return converted
-                case _:
-                    logger.error("Unknown parse mode!")
-                    raise ValueError
+            page_docs.append(markdown_to_document(markdown, name, page_no=page_no, page_size=frame.size))
+        logger.success("Document have been parsed!")
+        return page_docs[0] if len(page_docs) == 1 else DoclingDocument.concatenate(docs=page_docs)
+
+    def _build_document_with_docling(self) -> DoclingDocument:
+        logger.debug("Parsing Image with Docling VlmPipeline...")
+        self._set_converter_options()
+        image = self.source_file if isinstance(self.source_file, Image.Image) else Image.open(self.source_file)
+        name = Path(self.source_file).name if isinstance(self.source_file, (Path, str)) else f"{uuid4()}.png"
+        self.source_file = self.convert_image_to_bytes_io(self.source_file)
+        converted = None
+
+        def convert() -> str:
+            nonlocal converted
+            with _worker_ocr_slots:
+                converted = self.converter.convert(self.source_file, raises_on_error=True).document
+            return converted.export_to_markdown()
+
+        if getattr(image, "n_frames", 1) > 1:
+            # Ключ `OCRCache` строится по одному кадру, многостраничный TIFF не кэшируется.
+            markdown = convert()
+        else:
+            fingerprint = OCRCache.request_fingerprint(
+                self._get_prompt(), self.vlm_model_name, settings.VLM_MAX_TOKENS, variant="docling"
+            )
+            markdown = cached_ocr(image, fingerprint, convert)
+
+        if not markdown.strip():
+            logger.error("VLM failed silently: returned empty markdown")
+            raise ServiceUnavailable("VLM", self.vlm_base_url)
+        logger.success("Document have been parsed!")
+        return converted if converted is not None else markdown_to_document(markdown, name, page_size=image.size)
+
+    @property
+    def exporter(self) -> DocumentExporter:
+        return DocumentExporter(artifacts_dir=self.artifacts_path)
+
+    def parse(self, mode: ParserMods = ParserMods.TO_TEXT):
+        try:
+            return self.export(self.build_document(), mode)
         except requests.exceptions.ConnectionError as e:
             logger.error(f"VLM is not available: {e}")
             raise ServiceUnavailable("VLM", settings.VLM_BASE_URL)
@@ -176,7 +206,87 @@ class ImageParser(ParserABC):
             parsed_text = ImageParser(image).parse()
         except TimeoutError as e:
             logger.warning("Timeout error on image parsing...")
+            parsed_text = "*При парсинге изображения возникла задержка сети*"
         except Exception as e:
             logger.error(f"Error while parsing element: {e}")
             parsed_text = "*При парсинге изображения возникла задержка сети*"
-        return parsed_text
\ No newline at end of file
+        return parsed_text
+
+
+# Общий для всех документов процесса предел одновременных запросов к VLM:
+# картинки, страницы PDF и изображения берут слот на время одного запроса.
+_worker_ocr_slots = threading.BoundedSemaphore(max(1, settings.PICTURE_OCR_WORKER_CONCURRENCY))
+
+
+def cached_ocr(image: Image.Image, fingerprint: str, recognize: Callable[[], str]) -> str:
+    """Взять Markdown изображения из `OCRCache` или распознать его `recognize()`.
+
+    Пустые ответы не кэшируются.
+    """
+    if settings.OCR_CACHE_ENABLED:
+        cached = ocr_cache.get_text(image, fingerprint)
+        if cached is not None:
+            logger.debug("OCR result taken from cache")
+            return cached
+    markdown = recognize()
+    if settings.OCR_CACHE_ENABLED and markdown.strip():
+        try:
+            ocr_cache.put_text(image, fingerprint, markdown)
+        except Exception as e:
+            logger.warning(f"Failed to store OCR result in cache: {e}")
+    return markdown
+
+
+def recognize_markdown(
+    image: Image.Image,
+    prompt: str,
+    client: VLMClient,
+    source_path: Optional[Union[Path, str]] = None,
+) -> str:
+    """Распознать одно изображение через VLM с учётом `OCRCache`.
+
+    Ключ кэша строится по пикселям исходного изображения, промпту, модели,
+    `VLM_MAX_TOKENS` и параметрам предобработки.
+    """
+    fingerprint = OCRCache.request_fingerprint(
+        prompt, client.model_name, settings.VLM_MAX_TOKENS, variant=preprocessing_signature()
+    )
+
+    def recognize() -> str:
+        prepared = prepare_image(image, source_path)
+        with _worker_ocr_slots:
+            return client.recognize(prepared.image_bytes, prepared.mime_type, prompt, max_tokens=settings.VLM_MAX_TOKENS)
+
+    return cached_ocr(image, fingerprint, recognize)
+
+
+def _ocr_picture(image: Image) -> str:
+    return ImageParser(image).parse_image_for_element(image)
+
+
+def ocr_pictures(doc: DoclingDocument):
+    """Распознать встроенные изображения и таблицы документа через VLM.
+
+    Сначала собираются все изображения, затем они отправляются в VLM
+    параллельно — не больше `PICTURE_OCR_CONCURRENCY` на документ и
+    `PICTURE_OCR_WORKER_CONCURRENCY` на процесс. Распознанный текст
+    вставляется сразу после своего элемента, порядок документа сохраняется.
+    """
+    pictures = []
+    for element, _level in doc.iterate_items():
+        if isinstance(element, (PictureItem, TableItem)):
+            image = element.get_image(doc)
+            if image is None:
+                logger.warning(f"No image for {element.self_ref}, skipping")
+                continue
+            pictures.append((element, image))
+    if not pictures:
+        return
+    concurrency = max(1, min(settings.PICTURE_OCR_CONCURRENCY, len(pictures)))
+    logger.debug(f"Extracting text from {len(pictures)} images ({concurrency} concurrent)...")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="picture-ocr") as executor:
+        texts = list(executor.map(_ocr_picture, [image for _, image in pictures]))
+    for (element, _), text in zip(pictures, texts):
+        doc.insert_text(element, text=text, orig=text, label=DocItemLabel.TEXT)
+    logger.success(f"{len(pictures)} images parsed in {time.perf_counter() - started:.2f}s")
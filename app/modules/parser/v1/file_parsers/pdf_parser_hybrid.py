@@ -0,0 +1,117 @@
+from itertools import groupby
+from pathlib import Path
+from typing import Optional
+import time
+import unicodedata
+
+import pypdfium2
+from loguru import logger
+from docling_core.types.doc import DoclingDocument
+
+from modules.parser.v1.file_parsers.image_parser import ocr_pictures
+from modules.parser.v1.file_parsers.pdf_parser import PDFParser
+from modules.parser.v1.file_parsers.pdf_parser_vlm import PDFVLMParser
+from modules.parser.v1.schemas import ParserParams
+from settings import settings
+
+# Категории Unicode, которых не бывает в нормальном текстовом слое: служебные,
+# неназначенные и области частного использования (битые ToUnicode-таблицы).
+GARBLED_CATEGORIES = {"Cc", "Cn", "Co", "Cs"}
+
+
+def garbled_ratio(text: str) -> float:
+    chars = [char for char in text if not char.isspace()]
+    if not chars:
+        return 0.0
+    garbled = sum(1 for char in chars if char == "\ufffd" or unicodedata.category(char) in GARBLED_CATEGORIES)
+    return garbled / len(chars)
+
+
+def page_needs_vlm(page: pypdfium2.PdfPage) -> bool:
+    """Нужен ли странице VLM: мало текста, текст занимает малую долю страницы или он битый."""
+    textpage = page.get_textpage()
+    try:
+        text = textpage.get_text_range()
+        char_count = len(text.strip())
+        if char_count < settings.PDF_HYBRID_MIN_CHARS:
+            return True
+        width, height = page.get_size()
+        text_area = 0.0
+        for index in range(textpage.count_rects()):
+            left, bottom, right, top = textpage.get_rect(index)
+            text_area += max(0.0, right - left) * max(0.0, top - bottom)
+        if width * height > 0 and text_area / (width * height) < settings.PDF_HYBRID_MIN_TEXT_COVERAGE:
+            return True
+        return garbled_ratio(text) > settings.PDF_HYBRID_MAX_GARBLED_RATIO
+    finally:
+        textpage.close()
+
+
+def find_vlm_pages(file_path, page_range: tuple[int, int]) -> tuple[list[int], list[int]]:
+    """Разделить страницы диапазона на страницы с текстовым слоем и страницы для VLM."""
+    pdf = pypdfium2.PdfDocument(str(file_path))
+    try:
+        last_page = min(page_range[1], len(pdf))
+        text_pages, vlm_pages = [], []
+        for page_no in range(page_range[0], last_page + 1):
+            page = pdf[page_no - 1]
+            try:
+                (vlm_pages if page_needs_vlm(page) else text_pages).append(page_no)
+            finally:
+                page.close()
+        return text_pages, vlm_pages
+    finally:
+        pdf.close()
+
+
+def contiguous_ranges(page_numbers: list[int]) -> list[tuple[int, int]]:
+    ranges = []
+    for _, group in groupby(enumerate(page_numbers), key=lambda item: item[1] - item[0]):
+        pages = [page_no for _, page_no in group]
+        ranges.append((pages[0], pages[-1]))
+    return ranges
+
+
+class PDFHybridParser(PDFParser):
+    """PDF со смешанным содержимым: текстовый слой — Docling, сканы — VLM.
+
+    Каждая страница сначала проверяется по текстовому слою pypdfium2
+    (количество символов, доля площади страницы под текстом, доля битых
+    символов). Страницы с нормальным текстом разбираются стандартным
+    пайплайном `PDFParser` смежными диапазонами, остальные распознаются
+    постранично через `PDFVLMParser`. Результаты склеиваются в порядке страниц.
+    """
+
+    def __init__(self, parser_params: ParserParams, page_range: Optional[tuple[int, int]] = None):
+        super().__init__(parser_params, page_range=page_range)
+        self.vlm_parser = PDFVLMParser(self.source_file)
+
+    def build_document(self) -> DoclingDocument:
+        started = time.perf_counter()
+        text_pages, vlm_pages = find_vlm_pages(self.source_file, self.page_range)
+        logger.info(
+            f"{Path(self.source_file).name}: {len(text_pages)} pages with text layer, {len(vlm_pages)} pages for VLM "
+            f"(checked in {time.perf_counter() - started:.2f}s)"
+        )
+        if not vlm_pages:
+            return super().build_document()
+
+        parts = [(page_from, self.convert_pages((page_from, page_to))) for page_from, page_to in contiguous_ranges(text_pages)]
+        if self.parser_params.parse_images:
+            for _, doc in parts:
+                ocr_pictures(doc)
+
+        results = self.vlm_parser.recognize_pages(vlm_pages)
+        errors = [error for _, _, _, error in results if error is not None]
+        if errors and not text_pages and len(errors) == len(results):
+            raise errors[0]
+        page_docs = self.vlm_parser.page_documents(results)
+        if not self.vlm_parser.cacheable:
+            self.cacheable = False
+        parts += [(page_no, page_doc) for (page_no, _, _, _), page_doc in zip(results, page_docs)]
+
+        parts.sort(key=lambda part: part[0])
+        doc = DoclingDocument.concatenate(docs=[part_doc for _, part_doc in parts])
+        doc.name = Path(self.source_file).stem
+        logger.success(f"Hybrid document converted in {time.perf_counter() - started:.2f}s")
+        return doc
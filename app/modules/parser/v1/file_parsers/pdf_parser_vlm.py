@@ -1,9 +1,11 @@
 from pathlib import Path
 from typing import Optional, Union
-from tempfile import NamedTemporaryFile
+from concurrent.futures import ThreadPoolExecutor
 import json
+import threading
+import time
 
-import pypandoc
+import pypdfium2
 from loguru import logger
 from docling.document_converter import DocumentConverter
 from docling.datamodel.base_models import InputFormat
@@ -18,9 +20,14 @@ from docling.document_converter import (
 )
 from docling.utils.deepseekocr_utils import parse_deepseekocr_markdown
 from docling.pipeline.vlm_pipeline import VlmPipeline
+from docling_core.types.doc import DoclingDocument
 
-from modules.parser.v1.file_parsers.image_parser import ImageParser
+from modules.parser.v1.file_parsers.image_parser import ImageParser, recognize_markdown
 from modules.parser.v1.abc.abc import ParserABC
+from modules.parser.v1.exporters import DocumentExporter
+from modules.parser.v1.converters import get_converter
+from modules.parser.v1.utils import get_pdf_page_count
+from modules.parser.v1.vlm import get_vlm_client, markdown_to_document
 from modules.parser.v1.schemas import ParserParams, ParserMods
 from settings import settings
 from modules.parser.v1.schemas import DocLingAPIVLMOptionsParams, ParserMods
@@ -43,7 +50,7 @@ class PDFVLMParser(ParserABC):
                                                    do_picture_description=False
                                                    )
         self.artifacts_path = settings.ARTIFACTS_PATH
-        self.converter = DocumentConverter()
+        self.converter = None
 
     def _openai_compatible_vlm_options(
                         self,
@@ -76,11 +83,10 @@ class PDFVLMParser(ParserABC):
         self.pipeline_options.vlm_options = self._openai_compatible_vlm_options(
                                                 prompt=prompt, format=ResponseFormat.MARKDOWN, max_tokens=settings.VLM_MAX_TOKENS
                                             )
-        self.converter = DocumentConverter(format_options={
-                InputFormat.PDF: PdfFormatOption(
+        self.converter = get_converter(InputFormat.PDF,
+                PdfFormatOption(
                     pipeline_options=self.pipeline_options,                           
-                    pipeline_cls=VlmPipeline)
-                })
+                    pipeline_cls=VlmPipeline))
     
     def _get_prompt(self):
         prompt = """
@@ -103,8 +109,84 @@ class PDFVLMParser(ParserABC):
                  """
         return prompt
     
-    def parse(self, mode: ParserMods):
-        logger.debug(f"Parsing {self.source_file}...")
+    def recognize_pages(self, page_numbers: list[int]) -> list[tuple[int, Optional[str], tuple[float, float], Optional[Exception]]]:
+        """Растеризовать и распознать страницы `page_numbers` (с 1) параллельно.
+
+        Возвращает `(номер, markdown, размер страницы, ошибка)` в порядке
+        `page_numbers`; ошибка страницы не прерывает остальные.
+        """
+        client = get_vlm_client(self.vlm_base_url, self.vlm_model_name, self.vlm_api_key)
+        prompt = self._get_prompt()
+        name = Path(self.source_file).name
+        pdf = pypdfium2.PdfDocument(str(self.source_file))
+        # PDFium не потокобезопасен: растеризация идёт под блокировкой, параллельны только запросы к VLM.
+        render_lock = threading.Lock()
+
+        def recognize_page(page_no: int):
+            with render_lock:
+                page = pdf[page_no - 1]
+                page_size = page.get_size()
+                image = page.render(scale=settings.PDF_VLM_RENDER_SCALE).to_pil()
+                page.close()
+            try:
+                return page_no, recognize_markdown(image, prompt, client), page_size, None
+            except Exception as e:
+                logger.error(f"Page {page_no} of {name} failed: {e}")
+                return page_no, None, page_size, e
+
+        try:
+            concurrency = max(1, min(settings.PDF_VLM_PAGE_CONCURRENCY, len(page_numbers)))
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="pdf-vlm") as executor:
+                return list(executor.map(recognize_page, page_numbers))
+        finally:
+            pdf.close()
+
+    def page_documents(self, results: list[tuple[int, Optional[str], tuple[float, float], Optional[Exception]]]) -> list[DoclingDocument]:
+        """Собрать документ на каждую страницу; не распознанные страницы помечаются в тексте.
+
+        Если такие страницы есть, парсер помечается как `cacheable = False`.
+        """
+        name = Path(self.source_file).name
+        page_docs = []
+        failed_pages = []
+        for page_no, markdown, page_size, error in results:
+            if error is not None:
+                failed_pages.append(page_no)
+                markdown = f"*Страница {page_no} не распознана: {error.__class__.__name__}*"
+            elif not markdown.strip():
+                logger.warning(f"VLM returned empty markdown for page {page_no} of {name}")
+            page_docs.append(markdown_to_document(markdown, name, page_no=page_no, page_size=page_size))
+        if failed_pages:
+            self.cacheable = False
+            logger.warning(f"{name}: pages {failed_pages} failed, returning partial result")
+        return page_docs
+
+    def build_document(self) -> DoclingDocument:
+        """Распознать PDF постранично.
+
+        Страницы растеризуются pypdfium2 и отправляются в VLM параллельно, не
+        больше `PDF_VLM_PAGE_CONCURRENCY` одновременно. Markdown каждой
+        готовой страницы сохраняется в `OCRCache`, поэтому повторный запрос
+        того же файла распознаёт только страницы, которые не удались. Если
+        часть страниц не распознана, возвращается документ с пометками на их
+        месте, и он не попадает в кэш документов.
+        """
+        if not settings.VLM_DIRECT_CLIENT:
+            return self._build_document_with_docling()
+        logger.debug(f"Parsing {self.source_file} page by page...")
+        started = time.perf_counter()
+        results = self.recognize_pages(list(range(1, get_pdf_page_count(self.source_file) + 1)))
+        if not results:
+            return DoclingDocument(name=Path(self.source_file).stem)
+        errors = [error for _, _, _, error in results if error is not None]
+        if errors and len(errors) == len(results):
+            raise errors[0]
+        doc = DoclingDocument.concatenate(docs=self.page_documents(results))
+        logger.success(f"Document converted in {time.perf_counter() - started:.2f}s ({len(results)} pages)")
+        return doc
+
+    def _build_document_with_docling(self) -> DoclingDocument:
+        logger.debug(f"Parsing {self.source_file} with Docling VlmPipeline...")
         self.set_converter_options()
         doc = self.converter.convert(self.source_file, raises_on_error=True).document
         markdown = doc.export_to_markdown()
@@ -112,27 +194,10 @@ class PDFVLMParser(ParserABC):
         if not markdown.strip():
             logger.error("VLM failed silently: returned empty markdown")
         logger.success(f"Document converted!")
-        logger.debug("Cleaning documents")
-
-        match mode:
-            case ParserMods.TO_FILE:
-                logger.debug("Saving to .md file")
-                with NamedTemporaryFile(suffix=".md", delete=False) as tmp_file:
-                    doc.save_as_markdown(filename=tmp_file.name,artifacts_dir=self.artifacts_path)
-                    logger.success("File Saved!")
-                    return tmp_file.name
-            case ParserMods.TO_TEXT:
-                markdown = doc.export_to_markdown()
-                return markdown
-            case ParserMods.TO_DOCLING:
-                return doc
-            case ParserMods.TO_WORD:
-                markdown = doc.export_to_markdown()
-                with NamedTemporaryFile(suffix=".docx", delete=False) as tmp_file:
-                    pypandoc.convert_text(markdown, "docx", "md", outputfile=tmp_file.name)
-                    return tmp_file.name
-            case _:
-                logger.error("Unknown parse mode!")
-                raise ValueError
+        return doc
+
+    @property
+    def exporter(self) -> DocumentExporter:
+        return DocumentExporter(artifacts_dir=self.artifacts_path)
 
         
@@ -1,20 +1,154 @@
-import asyncio
 from pathlib import Path
 from tempfile import NamedTemporaryFile
+from typing import Iterator, Optional, Union
+import codecs
+import mmap
+import os
 
+import chardet
+import pypandoc
 from loguru import logger
+from docling_core.types.doc import DocItemLabel, DoclingDocument
 
+from settings import settings
 from modules.parser.v1.abc.abc import ParserABC
+from modules.parser.v1.docx_writer import export_to_word
+from modules.parser.v1.normalization import normalize_text
 from modules.parser.v1.schemas import ParserParams, ParserMods
-from modules.parser.v1.utils import read_file_content
+
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+FALLBACK_ENCODING = "cp1251"
+
+
+def detect_encoding(file_path: Union[Path, str], sample_bytes: int = settings.TXT_ENCODING_SAMPLE_BYTES) -> str:
+    """Определить кодировку по первым `sample_bytes` байтам файла.
+
+    BOM определяет кодировку сразу; выборка, которая декодируется как UTF-8
+    (обрезанный на границе многобайтовый символ допускается), считается UTF-8;
+    иначе кодировку угадывает `chardet` по той же выборке.
+    """
+    with open(file_path, "rb") as file:
+        sample = file.read(sample_bytes)
+        is_complete = not file.read(1)
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=is_complete)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    detected = chardet.detect(sample)
+    encoding = detected.get("encoding")
+    try:
+        return codecs.lookup(encoding).name if encoding else FALLBACK_ENCODING
+    except LookupError:
+        logger.warning(f"Unknown encoding \"{encoding}\" detected, using {FALLBACK_ENCODING}")
+        return FALLBACK_ENCODING
+
+
+def iter_file_bytes(file_path: Union[Path, str], chunk_bytes: int) -> Iterator[bytes]:
+    """Читать файл блоками; файлы от `TXT_MMAP_MIN_BYTES` читаются через `mmap`."""
+    size = os.path.getsize(file_path)
+    with open(file_path, "rb") as file:
+        if size == 0:
+            return
+        if settings.TXT_MMAP_MIN_BYTES <= 0 or size < settings.TXT_MMAP_MIN_BYTES:
+            while chunk := file.read(chunk_bytes):
+                yield chunk
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(0, size, chunk_bytes):
+                yield mapped[offset:offset + chunk_bytes]
+
+
+def iter_text_chunks(
+    file_path: Union[Path, str],
+    encoding: str,
+    chunk_bytes: int = settings.TXT_CHUNK_BYTES,
+) -> Iterator[str]:
+    """Декодировать файл по блокам и нормализовать каждый блок.
+
+    Блоки режутся по последнему переводу строки, поэтому нормализация не
+    видит разорванных строк (`\\r\\n`, `/uniXXXX`, mojibake). Строка длиннее
+    блока отдаётся частями. В памяти одновременно находится не больше двух блоков.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    tail = ""
+    for raw in iter_file_bytes(file_path, chunk_bytes):
+        text = tail + decoder.decode(raw)
+        cut = text.rfind("\n") + 1
+        if cut == 0 and len(text) < chunk_bytes:
+            tail = text
+            continue
+        if cut == 0:
+            cut = len(text)
+        tail = text[cut:]
+        yield normalize_text(text[:cut])
+    text = tail + decoder.decode(b"", final=True)
+    if text:
+        yield normalize_text(text)
 
 
 class TXTParser(ParserABC):
+    cacheable = False
+
     def __init__(self, parser_params: ParserParams):
         super().__init__(parser_params)
+        self.encoding: Optional[str] = None
+
+    def iter_chunks(self) -> Iterator[str]:
+        """Нормализованный текст файла блоками по `TXT_CHUNK_BYTES`."""
+        if self.encoding is None:
+            self.encoding = detect_encoding(self.source_file)
+            logger.debug(f"{Path(self.source_file).name}: detected encoding {self.encoding}")
+        yield from iter_text_chunks(self.source_file, self.encoding)
+
+    def write_markdown(self) -> str:
+        with NamedTemporaryFile(suffix=".md", delete=False, mode="w", encoding="utf-8") as tmp_file:
+            for chunk in self.iter_chunks():
+                tmp_file.write(chunk)
+            return tmp_file.name
+
+    def build_document(self) -> DoclingDocument:
+        doc = DoclingDocument(name=Path(self.source_file).stem)
+        paragraph = []
+        for chunk in self.iter_chunks():
+            for line in chunk.splitlines():
+                if line.strip():
+                    paragraph.append(line)
+                elif paragraph:
+                    doc.add_text(label=DocItemLabel.TEXT, text="\n".join(paragraph))
+                    paragraph = []
+        if paragraph:
+            doc.add_text(label=DocItemLabel.TEXT, text="\n".join(paragraph))
+        return doc
 
-    
-    def parse(self, mode: ParserMods):
+    def parse(self, mode: ParserMods = ParserMods.TO_TEXT):
         logger.debug(f"Parsing {self.source_file}...")
-        file_content = read_file_content(self.parser_params.file_path)
-        return file_content
\ No newline at end of file
+        match mode:
+            case ParserMods.TO_TEXT:
+                return "".join(self.iter_chunks())
+            case ParserMods.TO_FILE:
+                return self.write_markdown()
+            case ParserMods.TO_DOCLING:
+                return self.build_document()
+            case ParserMods.TO_WORD:
+                if settings.WORD_EXPORT_ENGINE != "pandoc":
+                    return export_to_word(self.build_document())
+                markdown_path = self.write_markdown()
+                try:
+                    with NamedTemporaryFile(suffix=".docx", delete=False) as tmp_file:
+                        pypandoc.convert_file(markdown_path, "docx", format="md", outputfile=tmp_file.name)
+                        return tmp_file.name
+                finally:
+                    os.remove(markdown_path)
+            case _:
+                logger.error("Unknown parse mode!")
+                raise ValueError
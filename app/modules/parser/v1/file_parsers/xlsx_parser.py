@@ -1,97 +1,107 @@
+from functools import cached_property
 from pathlib import Path
+from typing import Optional
 from tempfile import NamedTemporaryFile
+import os
 import tempfile
 import shutil
 
-import pypandoc
 from docling.document_converter import DocumentConverter, ExcelFormatOption
 from docling.datamodel.pipeline_options import PipelineOptions, PaginatedPipelineOptions
 from docling.document_converter import DocumentConverter, PowerpointFormatOption
 from docling.datamodel.base_models import  InputFormat
+from docling.datamodel.backend_options import MsExcelBackendOptions
 from loguru import logger
 from docling_core.types.doc import (
-    ImageRef, PictureItem, TableItem, ImageRefMode, TextItem, DocItemLabel, TableData
+    ImageRef, PictureItem, TableItem, ImageRefMode, TextItem, DocItemLabel, TableData, DoclingDocument
 )
 
 
-from modules.parser.v1.file_parsers.image_parser import ImageParser
+from settings import settings
+from modules.parser.v1.file_parsers.image_parser import ImageParser, ocr_pictures
+from modules.parser.v1.file_parsers.xlsx_stream import docling_required_reason, iter_workbook_markdown
 from modules.parser.v1.abc.abc import ParserABC
+from modules.parser.v1.normalization import normalize_document
+from modules.parser.v1.converters import get_converter
+from modules.parser.v1.profiles import paginated_pipeline_options
 from modules.parser.v1.schemas import ParserParams, ParserMods
+from modules.parser.v1.utils import write_xlsx_sheet_subset
 
 
 class XLSXParser(ParserABC):
-    def __init__(self, parser_params: ParserParams):
+    def __init__(self, parser_params: ParserParams, sheet_names: Optional[list[str]] = None):
         super().__init__(parser_params)
-        self.converter = DocumentConverter()
-        self.pipeline_options = PaginatedPipelineOptions(artifacts_path=self.artifacts_path,
-                                                         generate_page_images=True,
-                                                         generate_picture_images=True)
+        self.sheet_names = sheet_names
+        self.pipeline_options = paginated_pipeline_options(self.parser_params, self.artifacts_path)
+        self.backend_options = MsExcelBackendOptions(sheet_names=sheet_names)
 
     def set_converter_options(self):
-        self.converter = DocumentConverter(format_options={
-                InputFormat.XLSX: ExcelFormatOption(pipeline_options=self.pipeline_options)
-                })
+        format_option = ExcelFormatOption(pipeline_options=self.pipeline_options, backend_options=self.backend_options)
+        if self.sheet_names is None:
+            self.converter = get_converter(InputFormat.XLSX, format_option)
+        else:
+            # Конвертер Excel дешёвый, а наборы листов у шардов разные: не вытесняем
+            # ими из `converter_cache` конвертеры PDF с загруженными моделями.
+            self.converter = DocumentConverter(format_options={InputFormat.XLSX: format_option})
+
+    def convert_sheets(self) -> DoclingDocument:
+        """Сконвертировать только `sheet_names`: Docling читает книгу целиком, поэтому
+        остальные листы в копии книги заменяются пустыми."""
+        subset_dir = Path(tempfile.mkdtemp(prefix="sheets_"))
+        try:
+            subset_path = subset_dir / Path(self.source_file).name
+            write_xlsx_sheet_subset(self.source_file, subset_path, self.sheet_names)
+            doc = self.converter.convert(subset_path).document
+        finally:
+            shutil.rmtree(subset_dir, ignore_errors=True)
+        doc.name = Path(self.source_file).stem
+        return doc
+
+    @cached_property
+    def streamable(self) -> bool:
+        """Можно ли выгрузить Markdown потоково, минуя Docling (см. `xlsx_stream`)."""
+        if not settings.XLSX_STREAM_ENABLED or self.parser_params.parse_images or self.parser_params.include_image_in_output:
+            return False
+        if os.path.getsize(self.source_file) < settings.XLSX_STREAM_MIN_BYTES:
+            return False
+        reason = docling_required_reason(self.source_file)
+        if reason is not None:
+            logger.debug(f"{Path(self.source_file).name}: streaming is not possible ({reason}), using Docling")
+            return False
+        return True
+
+    def streams(self, mode: ParserMods) -> bool:
+        return mode in (ParserMods.TO_TEXT, ParserMods.TO_FILE) and self.streamable
+
+    def parse(self, mode: ParserMods = ParserMods.TO_TEXT):
+        if self.streams(mode):
+            return self.stream(mode)
+        return super().parse(mode)
+
+    def stream(self, mode: ParserMods):
+        logger.debug(f"Streaming {self.source_file} to Markdown...")
+        # Потоковый путь не строит `DoclingDocument`, класть в `DocumentCache` нечего.
+        self.cacheable = False
+        chunks = iter_workbook_markdown(self.source_file, self.page_break_placeholder, self.sheet_names)
+        if mode == ParserMods.TO_TEXT:
+            return "".join(chunks)
+        with NamedTemporaryFile(suffix=".md", delete=False, mode="w", encoding="utf-8") as tmp_file:
+            for chunk in chunks:
+                tmp_file.write(chunk)
+            logger.success("File Saved!")
+            return tmp_file.name
         
-    def parse(self, mode: ParserMods):
+    def build_document(self) -> DoclingDocument:
         logger.debug(f"Parsing {self.source_file}...")
         self.set_converter_options()
-        doc = self.converter.convert(self.source_file).document
+        if self.sheet_names is None:
+            doc = self.converter.convert(self.source_file).document
+        else:
+            doc = self.convert_sheets()
         logger.success(f"Document converted!")
-        for element, _level in doc.iterate_items():
-            logger.debug("Cleaning text and converting to utf-8")
-            if isinstance(element, TextItem):
-                element.orig = element.text
-                element.text = self.clean_text(text=element.text)
-                element.text = self.to_utf8(element.text)
-
-            elif isinstance(element, TableItem):
-                for cell in element.data.table_cells:
-                    cell.text = self.clean_text(text=cell.text)
-                    cell.text = self.to_utf8(cell.text)
+        normalize_document(doc)
 
-        logger.debug(f"Exctracting text from images...")
         if self.parser_params.parse_images:
-            for element, _level in doc.iterate_items():
-                if isinstance(element, PictureItem) or isinstance(element, TableItem):
-                    logger.success(f"Image or Table detected")
-                    image = element.get_image(doc)
-                    parser = ImageParser(image)
-                    parsed_text = parser.parse_image_for_element(image)
-                    doc.insert_text(element, text=parsed_text, orig=parsed_text, label=DocItemLabel.TEXT)
+            ocr_pictures(doc)
 
-        match mode:
-            case ParserMods.TO_FILE:
-                logger.debug("Saving to .md file")
-                with NamedTemporaryFile(suffix=".md", delete=False) as tmp_file:
-                    doc.save_as_markdown(filename=tmp_file.name,artifacts_dir=self.artifacts_path, image_mode=self.image_mode, page_break_placeholder=self.page_break_placeholder)
-                    logger.success("File Saved!")
-                    return tmp_file.name
-            case ParserMods.TO_TEXT:
-                markdown = doc.export_to_markdown(image_mode=self.image_mode, page_break_placeholder=self.page_break_placeholder)
-                return markdown
-            case ParserMods.TO_WORD:
-                artifacts_dir = Path(tempfile.mkdtemp(prefix="artifacts_"))
-                doc_with_refs = doc._make_copy_with_refmode(
-                                        reference_path=artifacts_dir,
-                                        artifacts_dir=artifacts_dir,
-                                        image_mode=self.image_mode,
-                                        page_no=None
-                                    )
-                markdown = doc_with_refs.export_to_markdown(image_mode=self.image_mode, 
-                                                page_break_placeholder=self.page_break_placeholder)
-                with NamedTemporaryFile(suffix=".docx", delete=False) as tmp_file:
-                    pypandoc.convert_text(markdown, 
-                "docx", 
-                format="md", 
-                outputfile=tmp_file.name,
-                extra_args=[
-                    '--standalone',
-                    f'--resource-path={artifacts_dir}'    
-                ])
-                    shutil.rmtree(artifacts_dir, ignore_errors=True)
-                    return tmp_file.name
-            case ParserMods.TO_DOCLING:
-                return doc
-            case _:
-                logger.error("Unknown parse mode!")
-                raise ValueError
+        return doc
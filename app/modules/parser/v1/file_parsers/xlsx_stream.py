@@ -0,0 +1,159 @@
+"""Потоковая выгрузка XLSX в Markdown без построения `DoclingDocument`.
+
+Строки читаются `openpyxl` в режиме read-only и сразу пишутся в Markdown-
+таблицы, поэтому память не растёт с размером книги. Разметка повторяет
+выгрузку Docling: скрытые листы пропускаются, таблица — непрерывный блок
+непустых строк листа, первая строка блока — заголовок, `|` и переводы строк
+в ячейках экранируются, текст ячеек проходит `normalize_text`. Листы
+разделяются `page_break_placeholder`.
+
+В отличие от Docling, таблицы не ищутся заливкой: блоки, разделённые только
+пустым столбцом, попадают в одну таблицу, а числа выводятся как есть, без
+форматирования `tabulate`. Книги с объединёнными ячейками, изображениями или
+диаграммами потоковый путь не обрабатывает (см. `docling_required_reason`).
+"""
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, Optional, Union
+import zipfile
+
+from openpyxl import load_workbook
+
+from modules.parser.v1.normalization import normalize_text
+
+STREAMABLE_SUFFIXES = {".xlsx", ".xlsm"}
+MERGE_CELL_TAG = b"<mergeCell "
+SCAN_CHUNK_BYTES = 1024 ** 2
+ROWS_PER_CHUNK = 1000
+
+
+def docling_required_reason(file_path: Union[Path, str]) -> Optional[str]:
+    """Почему книгу нужно разбирать Docling, или `None`, если подходит потоковый путь.
+
+    Изображения и диаграммы (`xl/drawings/`, `xl/media/`) и объединённые
+    ячейки (`<mergeCell>` в XML листа) определяются по архиву без разбора XML.
+    """
+    if Path(file_path).suffix.lower() not in STREAMABLE_SUFFIXES:
+        return "format"
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            names = archive.namelist()
+            if any(name.startswith(("xl/drawings/", "xl/media/")) for name in names):
+                return "drawings"
+            for name in names:
+                if name.startswith("xl/worksheets/") and name.endswith(".xml") and has_merged_cells(archive, name):
+                    return "merged cells"
+    except zipfile.BadZipFile:
+        return "not a zip archive"
+    return None
+
+
+def has_merged_cells(archive: zipfile.ZipFile, name: str) -> bool:
+    overlap = len(MERGE_CELL_TAG) - 1
+    previous = b""
+    with archive.open(name) as sheet_xml:
+        while chunk := sheet_xml.read(SCAN_CHUNK_BYTES):
+            if MERGE_CELL_TAG in previous + chunk:
+                return True
+            previous = chunk[-overlap:]
+    return False
+
+
+def escape_cell(text: str) -> str:
+    return text.replace("\n", " ").replace("|", "&#124;")
+
+
+def markdown_row(cells: list[str]) -> str:
+    return "| " + " | ".join(cells) + " |\n"
+
+
+def iter_row_blocks(rows: Iterator[tuple]) -> Iterator[list[tuple]]:
+    """Сгруппировать строки листа в блоки непустых строк по `ROWS_PER_CHUNK` строк.
+
+    Пустой список означает пустую строку листа или конец блока (таблицы).
+    """
+    block = []
+    for row in rows:
+        if any(value is not None for value in row):
+            block.append(row)
+            if len(block) >= ROWS_PER_CHUNK:
+                yield block
+                block = []
+        elif block:
+            yield block
+            yield []
+            block = []
+        else:
+            yield []
+    if block:
+        yield block
+    yield []
+
+
+def used_columns(rows: list[tuple]) -> tuple[int, int]:
+    first, last = None, -1
+    for row in rows:
+        for index, value in enumerate(row):
+            if value is not None:
+                first = index if first is None or index < first else first
+                last = max(last, index)
+    return first or 0, last
+
+
+def iter_sheet_markdown(rows: Iterator[tuple]) -> Iterator[str]:
+    """Markdown-таблицы одного листа фрагментами по `ROWS_PER_CHUNK` строк.
+
+    Столбцы таблицы определяются по данным её первого фрагмента: `<dimension>`
+    листа не используется, потому что генераторы нередко записывают его
+    неверно. Значения правее заголовка не теряются, а дописываются в строку.
+    """
+    cell_text = lru_cache(maxsize=65536)(lambda value: escape_cell(normalize_text(str(value))))
+
+    def row_cells(row: tuple, first: int, width: int) -> list[str]:
+        values = list(row[first:])
+        while len(values) > width and values[-1] is None:
+            values.pop()
+        cells = [cell_text(value) if value is not None else "" for value in values]
+        return cells + [""] * (width - len(cells))
+
+    first = width = None
+    for block in iter_row_blocks(rows):
+        if not block:
+            if width is not None:
+                yield "\n"
+            first = width = None
+            continue
+        lines = []
+        if width is None:
+            first, last = used_columns(block)
+            width = last + 1 - first
+            header, block = block[0], block[1:]
+            lines.append(markdown_row(row_cells(header, first, width)))
+            lines.append("|" + "---|" * width + "\n")
+        for row in block:
+            lines.append(markdown_row(row_cells(row, first, width)))
+        yield "".join(lines)
+
+
+def iter_workbook_markdown(
+    file_path: Union[Path, str],
+    page_break_placeholder: str,
+    sheet_names: Optional[list[str]] = None,
+) -> Iterator[str]:
+    """Markdown видимых листов книги (или только `sheet_names`) фрагментами ограниченного размера."""
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        first_sheet = True
+        for sheet in workbook.worksheets:
+            if sheet.sheet_state != "visible" or (sheet_names is not None and sheet.title not in sheet_names):
+                continue
+            if not first_sheet:
+                yield page_break_placeholder
+            first_sheet = False
+            # `<dimension>` ограничил бы и строки, и столбцы: с неверным значением
+            # openpyxl молча отбрасывает ячейки за его пределами.
+            sheet.reset_dimensions()
+            rows = sheet.iter_rows(min_row=1, min_col=1, values_only=True)
+            yield from iter_sheet_markdown(rows)
+    finally:
+        workbook.close()
@@ -0,0 +1,88 @@
+"""Передача `DoclingDocument` из воркера пула в основной процесс.
+
+Результаты `ProcessPoolExecutor` распаковываются единственным служебным
+потоком пула, поэтому распаковка большого документа задерживает результаты
+всех остальных задач и держит GIL в момент, который выбирает пул. Воркер сам
+сериализует документ в `DocumentHandoff`: небольшой — байтами `pickle`,
+большой (от `DOCUMENT_HANDOFF_FILE_MIN_BYTES`) — во временный файл, так что
+через канал пула идёт только путь. Документ распаковывается там, где он
+нужен: `run_parser_job` читает его в отдельном потоке, а шарды PDF и XLSX
+читает воркер, который их склеивает, минуя основной процесс.
+
+Распаковка в `run_parser_job` — один `pickle.load`, который держит GIL, пока
+не закончится: для документов на десятки мегабайт цикл событий основного
+процесса замирает на это время. Потребители `TO_DOCLING` (переводчики)
+работают с документом в основном процессе, поэтому передать им путь вместо
+документа нельзя.
+
+`pickle` для документов Docling компактнее и не медленнее JSON, а файл
+создаётся и удаляется процессами одного сервиса.
+"""
+from typing import Optional
+import os
+import pickle
+import tempfile
+
+from docling_core.types.doc import DoclingDocument
+
+from settings import settings
+
+
+class DocumentHandoff:
+    """Сериализованный `DoclingDocument`: байты или путь к временному файлу.
+
+    `size` — размер сериализованного документа; он известен и после `load()`,
+    когда временный файл уже удалён.
+    """
+
+    def __init__(self, data: Optional[bytes] = None, path: Optional[str] = None, size: Optional[int] = None):
+        self.data = data
+        self.path = path
+        self.size = size if size is not None else len(data or b"")
+
+    @classmethod
+    def pack(cls, doc: DoclingDocument) -> "DocumentHandoff":
+        data = pickle.dumps(doc, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) < settings.DOCUMENT_HANDOFF_FILE_MIN_BYTES:
+            return cls(data=data)
+        fd, path = tempfile.mkstemp(prefix="handoff_", suffix=".pickle")
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        return cls(path=path, size=len(data))
+
+    def load(self) -> DoclingDocument:
+        """Распаковать документ; временный файл удаляется."""
+        if self.data is not None:
+            return pickle.loads(self.data)
+        try:
+            with open(self.path, "rb") as file:
+                return pickle.load(file)
+        finally:
+            self.discard()
+
+    def discard(self):
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def pack_result(result):
+    """Упаковать документ в `DocumentHandoff`, остальные результаты вернуть как есть."""
+    return DocumentHandoff.pack(result) if isinstance(result, DoclingDocument) else result
+
+
+def discard_results(results):
+    for result in results:
+        if isinstance(result, tuple):
+            result = result[0]
+        if isinstance(result, DocumentHandoff):
+            result.discard()
+
+
+def strip_images(doc: DoclingDocument, keep_pictures: bool) -> DoclingDocument:
+    """Убрать из документа изображения страниц и, если `keep_pictures=False`, картинок и таблиц."""
+    for page in doc.pages.values():
+        page.image = None
+    if not keep_pictures:
+        for item in (*doc.pictures, *doc.tables):
+            item.image = None
+    return doc
@@ -0,0 +1,291 @@
+from pathlib import Path
+from typing import Optional, Union
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from loguru import logger
+
+from settings import settings
+from modules.parser.v1.exceptions import TimeoutError
+from modules.parser.v1.utils import LIBREOFFICE_FILTERS, convert_doc_to
+
+# python3-uno ставится пакетом дистрибутива в системный site-packages, которого
+# нет в виртуальном окружении. Добавляем его в конец sys.path, чтобы не
+# перекрывать пакеты окружения.
+if os.path.isdir(settings.LIBREOFFICE_UNO_PATH) and settings.LIBREOFFICE_UNO_PATH not in sys.path:
+    sys.path.append(settings.LIBREOFFICE_UNO_PATH)
+try:
+    import uno
+except ImportError:
+    uno = None
+
+
+class LibreOfficeInstance:
+    """Слот пула LibreOffice с собственным профилем пользователя.
+
+    Базовая реализация запускает одноразовый `soffice --convert-to` на каждую
+    конвертацию; отдельный профиль позволяет слотам работать параллельно.
+    """
+
+    persistent = False
+
+    def __init__(self, index: int, profile_dir: Path):
+        self.index = index
+        self.profile_dir = profile_dir
+
+    def start(self):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+
+    def stop(self):
+        pass
+
+    def kill(self):
+        pass
+
+    def restart(self):
+        logger.warning(f"Restarting LibreOffice instance #{self.index}")
+        self.kill()
+        self.start()
+
+    def is_alive(self) -> bool:
+        return True
+
+    def convert(self, input_path: Path, output_path: Path, output_format: str):
+        converted = convert_doc_to(
+            input_path,
+            output_format,
+            output_dir=output_path.parent,
+            profile_dir=self.profile_dir,
+            timeout=settings.LIBREOFFICE_CONVERT_TIMEOUT_SECS,
+        )
+        if converted != output_path:
+            converted.replace(output_path)
+
+
+class UnoLibreOfficeInstance(LibreOfficeInstance):
+    """Долгоживущий `soffice --headless`, которым управляем по UNO через именованный канал."""
+
+    persistent = True
+
+    def __init__(self, index: int, profile_dir: Path):
+        super().__init__(index, profile_dir)
+        self.pipe_name = f"document_parser_{os.getpid()}_{index}"
+        self.process: Optional[subprocess.Popen] = None
+        self.desktop = None
+
+    def start(self):
+        super().start()
+        self.process = subprocess.Popen(
+            [
+                settings.LIBREOFFICE_BINARY,
+                "--headless",
+                "--invisible",
+                "--nologo",
+                "--norestore",
+                "--nodefault",
+                "--nolockcheck",
+                "--nofirststartwizard",
+                f"-env:UserInstallation={self.profile_dir.resolve().as_uri()}",
+                f"--accept=pipe,name={self.pipe_name};urp;StarOffice.ComponentContext",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_context
+        )
+        deadline = time.monotonic() + settings.LIBREOFFICE_STARTUP_TIMEOUT_SECS
+        while True:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"LibreOffice instance #{self.index} exited with code {self.process.returncode}")
+            try:
+                context = resolver.resolve(f"uno:pipe,name={self.pipe_name};urp;StarOffice.ComponentContext")
+                break
+            except Exception:
+                if time.monotonic() > deadline:
+                    self.kill()
+                    raise RuntimeError(f"LibreOffice instance #{self.index} did not start in time")
+                time.sleep(0.25)
+        self.desktop = context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+        logger.debug(f"LibreOffice instance #{self.index} started (pid {self.process.pid})")
+
+    def stop(self):
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+    def kill(self):
+        # Экземпляр мог зависнуть, поэтому без вежливого `terminate()` по UNO.
+        self.desktop = None
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+    def is_alive(self) -> bool:
+        if self.process is None or self.process.poll() is not None or self.desktop is None:
+            return False
+        try:
+            self.desktop.getCurrentFrame()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _properties(**kwargs) -> tuple:
+        properties = []
+        for name, value in kwargs.items():
+            prop = uno.createUnoStruct("com.sun.star.beans.PropertyValue")
+            prop.Name = name
+            prop.Value = value
+            properties.append(prop)
+        return tuple(properties)
+
+    def convert(self, input_path: Path, output_path: Path, output_format: str):
+        document = self.desktop.loadComponentFromURL(
+            input_path.resolve().as_uri(), "_blank", 0, self._properties(Hidden=True, ReadOnly=True)
+        )
+        if document is None:
+            raise RuntimeError(f"LibreOffice could not open {input_path.name}")
+        try:
+            document.storeToURL(
+                output_path.resolve().as_uri(),
+                self._properties(FilterName=LIBREOFFICE_FILTERS[output_format], Overwrite=True),
+            )
+        finally:
+            document.close(True)
+
+
+class LibreOfficePool:
+    """Пул экземпляров LibreOffice для конвертации устаревших форматов.
+
+    Конвертации выполняются в потоках, не блокируя цикл событий; в каждый
+    момент экземпляр занят не более чем одной конвертацией. Экземпляр, который
+    упал, не отвечает на проверку состояния или не уложился в
+    `LIBREOFFICE_CONVERT_TIMEOUT_SECS`, перезапускается. Если модуль `uno`
+    недоступен, слоты пула запускают одноразовый `soffice` со своим профилем.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self.instances: list[LibreOfficeInstance] = []
+        self.work_dir: Optional[Path] = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._idle is not None
+
+    async def start(self):
+        async with self._start_lock:
+            if self.started:
+                return
+            instance_cls = UnoLibreOfficeInstance if uno is not None else LibreOfficeInstance
+            self.work_dir = Path(tempfile.mkdtemp(prefix="libreoffice_"))
+            self.instances = [instance_cls(index, self.work_dir / f"profile_{index}") for index in range(self.size)]
+            results = await asyncio.gather(
+                *[asyncio.to_thread(instance.start) for instance in self.instances], return_exceptions=True
+            )
+            for instance, result in zip(self.instances, results):
+                if isinstance(result, Exception):
+                    logger.error(f"LibreOffice instance #{instance.index} failed to start: {result}")
+            self._idle = asyncio.Queue()
+            for instance in self.instances:
+                self._idle.put_nowait(instance)
+            if instance_cls.persistent and settings.LIBREOFFICE_HEALTHCHECK_SECS > 0:
+                self._health_task = asyncio.create_task(self._health_loop())
+            logger.info(
+                f"Пул LibreOffice запущен: {self.size} экз., "
+                f"{'UNO' if instance_cls.persistent else 'одноразовый soffice'}"
+            )
+
+    async def stop(self):
+        if not self.started:
+            return
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        await asyncio.gather(*[asyncio.to_thread(instance.stop) for instance in self.instances])
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        self.instances = []
+        self._idle = None
+
+    async def _ensure_alive(self, instance: LibreOfficeInstance):
+        try:
+            alive = await asyncio.wait_for(asyncio.to_thread(instance.is_alive), timeout=10)
+        except asyncio.TimeoutError:
+            alive = False
+        if not alive:
+            await asyncio.to_thread(instance.restart)
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(settings.LIBREOFFICE_HEALTHCHECK_SECS)
+            for _ in range(self._idle.qsize()):
+                instance = self._idle.get_nowait()
+                try:
+                    await self._ensure_alive(instance)
+                except Exception as e:
+                    logger.error(f"LibreOffice instance #{instance.index} health check failed: {e}")
+                finally:
+                    self._idle.put_nowait(instance)
+
+    async def convert(self, input_path: Union[Path, str], output_format: str) -> Path:
+        """Сконвертировать файл в `output_format` во временный каталог.
+
+        Вызывающий удаляет каталог результата (`path.parent`) после использования.
+        """
+        if not self.started:
+            await self.start()
+        input_path = Path(input_path)
+        if output_format not in LIBREOFFICE_FILTERS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        output_path = Path(tempfile.mkdtemp(prefix="converted_")) / f"{input_path.stem}.{output_format}"
+
+        instance = await self._idle.get()
+        started = time.perf_counter()
+        try:
+            await self._ensure_alive(instance)
+            await asyncio.wait_for(
+                asyncio.to_thread(instance.convert, input_path, output_path, output_format),
+                timeout=settings.LIBREOFFICE_CONVERT_TIMEOUT_SECS,
+            )
+        except (asyncio.TimeoutError, subprocess.TimeoutExpired):
+            logger.error(f"Конвертация \"{input_path.name}\" в {output_format} превысила таймаут")
+            shutil.rmtree(output_path.parent, ignore_errors=True)
+            await asyncio.to_thread(instance.restart)
+            raise TimeoutError()
+        except Exception:
+            shutil.rmtree(output_path.parent, ignore_errors=True)
+            raise
+        finally:
+            self._idle.put_nowait(instance)
+        if not output_path.exists():
+            shutil.rmtree(output_path.parent, ignore_errors=True)
+            raise RuntimeError(f"LibreOffice finished without an error, but output file was not created: {output_path}")
+        logger.info(
+            f"\"{input_path.name}\" сконвертирован в {output_format} за {time.perf_counter() - started:.2f}s "
+            f"(LibreOffice #{instance.index})"
+        )
+        return output_path
+
+
+libreoffice_pool = LibreOfficePool(settings.LIBREOFFICE_POOL_SIZE)
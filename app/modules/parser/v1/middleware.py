@@ -0,0 +1,47 @@
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from settings import settings
+from modules.parser.v1.exceptions import PayloadTooLargeError
+
+# Запас на границы multipart, заголовки частей и текстовые поля формы.
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadLimitMiddleware:
+    """Ограничить тело запроса по `UPLOAD_MAX_BYTES` ещё до того, как его прочитает Starlette.
+
+    Без этого `UploadFile` целиком сохраняется во временный файл Starlette и
+    лимит в `save_file` срабатывает уже после приёма всей загрузки. Запрос с
+    `Content-Length` больше лимита получает 413 без чтения тела; для тела без
+    `Content-Length` (chunked) приём обрывается с 413, как только лимит
+    превышен. Точный размер файла по-прежнему проверяет `save_file`.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or settings.UPLOAD_MAX_BYTES <= 0:
+            await self.app(scope, receive, send)
+            return
+        max_body_bytes = settings.UPLOAD_MAX_BYTES + FORM_OVERHEAD_BYTES
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_body_bytes:
+            error = PayloadTooLargeError(settings.UPLOAD_MAX_BYTES)
+            response = JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body_bytes:
+                    raise PayloadTooLargeError(settings.UPLOAD_MAX_BYTES)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,150 @@
+"""Нормализация текста разобранных документов за один проход.
+
+Повторяет прежнюю цепочку `ParserABC.normalize_unicode` → `clean_text` →
+`to_utf8` (ftfy) символ в символ, но:
+
+* замены `clean_text` собраны в одну таблицу `str.translate`, регулярное
+  выражение для `/uniXXXX` скомпилировано и запускается только при наличии
+  `/uni` в строке;
+* ftfy и NFC пропускаются для строк, которые они гарантированно не изменят:
+  ASCII без управляющих символов и `&`, а также строки без символов, которые
+  трогают фиксеры ftfy, уже в NFC и без признаков mojibake (`is_bad`);
+* `normalize_document` обрабатывает все текстовые элементы и ячейки таблиц
+  документа разом, нормализуя каждую уникальную строку один раз.
+
+Совпадение с прежней реализацией проверяет `benchmarks/bench_normalization.py`.
+"""
+import re
+import unicodedata
+
+import ftfy
+from ftfy.badness import is_bad
+from ftfy.chardata import CONTROL_CHARS, LIGATURES, WIDTH_MAP
+from docling_core.types.doc import DoclingDocument, TableItem, TextItem
+
+INVISIBLE_SPACES = (
+    '\u00A0',  # неразрывный пробел
+    '\u1680',  # Ogham space mark
+    '\u2000',  # en quad
+    '\u2001',  # em quad
+    '\u2002',  # en space
+    '\u2003',  # em space
+    '\u2004',  # three-per-em space
+    '\u2005',  # four-per-em space
+    '\u2006',  # six-per-em space
+    '\u2007',  # figure space
+    '\u2008',  # punctuation space
+    '\u2009',  # thin space
+    '\u200A',  # hair space
+    '\u202F',  # narrow no-break space
+    '\u205F',  # medium mathematical space
+    '\u3000',  # IDEOGRAPHIC SPACE
+    '\u00AD',  # мягкий перенос (часто мешает)
+    '\u2060',  # word joiner
+    '\uFEFF',  # BOM / zero width no-break space
+    '\u200B',  # zero width space
+    '\u200C',  # zero width non-joiner
+    '\u200D',  # zero width joiner
+    '\u0009',
+)
+
+CLEAN_TABLE = str.maketrans({"\ufffd": ".", **{space: " " for space in INVISIBLE_SPACES}})
+# `str.translate` со словарём медленнее поиска по классу символов, поэтому
+# строки без заменяемых символов не переводятся.
+CLEAN_CHARS_RE = re.compile("[" + "".join(re.escape(chr(char)) for char in CLEAN_TABLE) + "]")
+UNI_ESCAPE_RE = re.compile(r"/uni([0-9A-Fa-f]{4})")
+
+# ASCII-строка не меняется ftfy, если в ней нет `&` (HTML-сущности) и
+# управляющих символов, кроме перевода строки.
+ASCII_UNSAFE_RE = re.compile(r"[^\n\x20-\x25\x27-\x7e]")
+
+
+def _ftfy_unsafe_pattern() -> re.Pattern:
+    """Символы, которые может заменить хотя бы один фиксер ftfy (кроме `fix_encoding` и NFC)."""
+    chars = set(CONTROL_CHARS) | set(LIGATURES) | set(WIDTH_MAP)
+    chars |= {ord(char) for char in "&\x1b\r\u2028\u2029"}
+    chars |= set(range(0x80, 0xA0))  # C1 и U+0085
+    chars |= {0x02BC, *range(0x2018, 0x201C), *range(0x201C, 0x2020)}  # фигурные кавычки
+    char_class = "".join(re.escape(chr(char)) for char in sorted(chars))
+    return re.compile(f"[{char_class}\ud800-\udfff]")
+
+
+FTFY_UNSAFE_RE = _ftfy_unsafe_pattern()
+
+
+def _replace_uni(match: re.Match) -> str:
+    try:
+        return chr(int(match.group(1), 16))
+    except ValueError:
+        return match.group(0)
+
+
+def clean_text(text: str) -> str:
+    """Раскрыть `/uniXXXX`, заменить U+FFFD на точку, невидимые пробелы — на пробел."""
+    if "/uni" in text:
+        text = UNI_ESCAPE_RE.sub(_replace_uni, text)
+    if CLEAN_CHARS_RE.search(text) is None:
+        return text
+    return text.translate(CLEAN_TABLE)
+
+
+def is_clean(text: str) -> bool:
+    """Гарантированно ли `ftfy.fix_text(text)` вернёт `text` без изменений."""
+    if text.isascii():
+        return ASCII_UNSAFE_RE.search(text) is None
+    return (
+        FTFY_UNSAFE_RE.search(text) is None
+        and unicodedata.is_normalized("NFC", text)
+        and not is_bad(text)
+    )
+
+
+def fix_text(text: str) -> str:
+    if is_clean(text):
+        return text
+    return ftfy.fix_text(text)
+
+
+def normalize_text(text: str, nfc: bool = False, fix: bool = True) -> str:
+    """Нормализовать строку: NFC (опционально), `clean_text`, ftfy (опционально)."""
+    if not text:
+        return text
+    if nfc and not text.isascii():
+        text = unicodedata.normalize("NFC", text)
+    text = clean_text(text)
+    if fix:
+        text = fix_text(text)
+    return text
+
+
+def normalize_texts(texts: list[str], nfc: bool = False, fix: bool = True) -> list[str]:
+    """Нормализовать список строк, обрабатывая каждую уникальную строку один раз."""
+    normalized = {}
+    result = []
+    for text in texts:
+        value = normalized.get(text)
+        if value is None:
+            value = normalized[text] = normalize_text(text, nfc=nfc, fix=fix)
+        result.append(value)
+    return result
+
+
+def normalize_document(doc: DoclingDocument, nfc_text: bool = False, fix_cells: bool = True):
+    """Нормализовать все текстовые элементы и ячейки таблиц документа.
+
+    Исходный текст элементов сохраняется в `orig`. `nfc_text` включает NFC
+    для текстовых элементов, `fix_cells` — ftfy для ячеек таблиц.
+    """
+    text_items = []
+    cells = []
+    for element, _level in doc.iterate_items():
+        if isinstance(element, TextItem):
+            element.orig = element.text
+            text_items.append(element)
+        elif isinstance(element, TableItem):
+            cells.extend(element.data.table_cells)
+
+    for element, text in zip(text_items, normalize_texts([element.text for element in text_items], nfc=nfc_text)):
+        element.text = text
+    for cell, text in zip(cells, normalize_texts([cell.text for cell in cells], fix=fix_cells)):
+        cell.text = text
@@ -0,0 +1,163 @@
+from pathlib import Path
+from typing import Optional, Union
+import mmap
+import os
+import zipfile
+
+from loguru import logger
+
+from modules.parser.v1.exceptions import ContentNotSupportedError
+from modules.parser.v1.schemas import FileFormats, ParsePlan, ParseRoute
+
+OLE_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+# Имена потоков OLE2 хранятся в каталоге контейнера в UTF-16LE.
+OLE_STREAMS = (
+    ("WordDocument".encode("utf-16-le"), ".doc"),
+    ("Workbook".encode("utf-16-le"), ".xls"),
+    ("PowerPoint Document".encode("utf-16-le"), ".ppt"),
+)
+
+OOXML_PARTS = (
+    ("word/", ".docx"),
+    ("xl/", ".xlsx"),
+    ("ppt/", ".pptx"),
+)
+
+ODF_MIMETYPES = {
+    "application/vnd.oasis.opendocument.text": ".odt",
+    "application/vnd.oasis.opendocument.spreadsheet": ".ods",
+    "application/vnd.oasis.opendocument.presentation": ".odp",
+}
+
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"II*\x00", ".tiff"),
+    (b"MM\x00*", ".tiff"),
+    (b"BM", ".bmp"),
+)
+
+# Размеры заголовка DIB (BITMAPCOREHEADER, BITMAPINFOHEADER, V4, V5).
+BMP_DIB_HEADER_SIZES = {12, 40, 108, 124}
+
+# Разные расширения одного формата: сигнатура даёт только первое из них.
+FORMAT_ALIASES = {
+    ".jpeg": ".jpg",
+}
+
+# Форматы, которые Docling не читает: конвертируются LibreOffice в OOXML.
+LIBREOFFICE_SOURCES = {
+    ".doc": "docx",
+    ".rtf": "docx",
+    ".odt": "docx",
+    ".xls": "xlsx",
+    ".ods": "xlsx",
+    ".ppt": "pptx",
+    ".odp": "pptx",
+}
+
+SUPPORTED_FORMATS = {file_format for formats in FileFormats for file_format in formats.value}
+
+
+def sniff_zip(file_path: Path) -> Optional[str]:
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            names = archive.namelist()
+            if "mimetype" in names:
+                mimetype = archive.read("mimetype").decode("ascii", errors="ignore").strip()
+                return ODF_MIMETYPES.get(mimetype)
+            if "[Content_Types].xml" in names:
+                for prefix, file_format in OOXML_PARTS:
+                    if any(name.startswith(prefix) for name in names):
+                        return file_format
+    except zipfile.BadZipFile:
+        pass
+    return None
+
+
+def sniff_ole(file_path: Path) -> Optional[str]:
+    with open(file_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for stream_name, file_format in OLE_STREAMS:
+            if data.find(stream_name) != -1:
+                return file_format
+    return None
+
+
+def valid_image_header(file_format: str, head: bytes, file_size: int) -> bool:
+    """Проверить заголовок изображения, сигнатура которого занимает 2–4 байта.
+
+    Такие сигнатуры встречаются и в начале текста (`BMW ...`), поэтому без
+    проверки полей заголовка формат по ним не определяется.
+    """
+    if file_format == ".bmp":
+        return (
+            len(head) >= 18
+            and int.from_bytes(head[2:6], "little") == file_size
+            and int.from_bytes(head[14:18], "little") in BMP_DIB_HEADER_SIZES
+        )
+    if file_format == ".tiff":
+        byteorder = "little" if head.startswith(b"II") else "big"
+        return len(head) >= 8 and 8 <= int.from_bytes(head[4:8], byteorder) < file_size
+    if file_format == ".jpg":
+        # За SOI (FFD8) сразу идёт маркер следующего сегмента: FF и байт C0–FE.
+        return len(head) >= 4 and 0xC0 <= head[3] <= 0xFE
+    return True
+
+
+def sniff_format(file_path: Union[Path, str]) -> Optional[str]:
+    """Определить формат по содержимому файла.
+
+    Возвращает расширение вида `.docx` или `None`, если формат по сигнатуре не
+    распознан (текстовые форматы определяются по расширению).
+    """
+    file_path = Path(file_path)
+    with open(file_path, "rb") as file:
+        head = file.read(32)
+        file_size = os.fstat(file.fileno()).st_size
+    if head.startswith(b"%PDF-"):
+        return ".pdf"
+    if head.startswith(b"PK\x03\x04"):
+        return sniff_zip(file_path)
+    if head.startswith(OLE_MAGIC):
+        return sniff_ole(file_path)
+    if head.startswith(b"{\\rtf"):
+        return ".rtf"
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return ".webp"
+    for signature, file_format in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return file_format if valid_image_header(file_format, head, file_size) else None
+    return None
+
+
+def plan_parsing(file_path: Union[Path, str]) -> ParsePlan:
+    """Выбрать самый дешёвый путь разбора файла.
+
+    OOXML, PDF, изображения и HTML разбираются Docling напрямую; если
+    расширение не совпадает с содержимым, файл только переименовывается.
+    LibreOffice используется лишь для форматов, которые Docling не читает.
+    """
+    suffix = Path(file_path).suffix.lower()
+    detected_format = sniff_format(file_path) or suffix
+    if FORMAT_ALIASES.get(suffix) == detected_format:
+        detected_format = suffix
+    if detected_format in LIBREOFFICE_SOURCES:
+        conversion_target = LIBREOFFICE_SOURCES[detected_format]
+        plan = ParsePlan(
+            detected_format=detected_format,
+            parser_format=f".{conversion_target}",
+            route=ParseRoute.LIBREOFFICE,
+            conversion_target=conversion_target,
+        )
+    else:
+        plan = ParsePlan(
+            detected_format=detected_format,
+            parser_format=detected_format,
+            route=ParseRoute.NATIVE if detected_format == suffix else ParseRoute.RENAMED,
+        )
+    if plan.detected_format not in SUPPORTED_FORMATS:
+        raise ContentNotSupportedError(f"Формат \"{detected_format}\" не поддерживается!")
+    if detected_format != suffix:
+        logger.warning(f"Content of \"{Path(file_path).name}\" is {detected_format}, not {suffix or 'unknown'}")
+    return plan
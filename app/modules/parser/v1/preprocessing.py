@@ -0,0 +1,161 @@
+from io import BytesIO
+from pathlib import Path
+from typing import Optional, Union
+import math
+
+from PIL import Image, ImageChops, ImageOps, ImageStat
+from loguru import logger
+
+from settings import settings
+from modules.parser.v1.schemas import PreparedImage, VLMImageFormat
+
+# Порог отличия от цвета фона (0-255), ниже которого пиксель считается полем.
+TRIM_THRESHOLD = 24
+TRIM_MARGIN = 16
+# Средняя насыщенность (канал S в HSV, 0-255), ниже которой изображение
+# считается текстовым и отправляется в оттенках серого.
+GRAYSCALE_MAX_SATURATION = 12
+
+MIME_TYPES = {
+    VLMImageFormat.PNG: "image/png",
+    VLMImageFormat.JPEG: "image/jpeg",
+    VLMImageFormat.WEBP: "image/webp",
+}
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """Оценить число визуальных токенов: один токен на патч `VLM_IMAGE_PATCH_SIZE`²."""
+    patch_size = max(1, settings.VLM_IMAGE_PATCH_SIZE)
+    return math.ceil(width / patch_size) * math.ceil(height / patch_size)
+
+
+def preprocessing_signature() -> str:
+    """Параметры предобработки, от которых зависит ответ VLM (для ключа `OCRCache`)."""
+    if not settings.VLM_IMAGE_PREPROCESS:
+        return "raw"
+    return ":".join(
+        str(part)
+        for part in (
+            settings.VLM_IMAGE_MAX_PIXELS,
+            settings.VLM_IMAGE_FORMAT,
+            settings.VLM_IMAGE_QUALITY,
+            settings.VLM_IMAGE_GRAYSCALE,
+            settings.VLM_IMAGE_TRIM,
+        )
+    )
+
+
+def flatten(image: Image.Image) -> Image.Image:
+    """Привести к RGB, подложив прозрачные области белым."""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def trim_borders(image: Image.Image) -> Image.Image:
+    """Обрезать однотонные поля по цвету левого верхнего пикселя, оставив `TRIM_MARGIN`."""
+    gray = image.convert("L")
+    background = Image.new("L", gray.size, gray.getpixel((0, 0)))
+    mask = ImageChops.difference(gray, background).point(lambda value: 255 if value > TRIM_THRESHOLD else 0)
+    bbox = mask.getbbox()
+    if bbox is None:
+        return image
+    left, top, right, bottom = bbox
+    bbox = (
+        max(0, left - TRIM_MARGIN),
+        max(0, top - TRIM_MARGIN),
+        min(image.width, right + TRIM_MARGIN),
+        min(image.height, bottom + TRIM_MARGIN),
+    )
+    if bbox == (0, 0, image.width, image.height):
+        return image
+    return image.crop(bbox)
+
+
+def is_text_only(image: Image.Image) -> bool:
+    thumbnail = image.copy()
+    thumbnail.thumbnail((128, 128))
+    saturation = ImageStat.Stat(thumbnail.convert("HSV").getchannel("S")).mean[0]
+    return saturation < GRAYSCALE_MAX_SATURATION
+
+
+def downscale(image: Image.Image, max_pixels: int) -> Image.Image:
+    pixels = image.width * image.height
+    if max_pixels <= 0 or pixels <= max_pixels:
+        return image
+    ratio = math.sqrt(max_pixels / pixels)
+    size = (max(1, int(image.width * ratio)), max(1, int(image.height * ratio)))
+    return image.resize(size, Image.Resampling.LANCZOS)
+
+
+def encode_png(image: Image.Image) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format="png")
+    return buffer.getvalue()
+
+
+def prepare_image(image: Image.Image, source_path: Optional[Union[Path, str]] = None) -> PreparedImage:
+    """Подготовить изображение к отправке в VLM.
+
+    По порядку: поворот по EXIF, обрезка полей, перевод в оттенки серого, если
+    изображение не цветное, уменьшение до `VLM_IMAGE_MAX_PIXELS` и кодирование
+    в `VLM_IMAGE_FORMAT`. С `VLM_IMAGE_PREPROCESS=false` изображение уходит
+    как раньше — PNG в исходном разрешении. Сэкономленные байты считаются
+    только от размера файла `source_path`: без него исходный PNG пришлось бы
+    кодировать ради одного лога, поэтому в лог попадают лишь токены.
+    """
+    original_size = image.size
+    original_tokens = estimate_image_tokens(*original_size)
+    if not settings.VLM_IMAGE_PREPROCESS:
+        image_bytes = encode_png(image.convert("RGBA"))
+        return PreparedImage(
+            image_bytes=image_bytes,
+            mime_type=MIME_TYPES[VLMImageFormat.PNG],
+            width=image.width,
+            height=image.height,
+            original_bytes=len(image_bytes),
+            original_tokens=original_tokens,
+            estimated_tokens=original_tokens,
+        )
+
+    original_bytes = Path(source_path).stat().st_size if source_path is not None else None
+
+    image = flatten(ImageOps.exif_transpose(image))
+    if settings.VLM_IMAGE_TRIM:
+        image = trim_borders(image)
+    if settings.VLM_IMAGE_GRAYSCALE and is_text_only(image):
+        image = image.convert("L")
+    image = downscale(image, settings.VLM_IMAGE_MAX_PIXELS)
+
+    image_format = VLMImageFormat(settings.VLM_IMAGE_FORMAT.lower())
+    buffer = BytesIO()
+    if image_format == VLMImageFormat.PNG:
+        image.save(buffer, format="png", optimize=True)
+    else:
+        image.save(buffer, format=image_format.value, quality=settings.VLM_IMAGE_QUALITY)
+
+    prepared = PreparedImage(
+        image_bytes=buffer.getvalue(),
+        mime_type=MIME_TYPES[image_format],
+        width=image.width,
+        height=image.height,
+        original_bytes=original_bytes,
+        original_tokens=original_tokens,
+        estimated_tokens=estimate_image_tokens(image.width, image.height),
+    )
+    bytes_saved = (
+        f"{prepared.original_bytes - len(prepared.image_bytes)} bytes saved "
+        f"({prepared.original_bytes} -> {len(prepared.image_bytes)}), "
+        if prepared.original_bytes is not None
+        else f"{len(prepared.image_bytes)} bytes, "
+    )
+    logger.debug(
+        f"Image prepared for VLM: {original_size[0]}x{original_size[1]} -> {prepared.width}x{prepared.height} "
+        f"{image.mode} {image_format.value}, {bytes_saved}"
+        f"~{prepared.original_tokens - prepared.estimated_tokens} tokens saved "
+        f"({prepared.original_tokens} -> {prepared.estimated_tokens})"
+    )
+    return prepared
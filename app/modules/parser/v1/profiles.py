@@ -0,0 +1,54 @@
+"""Опции пайплайнов Docling по профилю разбора.
+
+Профиль определяет, какие модели запускаются:
+
+* `fast` — только layout: без TableFormer и обогащений, сетка ячеек таблиц
+  не восстанавливается;
+* `balanced` — TableFormer в быстром режиме;
+* `accurate` — TableFormer в точном режиме и распознавание блоков кода
+  (прежнее поведение `PDFParser`).
+
+Независимо от профиля изображения картинок рендерятся, только если их кто-то
+использует: OCR картинок (`parse_images`) или выдача изображений
+(`include_image_in_output`). Изображения страниц PDF нужны только OCR: у
+таблиц нет своего изображения, `TableItem.get_image` вырезает его из
+страницы.
+"""
+from typing import Optional
+
+from docling.datamodel.pipeline_options import (
+    PaginatedPipelineOptions,
+    PdfPipelineOptions,
+    TableFormerMode,
+    TableStructureOptions,
+)
+
+from modules.parser.v1.schemas import ParseProfile, ParserParams
+
+TABLE_MODES = {
+    ParseProfile.BALANCED: TableFormerMode.FAST,
+    ParseProfile.ACCURATE: TableFormerMode.ACCURATE,
+}
+
+
+def pdf_pipeline_options(parser_params: ParserParams, artifacts_path: Optional[str]) -> PdfPipelineOptions:
+    profile = parser_params.profile
+    table_mode = TABLE_MODES.get(profile)
+    return PdfPipelineOptions(
+        artifacts_path=artifacts_path,
+        do_ocr=False,
+        do_table_structure=table_mode is not None,
+        table_structure_options=TableStructureOptions(mode=table_mode or TableFormerMode.FAST),
+        do_code_enrichment=profile == ParseProfile.ACCURATE,
+        generate_picture_images=parser_params.render_pictures,
+        generate_page_images=bool(parser_params.parse_images),
+        generate_parsed_pages=False,
+    )
+
+
+def paginated_pipeline_options(parser_params: ParserParams, artifacts_path: Optional[str]) -> PaginatedPipelineOptions:
+    return PaginatedPipelineOptions(
+        artifacts_path=artifacts_path,
+        generate_picture_images=parser_params.render_pictures,
+        generate_page_images=False,
+    )
@@ -1,18 +1,32 @@
+import asyncio
+import os
 from pathlib import Path
+from urllib.parse import quote
 
-from fastapi import APIRouter, Depends, Request
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from loguru import logger
+from starlette.background import BackgroundTask
 
-from modules.parser.v1.abc.factory import ParserFactory
+from modules.parser.v1.cache import document_cache
+from modules.parser.v1.exporters import OUTPUT_SUFFIXES, StreamCompressor, check_compression
 from modules.parser.v1.schemas import (
+    DoclingJsonOptions,
+    DocumentCacheStats,
     FileFormats,
+    JsonCompression,
+    JsonHeavyField,
+    OutputFormat,
+    ParserJob,
     ParserMods,
     ParserParams,
+    ParserJsonChunk,
     ParserRequest,
+    ParserTextChunk,
     ParserTextResponse,
 )
-from modules.parser.v1.utils import delete_file, run_in_process, save_file
+from modules.parser.v1.service import run_parser_job, stream_json_job, stream_parser_job
+from modules.parser.v1.utils import delete_file, iter_zip, save_file
 from settings import settings
 
 router = APIRouter(prefix="/api/v1/parser")
@@ -44,6 +58,8 @@ router = APIRouter(prefix="/api/v1/parser")
 1. `parse_images` — распознавать встроенные изображения через VLM.
 2. `include_image_in_output` — включать изображения в итоговый Markdown.
 3. `full_vlm_pdf_parse` — отправлять PDF целиком в VLM вместо стандартного пайплайна.
+4. `hybrid_pdf_parse` — отправлять в VLM только страницы PDF без текстового слоя.
+5. `profile` — профиль разбора: `fast`, `balanced` или `accurate`.
 
 ### Возвращаемый объект
 ```python
@@ -56,20 +72,22 @@ async def parse_to_text(
     request_fastapi: Request,
     parser_data: ParserRequest = Depends(),
 ) -> ParserTextResponse:
+    file_path = None
     try:
         file = parser_data.file
-        file_path = await save_file(file)
+        file_path, content_hash = await save_file(file)
         parser_params = ParserParams(
             file_path=file_path,
+            content_hash=content_hash,
             parse_images=parser_data.parse_images,
             include_image_in_output=parser_data.include_image_in_output,
             full_vlm_pdf_parse=parser_data.full_vlm_pdf_parse,
+            hybrid_pdf_parse=parser_data.hybrid_pdf_parse,
+            profile=parser_data.profile,
         )
-        parser = ParserFactory(parser_params).get_parser()
-        text = await run_in_process(
-            parser.parse,
+        text = await run_parser_job(
             request_fastapi.app.state.executor,
-            ParserMods.TO_TEXT,
+            ParserJob(parser_params=parser_params, mode=ParserMods.TO_TEXT),
         )
         return ParserTextResponse(parsed_text=text)
     except Exception as e:
@@ -79,6 +97,82 @@ async def parse_to_text(
         await delete_file(file_path)
 
 
+@router.post(
+    path="/parse/text/stream",
+    name="Потоковый парсинг документа в Markdown-текст",
+    summary="Распознать документ и отдавать Markdown по страницам (NDJSON)",
+    description=f"""
+## Назначение
+Распознаёт документ и отдаёт Markdown по мере готовности в виде NDJSON: одна
+строка — один фрагмент. PDF отдаётся фрагментами по
+`PARSER_STREAM_CHUNK_PAGES` страниц (сейчас {settings.PARSER_STREAM_CHUNK_PAGES}),
+TXT — блоками по `TXT_CHUNK_BYTES` без загрузки файла в память целиком,
+остальные форматы — одним фрагментом.
+
+Фрагменты после первого начинаются с разделителя страниц, поэтому
+конкатенация поля `text` всех строк совпадает с ответом `/parse/text`.
+
+### Поддерживаемые MIME-типы
+```python
+{settings.ALLOWED_MIME_TYPES}
+```
+
+### Поддерживаемые форматы
+* **DOC**: `{FileFormats.DOC.value}`
+* **PDF**: `{FileFormats.PDF.value}`
+* **XLSX**: `{FileFormats.XLSX.value}`
+* **IMAGES**: `{FileFormats.IMAGE.value}`
+* **HTML**: `{FileFormats.HTML.value}`
+* **PPTX**: `{FileFormats.PPTX.value}`
+* **TXT**: `{FileFormats.TXT.value}`
+
+### Важные параметры
+1. `parse_images` — распознавать встроенные изображения через VLM.
+2. `include_image_in_output` — включать изображения в итоговый Markdown.
+3. `full_vlm_pdf_parse` — отправлять PDF целиком в VLM вместо стандартного пайплайна (без постраничной выдачи).
+4. `hybrid_pdf_parse` — отправлять в VLM только страницы PDF без текстового слоя.
+5. `profile` — профиль разбора: `fast`, `balanced` или `accurate`.
+
+### Строка ответа
+```python
+{ParserTextChunk.model_fields}
+```
+""",
+    tags=["Parser V1"],
+)
+async def parse_to_text_stream(
+    request_fastapi: Request,
+    parser_data: ParserRequest = Depends(),
+) -> StreamingResponse:
+    file = parser_data.file
+    file_path, content_hash = await save_file(file)
+    parser_params = ParserParams(
+        file_path=file_path,
+        content_hash=content_hash,
+        parse_images=parser_data.parse_images,
+        include_image_in_output=parser_data.include_image_in_output,
+        full_vlm_pdf_parse=parser_data.full_vlm_pdf_parse,
+        hybrid_pdf_parse=parser_data.hybrid_pdf_parse,
+        profile=parser_data.profile,
+    )
+    job = ParserJob(parser_params=parser_params, mode=ParserMods.TO_TEXT)
+
+    async def ndjson_chunks():
+        try:
+            async for chunk in stream_parser_job(request_fastapi.app.state.executor, job):
+                yield chunk.model_dump_json() + "\n"
+        except Exception as e:
+            logger.error(f"Ошибка потокового парсинга документа: {e}")
+            raise e
+
+    # Фоновая задача выполняется, даже если клиент отключился до начала выдачи.
+    return StreamingResponse(
+        ndjson_chunks(),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(delete_file, file_path),
+    )
+
+
 @router.post(
     path="/parse/file",
     name="Парсинг документа в Markdown-файл",
@@ -105,6 +199,8 @@ async def parse_to_text(
 1. `parse_images` — распознавать встроенные изображения через VLM.
 2. `include_image_in_output` — включать изображения в итоговый Markdown.
 3. `full_vlm_pdf_parse` — отправлять PDF целиком в VLM вместо стандартного пайплайна.
+4. `hybrid_pdf_parse` — отправлять в VLM только страницы PDF без текстового слоя.
+5. `profile` — профиль разбора: `fast`, `balanced` или `accurate`.
 
 ### Возвращаемый объект
 ```python
@@ -117,19 +213,22 @@ async def parse_to_file(
     request_fastapi: Request,
     parser_data: ParserRequest = Depends(),
 ) -> FileResponse:
+    file_path = None
     try:
         file = parser_data.file
-        file_path = await save_file(file)
+        file_path, content_hash = await save_file(file)
         parser_params = ParserParams(
             file_path=file_path,
+            content_hash=content_hash,
             parse_images=parser_data.parse_images,
             include_image_in_output=parser_data.include_image_in_output,
             full_vlm_pdf_parse=parser_data.full_vlm_pdf_parse,
+            hybrid_pdf_parse=parser_data.hybrid_pdf_parse,
+            profile=parser_data.profile,
         )
-        file = await run_in_process(
-            ParserFactory(parser_params).get_parser().parse,
+        file = await run_parser_job(
             request_fastapi.app.state.executor,
-            ParserMods.TO_FILE,
+            ParserJob(parser_params=parser_params, mode=ParserMods.TO_FILE),
         )
         return FileResponse(path=file, filename=str(Path(file_path).stem + ".md"))
     except Exception as e:
@@ -165,6 +264,8 @@ async def parse_to_file(
 1. `parse_images` — распознавать встроенные изображения через VLM.
 2. `include_image_in_output` — включать изображения в итоговый Markdown.
 3. `full_vlm_pdf_parse` — отправлять PDF целиком в VLM вместо стандартного пайплайна.
+4. `hybrid_pdf_parse` — отправлять в VLM только страницы PDF без текстового слоя.
+5. `profile` — профиль разбора: `fast`, `balanced` или `accurate`.
 
 ### Возвращаемый объект
 ```python
@@ -177,19 +278,22 @@ async def parse_to_word_file(
     request_fastapi: Request,
     parser_data: ParserRequest = Depends(),
 ) -> FileResponse:
+    file_path = None
     try:
         file = parser_data.file
-        file_path = await save_file(file)
+        file_path, content_hash = await save_file(file)
         parser_params = ParserParams(
             file_path=file_path,
+            content_hash=content_hash,
             parse_images=parser_data.parse_images,
             include_image_in_output=parser_data.include_image_in_output,
             full_vlm_pdf_parse=parser_data.full_vlm_pdf_parse,
+            hybrid_pdf_parse=parser_data.hybrid_pdf_parse,
+            profile=parser_data.profile,
         )
-        file = await run_in_process(
-            ParserFactory(parser_params).get_parser().parse,
+        file = await run_parser_job(
             request_fastapi.app.state.executor,
-            ParserMods.TO_WORD,
+            ParserJob(parser_params=parser_params, mode=ParserMods.TO_WORD),
         )
         return FileResponse(path=file, filename=str(Path(file_path).stem + ".docx"))
     except Exception as e:
@@ -197,3 +301,291 @@ async def parse_to_word_file(
         raise e
     finally:
         await delete_file(file_path)
+
+
+@router.post(
+    path="/parse/bundle",
+    name="Парсинг документа в несколько форматов",
+    summary="Распознать документ один раз и вернуть zip-архив с результатами в нескольких форматах",
+    description=f"""
+## Назначение
+Распознаёт документ один раз и выгружает его во все форматы из `outputs`.
+Результаты отдаются потоково одним zip-архивом, файлы в нём называются по
+имени загруженного документа:
+
+* `text` — простой текст без разметки (`.txt`);
+* `md` — Markdown, как в `/parse/file` (`.md`);
+* `docx` — Word, как в `/parse/file/word` (`.docx`);
+* `json` — `DoclingDocument` в JSON без потерь (`.json`);
+* `doctags` — разметка DocTags (`.doctags`).
+
+Заменяет отдельные вызовы `/parse/file` и `/parse/file/word`: файл
+загружается, конвертируется и очищается один раз, а документ из
+`DocumentCache` переиспользуется так же, как в остальных эндпоинтах.
+
+### Поддерживаемые MIME-типы
+```python
+{settings.ALLOWED_MIME_TYPES}
+```
+
+### Поддерживаемые форматы
+* **DOC**: `{FileFormats.DOC.value}`
+* **PDF**: `{FileFormats.PDF.value}`
+* **XLSX**: `{FileFormats.XLSX.value}`
+* **IMAGES**: `{FileFormats.IMAGE.value}`
+* **HTML**: `{FileFormats.HTML.value}`
+* **PPTX**: `{FileFormats.PPTX.value}`
+* **TXT**: `{FileFormats.TXT.value}`
+
+### Важные параметры
+1. `outputs` — форматы выдачи, можно передать несколько раз.
+2. `parse_images` — распознавать встроенные изображения через VLM.
+3. `include_image_in_output` — включать изображения в итоговый Markdown.
+4. `full_vlm_pdf_parse` — отправлять PDF целиком в VLM вместо стандартного пайплайна.
+5. `hybrid_pdf_parse` — отправлять в VLM только страницы PDF без текстового слоя.
+6. `profile` — профиль разбора: `fast`, `balanced` или `accurate`.
+
+### Возвращаемый объект
+`application/zip`
+""",
+    tags=["Parser V1"],
+)
+async def parse_to_bundle(
+    request_fastapi: Request,
+    parser_data: ParserRequest = Depends(),
+    outputs: list[OutputFormat] = Query(
+        default=[OutputFormat.MARKDOWN, OutputFormat.WORD],
+        description="Форматы, которые нужно положить в архив.",
+    ),
+) -> StreamingResponse:
+    file_path = None
+    try:
+        file = parser_data.file
+        file_path, content_hash = await save_file(file)
+        parser_params = ParserParams(
+            file_path=file_path,
+            content_hash=content_hash,
+            parse_images=parser_data.parse_images,
+            include_image_in_output=parser_data.include_image_in_output,
+            full_vlm_pdf_parse=parser_data.full_vlm_pdf_parse,
+            hybrid_pdf_parse=parser_data.hybrid_pdf_parse,
+            profile=parser_data.profile,
+        )
+        paths = await run_parser_job(
+            request_fastapi.app.state.executor,
+            ParserJob(parser_params=parser_params, mode=ParserMods.TO_BUNDLE, outputs=outputs),
+        )
+    except Exception as e:
+        logger.error(f"Ошибка парсинга документа в архив: {e}")
+        raise e
+    finally:
+        await delete_file(file_path)
+
+    stem = Path(file_path).stem
+    files = [(stem + OUTPUT_SUFFIXES[output], path) for output, path in paths.items()]
+
+    def remove_outputs():
+        for _, path in files:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.error(f"Error on deleting \"{path}\" file: {e}")
+
+    filename = quote(f"{stem}.zip")
+    return StreamingResponse(
+        iter_zip(files),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename*=utf-8''{filename}"},
+        background=BackgroundTask(remove_outputs),
+    )
+
+
+JSON_EXCLUDE_QUERY = Query(default=[], description=DoclingJsonOptions.model_fields["exclude"].description)
+JSON_COMPRESSION_QUERY = Query(
+    default=JsonCompression.NONE,
+    description=DoclingJsonOptions.model_fields["compression"].description,
+)
+
+
+@router.post(
+    path="/parse/json",
+    name="Парсинг документа в JSON DoclingDocument",
+    summary="Распознать документ и вернуть `DoclingDocument` в JSON",
+    description=f"""
+## Назначение
+Синхронно распознаёт документ и возвращает `DoclingDocument` в JSON без
+потерь — с таблицами, номерами страниц и координатами элементов, в том же
+виде, что `DoclingDocument.save_as_json` (без отступов). Документ
+загружается обратно через `DoclingDocument.model_validate_json`.
+
+### Поддерживаемые MIME-типы
+```python
+{settings.ALLOWED_MIME_TYPES}
+```
+
+### Поддерживаемые форматы
+* **DOC**: `{FileFormats.DOC.value}`
+* **PDF**: `{FileFormats.PDF.value}`
+* **XLSX**: `{FileFormats.XLSX.value}`
+* **IMAGES**: `{FileFormats.IMAGE.value}`
+* **HTML**: `{FileFormats.HTML.value}`
+* **PPTX**: `{FileFormats.PPTX.value}`
+* **TXT**: `{FileFormats.TXT.value}`
+
+### Важные параметры
+1. `exclude` — не отдавать тяжёлые поля: `page_images`, `picture_images`, `table_grids`.
+2. `compression` — `gzip` или `zstd`; ответ отдаётся с `Content-Encoding`.
+3. `parse_images` — распознавать встроенные изображения через VLM.
+4. `include_image_in_output` — рендерить изображения картинок (попадают в JSON как base64).
+5. `full_vlm_pdf_parse` — отправлять PDF целиком в VLM вместо стандартного пайплайна.
+6. `hybrid_pdf_parse` — отправлять в VLM только страницы PDF без текстового слоя.
+7. `profile` — профиль разбора: `fast`, `balanced` или `accurate`.
+
+### Возвращаемый объект
+`application/json` — `DoclingDocument`.
+""",
+    tags=["Parser V1"],
+)
+async def parse_to_json(
+    request_fastapi: Request,
+    parser_data: ParserRequest = Depends(),
+    exclude: list[JsonHeavyField] = JSON_EXCLUDE_QUERY,
+    compression: JsonCompression = JSON_COMPRESSION_QUERY,
+) -> FileResponse:
+    check_compression(compression)
+    file_path = None
+    try:
+        file = parser_data.file
+        file_path, content_hash = await save_file(file)
+        parser_params = ParserParams(
+            file_path=file_path,
+            content_hash=content_hash,
+            parse_images=parser_data.parse_images,
+            include_image_in_output=parser_data.include_image_in_output,
+            full_vlm_pdf_parse=parser_data.full_vlm_pdf_parse,
+            hybrid_pdf_parse=parser_data.hybrid_pdf_parse,
+            profile=parser_data.profile,
+        )
+        json_options = DoclingJsonOptions(exclude=exclude, compression=compression)
+        path = await run_parser_job(
+            request_fastapi.app.state.executor,
+            ParserJob(parser_params=parser_params, mode=ParserMods.TO_JSON, json_options=json_options),
+        )
+    except Exception as e:
+        logger.error(f"Ошибка парсинга документа в JSON: {e}")
+        raise e
+    finally:
+        await delete_file(file_path)
+
+    headers = {"Content-Encoding": compression.value} if compression != JsonCompression.NONE else None
+    return FileResponse(
+        path=path,
+        media_type="application/json",
+        headers=headers,
+        background=BackgroundTask(os.remove, path),
+    )
+
+
+@router.post(
+    path="/parse/json/stream",
+    name="Потоковый парсинг документа в JSON DoclingDocument",
+    summary="Распознать документ и отдавать `DoclingDocument` по страницам (NDJSON)",
+    description=f"""
+## Назначение
+Распознаёт документ и отдаёт `DoclingDocument` в JSON по мере готовности в
+виде NDJSON: одна строка — один фрагмент. PDF отдаётся фрагментами по
+`PARSER_STREAM_CHUNK_PAGES` страниц (сейчас {settings.PARSER_STREAM_CHUNK_PAGES}),
+каждый фрагмент — самостоятельный `DoclingDocument` своих страниц с
+исходными номерами страниц и координатами. Остальные форматы отдаются одним
+фрагментом.
+
+При `compression` весь поток сжимается, а каждый фрагмент сбрасывается до
+границы блока, поэтому клиент может распаковывать его по мере получения.
+
+### Поддерживаемые MIME-типы
+```python
+{settings.ALLOWED_MIME_TYPES}
+```
+
+### Поддерживаемые форматы
+* **DOC**: `{FileFormats.DOC.value}`
+* **PDF**: `{FileFormats.PDF.value}`
+* **XLSX**: `{FileFormats.XLSX.value}`
+* **IMAGES**: `{FileFormats.IMAGE.value}`
+* **HTML**: `{FileFormats.HTML.value}`
+* **PPTX**: `{FileFormats.PPTX.value}`
+* **TXT**: `{FileFormats.TXT.value}`
+
+### Важные параметры
+1. `exclude` — не отдавать тяжёлые поля: `page_images`, `picture_images`, `table_grids`.
+2. `compression` — `gzip` или `zstd`; ответ отдаётся с `Content-Encoding`.
+3. `full_vlm_pdf_parse` — отправлять PDF целиком в VLM вместо стандартного пайплайна (без постраничной выдачи).
+4. `hybrid_pdf_parse` — отправлять в VLM только страницы PDF без текстового слоя.
+5. `profile` — профиль разбора: `fast`, `balanced` или `accurate`.
+
+### Строка ответа
+```python
+{ParserJsonChunk.model_fields}
+```
+""",
+    tags=["Parser V1"],
+)
+async def parse_to_json_stream(
+    request_fastapi: Request,
+    parser_data: ParserRequest = Depends(),
+    exclude: list[JsonHeavyField] = JSON_EXCLUDE_QUERY,
+    compression: JsonCompression = JSON_COMPRESSION_QUERY,
+) -> StreamingResponse:
+    compressor = StreamCompressor(compression)
+    file = parser_data.file
+    file_path, content_hash = await save_file(file)
+    parser_params = ParserParams(
+        file_path=file_path,
+        content_hash=content_hash,
+        parse_images=parser_data.parse_images,
+        include_image_in_output=parser_data.include_image_in_output,
+        full_vlm_pdf_parse=parser_data.full_vlm_pdf_parse,
+        hybrid_pdf_parse=parser_data.hybrid_pdf_parse,
+        profile=parser_data.profile,
+    )
+    json_options = DoclingJsonOptions(exclude=exclude, compression=compression)
+    job = ParserJob(parser_params=parser_params, mode=ParserMods.TO_JSON, json_options=json_options)
+
+    async def ndjson_chunks():
+        try:
+            async for data in stream_json_job(request_fastapi.app.state.executor, job):
+                yield await asyncio.to_thread(compressor.compress, data)
+            yield compressor.finish()
+        except Exception as e:
+            logger.error(f"Ошибка потокового парсинга документа в JSON: {e}")
+            raise e
+
+    headers = {"Content-Encoding": compression.value} if compression != JsonCompression.NONE else None
+    return StreamingResponse(
+        ndjson_chunks(),
+        media_type="application/x-ndjson",
+        headers=headers,
+        background=BackgroundTask(delete_file, file_path),
+    )
+
+
+@router.get(
+    path="/cache/stats",
+    name="Статистика кэша документов",
+    summary="Попадания, промахи и размер кэша разобранных документов",
+    description=f"""
+## Назначение
+Возвращает состояние `DocumentCache` — кэша разобранных `DoclingDocument`,
+общего для эндпоинтов парсинга и перевода. Счётчики `hits` и `misses`
+считаются с момента запуска процесса.
+
+### Возвращаемый объект
+```python
+{DocumentCacheStats.model_fields}
+```
+""",
+    tags=["Parser V1"],
+)
+async def get_document_cache_stats() -> DocumentCacheStats:
+    stats = await asyncio.to_thread(document_cache.stats)
+    return DocumentCacheStats(enabled=settings.DOCUMENT_CACHE_ENABLED, **stats)
@@ -10,6 +10,11 @@ from settings import settings
 from modules.parser.v1.exceptions import ContentNotSupportedError
 
 
+class ParseProfile(str, enum.Enum):
+    FAST = "fast"
+    BALANCED = "balanced"
+    ACCURATE = "accurate"
+
 class ParserRequest(BaseModel):
     file: UploadFile = File(description="Файл, который нужно распознать.")
     parse_images: Optional[bool] = Field(
@@ -33,6 +38,24 @@ class ParserRequest(BaseModel):
         ),
         default=False,
     )
+    hybrid_pdf_parse: Optional[bool] = Field(
+        description=(
+            "Гибридный разбор PDF: страницы с текстовым слоем — стандартным "
+            "пайплайном Docling, сканированные и битые страницы — через VLM. "
+            "Игнорируется при `full_vlm_pdf_parse`."
+        ),
+        default=False,
+    )
+    profile: Optional[ParseProfile] = Field(
+        description=(
+            "Профиль разбора: `fast` — без распознавания структуры таблиц, "
+            "`balanced` — быстрый режим TableFormer, `accurate` — точный режим "
+            "TableFormer и распознавание блоков кода. Изображения страниц и "
+            "картинок рендерятся только при `parse_images` или "
+            "`include_image_in_output`. По умолчанию — `PARSE_PROFILE`."
+        ),
+        default=None,
+    )
     
     @field_validator("file", mode="after")  
     @classmethod
@@ -55,6 +78,43 @@ class ParserTextResponse(BaseModel):
         examples=["## Заголовок\n\nТекст документа"],
     )
 
+class DocumentCacheStats(BaseModel):
+    enabled: bool = Field(description="Включён ли кэш документов.")
+    hits: int = Field(description="Попаданий в кэш с момента запуска процесса.")
+    misses: int = Field(description="Промахов кэша с момента запуска процесса.")
+    entries: int = Field(description="Количество документов в кэше.")
+    size_bytes: int = Field(description="Суммарный размер кэша на диске.")
+    max_bytes: int = Field(description="Предельный размер кэша, после которого вытесняются давно не читанные документы.")
+    ttl_secs: int = Field(description="Время жизни записи.")
+
+class ParserTextChunk(BaseModel):
+    chunk: int = Field(description="Порядковый номер фрагмента, начиная с 0.")
+    page_from: Optional[int] = Field(
+        default=None,
+        description="Первая страница фрагмента. `None` для форматов без постраничной выдачи.",
+    )
+    page_to: Optional[int] = Field(
+        default=None,
+        description="Последняя страница фрагмента включительно.",
+    )
+    text: str = Field(
+        description="Markdown фрагмента. Конкатенация `text` всех фрагментов даёт документ целиком.",
+    )
+
+class ParserJsonChunk(BaseModel):
+    chunk: int = Field(description="Порядковый номер фрагмента, начиная с 0.")
+    page_from: Optional[int] = Field(
+        default=None,
+        description="Первая страница фрагмента. `None` для форматов без постраничной выдачи.",
+    )
+    page_to: Optional[int] = Field(
+        default=None,
+        description="Последняя страница фрагмента включительно.",
+    )
+    document: dict = Field(
+        description="`DoclingDocument` страниц фрагмента в JSON; номера страниц и координаты — как в исходном документе.",
+    )
+
 class DocLingAPIVLMOptionsParams(BaseModel):
     model: str = Field(description="Имя VLM-модели, используемой для OCR.")
     max_tokens: Optional[int] = Field(default=4096)
@@ -64,8 +124,8 @@ class FileFormats(list[str], enum.Enum):
     IMAGE = [".jpg", ".jpeg", ".png", ".tiff", ".bmp", ".webp"]
     PDF = [".pdf"]
     DOC = [".docx", ".odt", ".doc", '.rtf']
-    PPTX = [".pptx", ".odp"]
-    XLSX = [".xlsx", ".ods"]
+    PPTX = [".pptx", ".odp", ".ppt"]
+    XLSX = [".xlsx", ".ods", ".xls"]
     HTML = [".html"]
     TXT = [".txt"]
 
@@ -74,7 +134,72 @@ class ParserMods(str, enum.Enum):
     TO_FILE = "to_file"
     TO_DOCLING = "to_docling"
     TO_WORD = "to_word"
+    TO_BUNDLE = "to_bundle"
+    TO_JSON = "to_json"
+
+class OutputFormat(str, enum.Enum):
+    TEXT = "text"
+    MARKDOWN = "md"
+    WORD = "docx"
+    DOCLING_JSON = "json"
+    DOCTAGS = "doctags"
+
+class JsonCompression(str, enum.Enum):
+    NONE = "none"
+    GZIP = "gzip"
+    ZSTD = "zstd"
+
+class JsonHeavyField(str, enum.Enum):
+    PAGE_IMAGES = "page_images"
+    PICTURE_IMAGES = "picture_images"
+    TABLE_GRIDS = "table_grids"
+
+class DoclingJsonOptions(BaseModel):
+    exclude: list[JsonHeavyField] = Field(
+        description=(
+            "Тяжёлые поля, которые не нужно отдавать: `page_images` — изображения "
+            "страниц, `picture_images` — base64 изображений картинок и таблиц, "
+            "`table_grids` — вычисляемая сетка `grid` таблиц (восстанавливается "
+            "из `table_cells` при загрузке документа)."
+        ),
+        default_factory=list,
+    )
+    compression: JsonCompression = Field(
+        description="Сжатие ответа: `gzip` или `zstd` (передаётся в `Content-Encoding`).",
+        default=JsonCompression.NONE,
+    )
     
+class VLMImageFormat(str, enum.Enum):
+    PNG = "png"
+    JPEG = "jpeg"
+    WEBP = "webp"
+
+class PreparedImage(BaseModel):
+    image_bytes: bytes = Field(description="Закодированное изображение для запроса к VLM.")
+    mime_type: str = Field(description="MIME-тип `image_bytes`.")
+    width: int = Field(description="Ширина после предобработки.")
+    height: int = Field(description="Высота после предобработки.")
+    original_bytes: Optional[int] = Field(
+        default=None,
+        description="Размер исходного файла без предобработки; `None`, если изображение получено не из файла.",
+    )
+    original_tokens: int = Field(description="Оценка числа визуальных токенов исходного изображения.")
+    estimated_tokens: int = Field(description="Оценка числа визуальных токенов после предобработки.")
+
+class ParseRoute(str, enum.Enum):
+    NATIVE = "native"
+    RENAMED = "renamed"
+    LIBREOFFICE = "libreoffice"
+
+class ParsePlan(BaseModel):
+    detected_format: str = Field(description="Формат по содержимому файла (расширение вида `.docx`).")
+    parser_format: str = Field(description="Формат файла, который получит парсер.")
+    route: ParseRoute = Field(description="Путь разбора: напрямую, с переименованием или через LibreOffice.")
+    conversion_target: Optional[str] = Field(
+        default=None,
+        description="Целевой формат конвертации LibreOffice.",
+    )
+
 class ParserParams(BaseModel):
     file_path: Union[str, Path] = Field(description="Путь к временному файлу на диске.")
     parse_images: Optional[bool] = Field(
@@ -89,6 +214,57 @@ class ParserParams(BaseModel):
         description="Признак полного VLM-парсинга PDF.",
         default=False,
     )
+    hybrid_pdf_parse: Optional[bool] = Field(
+        description="Признак гибридного парсинга PDF (VLM только для страниц без текстового слоя).",
+        default=False,
+    )
+    profile: Optional[ParseProfile] = Field(
+        description="Профиль разбора, по которому строятся опции пайплайнов Docling.",
+        default=None,
+        validate_default=True,
+    )
+    content_hash: Optional[str] = Field(
+        description="sha256 содержимого файла. Вычисляется перед отправкой задачи, если не задан.",
+        default=None,
+    )
+
+    @field_validator("profile", mode="after")
+    @classmethod
+    def default_profile(cls, profile: Optional[ParseProfile]) -> ParseProfile:
+        return profile or ParseProfile(settings.PARSE_PROFILE)
+
+    @property
+    def render_pictures(self) -> bool:
+        """Нужны ли изображения картинок документа: для OCR или для выдачи."""
+        return bool(self.parse_images or self.include_image_in_output)
+
+
+class ParserJob(BaseModel):
+    parser_params: ParserParams = Field(description="Параметры парсинга, по которым воркер сам создаёт парсер.")
+    mode: ParserMods = Field(description="Режим выдачи результата.")
+    cache_key: Optional[str] = Field(
+        description="Ключ `DocumentCache`, под которым воркер сохранит `DoclingDocument`.",
+        default=None,
+    )
+    plan: Optional[ParsePlan] = Field(
+        description="План разбора, выбранный по содержимому файла.",
+        default=None,
+    )
+    outputs: list[OutputFormat] = Field(
+        description="Форматы выдачи для режима `TO_BUNDLE`.",
+        default_factory=list,
+    )
+    json_options: DoclingJsonOptions = Field(
+        description="Параметры выгрузки JSON для режима `TO_JSON`.",
+        default_factory=DoclingJsonOptions,
+    )
+    keep_picture_images: Optional[bool] = Field(
+        description=(
+            "Оставить изображения картинок в документе режима `TO_DOCLING`; "
+            "по умолчанию — если они нужны в выдаче (`include_image_in_output`)."
+        ),
+        default=None,
+    )
     
     
 class ConvertationOutputs(str, enum.Enum):
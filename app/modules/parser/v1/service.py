@@ -0,0 +1,351 @@
+import asyncio
+from collections import deque
+from itertools import islice
+from contextlib import asynccontextmanager
+from pathlib import Path
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import AsyncIterator, Optional
+import math
+
+from loguru import logger
+
+from settings import settings
+from modules.parser.v1.cache import DocumentCache, document_cache
+from modules.parser.v1.file_parsers import TXTParser
+from modules.parser.v1.handoff import DocumentHandoff, discard_results
+from modules.parser.v1.libreoffice import libreoffice_pool
+from modules.parser.v1.planner import plan_parsing
+from modules.parser.v1.schemas import FileFormats, JsonCompression, ParseRoute, ParserJob, ParserMods, ParserTextChunk
+from modules.parser.v1.utils import (
+    file_sha256, link_or_copy, get_pdf_page_count, get_xlsx_sheet_weights, run_in_process, split_page_ranges, split_weighted
+)
+from modules.parser.v1.worker import (
+    export_document, merge_pdf_shards, merge_xlsx_shards, parse_job, parse_pdf_pages, parse_pdf_pages_json, parse_pdf_shard,
+    parse_xlsx_shard,
+)
+
+JSON_STREAM_READ_BYTES = 1024 ** 2
+
+
+def parser_format(job: ParserJob) -> str:
+    """Формат файла, который получит парсер: по плану разбора, если он уже составлен."""
+    if job.plan is not None:
+        return job.plan.parser_format
+    return Path(job.parser_params.file_path).suffix.lower()
+
+
+def with_file_path(job: ParserJob, file_path: Path) -> ParserJob:
+    parser_params = job.parser_params.model_copy(update={"file_path": file_path})
+    return job.model_copy(update={"parser_params": parser_params})
+
+
+def is_paged_pdf_job(job: ParserJob) -> bool:
+    """Можно ли разбирать документ задачи по диапазонам страниц стандартным `PDFParser`."""
+    return not job.parser_params.full_vlm_pdf_parse and parser_format(job) in FileFormats.PDF.value
+
+
+async def plan_parser_job(job: ParserJob) -> ParserJob:
+    """Определить формат по содержимому и выбрать путь разбора (см. `plan_parsing`)."""
+    if job.plan is not None:
+        return job
+    plan = await asyncio.to_thread(plan_parsing, job.parser_params.file_path)
+    logger.info(
+        f"План разбора \"{Path(job.parser_params.file_path).name}\": "
+        f"{plan.detected_format} -> {plan.parser_format} ({plan.route.value})"
+    )
+    return job.model_copy(update={"plan": plan})
+
+
+@asynccontextmanager
+async def prepared_source(job: ParserJob) -> AsyncIterator[ParserJob]:
+    """Подготовить файл по плану разбора и удалить промежуточные файлы после выхода."""
+    plan = job.plan
+    if plan is None or plan.route == ParseRoute.NATIVE:
+        yield job
+        return
+    source_path = Path(job.parser_params.file_path)
+    if plan.route == ParseRoute.LIBREOFFICE:
+        prepared_path = await libreoffice_pool.convert(source_path, plan.conversion_target)
+    else:
+        prepared_path = Path(tempfile.mkdtemp(prefix="renamed_")) / f"{source_path.stem}{plan.parser_format}"
+        await asyncio.to_thread(link_or_copy, source_path, prepared_path)
+    try:
+        yield with_file_path(job, prepared_path)
+    finally:
+        await asyncio.to_thread(shutil.rmtree, prepared_path.parent, True)
+
+
+async def get_document_cache_key(job: ParserJob) -> Optional[str]:
+    """Ключ `DocumentCache` для задачи или `None`, если результат не кэшируется."""
+    parser_params = job.parser_params
+    if not settings.DOCUMENT_CACHE_ENABLED or parser_format(job) in FileFormats.TXT.value:
+        return None
+    if parser_params.content_hash is None:
+        parser_params.content_hash = await asyncio.to_thread(file_sha256, parser_params.file_path)
+    file_format = job.plan.detected_format if job.plan is not None else parser_format(job)
+    return DocumentCache.make_key(parser_params, file_format)
+
+
+async def plan_pdf_shards(job: ParserJob) -> Optional[list[tuple[int, int]]]:
+    """Вернуть диапазоны страниц для шардированного разбора PDF или `None`."""
+    parser_params = job.parser_params
+    if (
+        settings.PDF_SHARD_THRESHOLD_PAGES <= 0
+        or settings.PARSER_WORKERS < 2
+        or not is_paged_pdf_job(job)
+    ):
+        return None
+    try:
+        page_count = await asyncio.to_thread(get_pdf_page_count, parser_params.file_path)
+    except Exception as e:
+        logger.warning(f"Не удалось определить число страниц PDF, шардирование отключено: {e}")
+        return None
+    if page_count < settings.PDF_SHARD_THRESHOLD_PAGES:
+        return None
+    page_ranges = split_page_ranges(page_count, settings.PARSER_WORKERS, settings.PDF_SHARD_MIN_PAGES)
+    if len(page_ranges) < 2:
+        return None
+    logger.info(f"PDF на {page_count} стр. будет разобран в {len(page_ranges)} шардах: {page_ranges}")
+    return page_ranges
+
+
+async def plan_xlsx_shards(job: ParserJob) -> Optional[list[list[str]]]:
+    """Вернуть группы листов для параллельного разбора книги XLSX или `None`.
+
+    Листы делятся на смежные группы с близким суммарным размером XML, поэтому
+    результаты склеиваются в порядке книги.
+    """
+    if (
+        settings.XLSX_SHARD_MIN_SHEETS <= 0
+        or settings.PARSER_WORKERS < 2
+        or parser_format(job) not in FileFormats.XLSX.value
+    ):
+        return None
+    try:
+        sheets = await asyncio.to_thread(get_xlsx_sheet_weights, job.parser_params.file_path)
+    except Exception as e:
+        logger.warning(f"Не удалось прочитать листы книги, разбор без разбиения: {e}")
+        return None
+    if len(sheets) < settings.XLSX_SHARD_MIN_SHEETS or sum(weight for _, weight in sheets) < settings.XLSX_SHARD_MIN_BYTES:
+        return None
+    groups = split_weighted([weight for _, weight in sheets], settings.PARSER_WORKERS)
+    if len(groups) < 2:
+        return None
+    sheet_groups = [[sheets[index][0] for index in group] for group in groups]
+    logger.info(f"Книга на {len(sheets)} листов будет разобрана в {len(sheet_groups)} шардах")
+    return sheet_groups
+
+
+async def run_parser_job(executor, job: ParserJob):
+    """Отправить задачу парсинга в пул процессов.
+
+    Через границу процессов передаётся только `ParserJob`; парсер создаётся
+    внутри воркера, где переиспользует его кэш конвертеров. Большие PDF
+    разбиваются на диапазоны страниц, а книги XLSX с большим числом листов —
+    на группы листов, которые конвертируются параллельно на разных воркерах и
+    затем склеиваются в исходном порядке.
+
+    Если документ с тем же содержимым и параметрами разбора уже есть в
+    `DocumentCache`, пул не задействуется: документ читается с диска и
+    выгружается в текущем процессе. Формат определяется по содержимому;
+    LibreOffice (до отправки задачи, не занимая воркер парсинга) нужен только
+    для форматов, которые не читает Docling.
+
+    Документ режима `TO_DOCLING` воркер возвращает как `DocumentHandoff`; он
+    распаковывается здесь, в отдельном потоке (см. `handoff`, там же — почему
+    это всё ещё задерживает цикл событий), а его размер и время распаковки
+    пишутся в лог.
+    """
+    job = await plan_parser_job(job)
+    cache_key = await get_document_cache_key(job)
+    if cache_key:
+        doc = await asyncio.to_thread(document_cache.get, cache_key)
+        if doc is not None:
+            logger.info(f"Документ \"{Path(job.parser_params.file_path).name}\" взят из кэша")
+            # Для выгрузки нужен только класс парсера, сам файл не читается.
+            export_job = with_file_path(job, Path(job.parser_params.file_path).with_suffix(parser_format(job)))
+            return await asyncio.to_thread(export_document, doc, export_job)
+        job = job.model_copy(update={"cache_key": cache_key})
+
+    async with prepared_source(job) as prepared_job:
+        result = await submit_parser_job(executor, prepared_job)
+    if isinstance(result, DocumentHandoff):
+        try:
+            started = time.perf_counter()
+            doc = await asyncio.to_thread(result.load)
+            logger.info(
+                f"Документ \"{Path(job.parser_params.file_path).name}\" получен от воркера: "
+                f"{result.size / 1024 ** 2:.2f} МБ {'файлом' if result.path else 'в канале пула'}, "
+                f"распакован за {time.perf_counter() - started:.2f} с"
+            )
+            return doc
+        finally:
+            await asyncio.to_thread(result.discard)
+    return result
+
+
+async def run_handoff_in_process(fn, executor, *args):
+    """`run_in_process` для задач, результат которых может быть `DocumentHandoff`.
+
+    Если запрос отменён, пока воркер ещё работает, результат задачи никто не
+    заберёт, поэтому его временный файл удаляется, когда задача завершится.
+    """
+    future = asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        future.add_done_callback(discard_finished_result)
+        raise
+
+
+def discard_finished_result(future: asyncio.Future):
+    if not future.cancelled() and future.exception() is None:
+        discard_results([future.result()])
+
+
+async def run_shards(executor, parse_shard, job: ParserJob, parts: list) -> list:
+    """Разобрать части документа в пуле; при ошибке временные файлы готовых шардов удаляются."""
+    shard_job = job.model_copy(update={"cache_key": None})
+    shards = await asyncio.gather(
+        *[run_handoff_in_process(parse_shard, executor, shard_job, part) for part in parts], return_exceptions=True
+    )
+    errors = [shard for shard in shards if isinstance(shard, BaseException)]
+    if errors:
+        await asyncio.to_thread(discard_results, shards)
+        raise errors[0]
+    return shards
+
+
+async def merge_shards(executor, merge, shards: list, job: ParserJob):
+    try:
+        return await run_handoff_in_process(merge, executor, shards, job)
+    finally:
+        # Воркер склейки удаляет файлы сам; здесь — если он до них не дошёл.
+        await asyncio.to_thread(discard_results, shards)
+
+
+async def submit_parser_job(executor, job: ParserJob):
+    page_ranges = await plan_pdf_shards(job)
+    if page_ranges:
+        shards = await run_shards(executor, parse_pdf_shard, job, page_ranges)
+        return await merge_shards(executor, merge_pdf_shards, shards, job)
+    sheet_groups = await plan_xlsx_shards(job)
+    if sheet_groups:
+        shards = await run_shards(executor, parse_xlsx_shard, job, sheet_groups)
+        return await merge_shards(executor, merge_xlsx_shards, shards, job)
+    return await run_handoff_in_process(parse_job, executor, job)
+
+
+async def stream_parser_job(executor, job: ParserJob) -> AsyncIterator[ParserTextChunk]:
+    """Разобрать документ в Markdown и отдавать результат по мере готовности.
+
+    PDF конвертируется фрагментами по `PARSER_STREAM_CHUNK_PAGES` страниц;
+    одновременно в работе не больше `PARSER_STREAM_WINDOW` фрагментов, а
+    отдаются они строго по порядку. TXT отдаётся блоками по `TXT_CHUNK_BYTES`
+    (см. `stream_text_job`). Остальные форматы, а также документы из
+    `DocumentCache`, отдаются одним фрагментом.
+    """
+    job = await plan_parser_job(job)
+    if parser_format(job) in FileFormats.TXT.value:
+        async for chunk in stream_text_job(job):
+            yield chunk
+        return
+    cache_key = await get_document_cache_key(job)
+    if not is_paged_pdf_job(job) or (
+        cache_key and await asyncio.to_thread(document_cache.path_for(cache_key).exists)
+    ):
+        text = await run_parser_job(executor, job.model_copy(update={"mode": ParserMods.TO_TEXT}))
+        yield ParserTextChunk(chunk=0, text=text)
+        return
+
+    chunk = 0
+    async for (page_from, page_to), text in iter_pdf_windows(executor, job, parse_pdf_pages):
+        yield ParserTextChunk(chunk=chunk, page_from=page_from, page_to=page_to, text=text)
+        chunk += 1
+
+
+async def iter_pdf_windows(executor, job: ParserJob, parse_pages) -> AsyncIterator[tuple[tuple[int, int], object]]:
+    """Разбирать PDF окнами по `PARSER_STREAM_CHUNK_PAGES` страниц и отдавать `(диапазон, результат)`.
+
+    `parse_pages(job, page_range)` выполняется в пуле; одновременно в работе
+    не больше `PARSER_STREAM_WINDOW` окон, а результаты отдаются по порядку.
+    """
+    async with prepared_source(job) as prepared_job:
+        page_count = await asyncio.to_thread(get_pdf_page_count, prepared_job.parser_params.file_path)
+        chunk_pages = max(1, settings.PARSER_STREAM_CHUNK_PAGES)
+        page_ranges = iter(split_page_ranges(page_count, math.ceil(page_count / chunk_pages), chunk_pages))
+
+        def submit(page_range: tuple[int, int]):
+            return page_range, asyncio.ensure_future(
+                run_in_process(parse_pages, executor, prepared_job, page_range)
+            )
+
+        pending = deque(submit(page_range) for page_range in islice(page_ranges, max(1, settings.PARSER_STREAM_WINDOW)))
+        try:
+            while pending:
+                page_range, future = pending.popleft()
+                result = await future
+                next_range = next(page_ranges, None)
+                if next_range is not None:
+                    pending.append(submit(next_range))
+                yield page_range, result
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def json_chunk_prefix(chunk: int, page_from: Optional[int] = None, page_to: Optional[int] = None) -> bytes:
+    """Начало строки NDJSON `ParserJsonChunk` до значения `document`; строку закрывает `b"}\\n"`."""
+    header = json.dumps({"chunk": chunk, "page_from": page_from, "page_to": page_to})
+    return header[:-1].encode() + b', "document": '
+
+
+async def stream_json_job(executor, job: ParserJob) -> AsyncIterator[bytes]:
+    """Разобрать документ в JSON `DoclingDocument` и отдавать строки NDJSON по мере готовности.
+
+    PDF отдаётся окнами страниц, как в `stream_parser_job`, — каждый фрагмент
+    является самостоятельным `DoclingDocument` своих страниц. Остальные
+    форматы и документы из `DocumentCache` отдаются одной строкой.
+    """
+    job = await plan_parser_job(job)
+    cache_key = await get_document_cache_key(job)
+    if not is_paged_pdf_job(job) or (
+        cache_key and await asyncio.to_thread(document_cache.path_for(cache_key).exists)
+    ):
+        json_options = job.json_options.model_copy(update={"compression": JsonCompression.NONE})
+        json_job = job.model_copy(update={"mode": ParserMods.TO_JSON, "json_options": json_options})
+        path = await run_parser_job(executor, json_job)
+        try:
+            yield json_chunk_prefix(0)
+            with open(path, "rb") as file:
+                while data := await asyncio.to_thread(file.read, JSON_STREAM_READ_BYTES):
+                    yield data
+            yield b"}\n"
+        finally:
+            await asyncio.to_thread(os.remove, path)
+        return
+
+    chunk = 0
+    async for (page_from, page_to), document in iter_pdf_windows(executor, job, parse_pdf_pages_json):
+        yield json_chunk_prefix(chunk, page_from, page_to) + document + b"}\n"
+        chunk += 1
+
+
+async def stream_text_job(job: ParserJob) -> AsyncIterator[ParserTextChunk]:
+    """Отдавать TXT блоками по мере чтения, не загружая файл целиком.
+
+    Декодирование и нормализация блока дешевле межпроцессной передачи,
+    поэтому выполняются в потоке текущего процесса, а не в пуле воркеров.
+    """
+    async with prepared_source(job) as prepared_job:
+        chunks = TXTParser(prepared_job.parser_params).iter_chunks()
+        chunk = 0
+        while (text := await asyncio.to_thread(next, chunks, None)) is not None:
+            yield ParserTextChunk(chunk=chunk, text=text)
+            chunk += 1
+        if chunk == 0:
+            yield ParserTextChunk(chunk=0, text="")
@@ -1,72 +1,243 @@
 from pathlib import Path
 import tempfile
 import os
-from typing import Union, Optional
+import math
+import time
+import hashlib
+import zipfile
+import io
+from typing import BinaryIO, Iterator, Union, Optional
 import asyncio
-import aiofiles
-from aiofiles.os import remove as aioremove
+from aiofiles.os import remove as aioremove, rmdir as aiormdir
 import subprocess
+import shutil
 
+import pypdfium2
+from openpyxl import load_workbook
 from loguru import logger
 from fastapi import UploadFile
 
+from settings import settings
 from modules.parser.v1.schemas import ConvertationOutputs
+from modules.parser.v1.exceptions import PayloadTooLargeError
 
 
-async def save_file(file: UploadFile) -> Path:
+UPLOAD_DIR_PREFIX = "upload_"
+
+def spool_upload(source: BinaryIO, target_path: Path, max_bytes: int, chunk_size: int) -> str:
+    """Скопировать поток в файл фиксированными блоками, считая sha256 в том же проходе."""
+    digest = hashlib.sha256()
+    written = 0
+    with open(target_path, "wb") as target:
+        while chunk := source.read(chunk_size):
+            written += len(chunk)
+            if max_bytes > 0 and written > max_bytes:
+                raise PayloadTooLargeError(max_bytes)
+            digest.update(chunk)
+            target.write(chunk)
+    return digest.hexdigest()
+
+async def save_file(file: UploadFile) -> tuple[Path, str]:
+    """Сохранить загруженный файл в `UPLOAD_SPOOL_DIR` и вернуть `(путь, sha256)`.
+
+    Каждая загрузка получает собственный каталог, поэтому исходное имя файла
+    сохраняется без риска коллизий. Файл копируется потоково, в памяти
+    находится не больше одного блока; при превышении `UPLOAD_MAX_BYTES`
+    загрузка прерывается с 413. Приём слишком большого тела запроса
+    останавливает раньше `UploadLimitMiddleware`, здесь проверяется точный
+    размер файла.
+    """
     temp_path = None
     try:
-        temp_dir = tempfile.gettempdir()
-        original_filename = file.filename
-        
-        file_stem = Path(original_filename).stem
-        file_suffix = Path(original_filename).suffix
-        
-        temp_path = os.path.join(temp_dir, original_filename)
-        
-        counter = 1
-        while os.path.exists(temp_path):
-            new_filename = f"{file_stem}_{counter}{file_suffix}"
-            temp_path = os.path.join(temp_dir, new_filename)
-            counter += 1
-        
-        content = await file.read()
-        
-        async with aiofiles.open(temp_path, 'wb') as f:
-            await f.write(content)
+        if settings.UPLOAD_MAX_BYTES > 0 and file.size is not None and file.size > settings.UPLOAD_MAX_BYTES:
+            raise PayloadTooLargeError(settings.UPLOAD_MAX_BYTES)
+        spool_dir = Path(settings.UPLOAD_SPOOL_DIR)
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        upload_dir = Path(tempfile.mkdtemp(prefix=UPLOAD_DIR_PREFIX, dir=spool_dir))
+        temp_path = upload_dir / (Path(file.filename or "").name or "upload")
+
+        await file.seek(0)
+        content_hash = await asyncio.to_thread(
+            spool_upload, file.file, temp_path, settings.UPLOAD_MAX_BYTES, settings.UPLOAD_CHUNK_BYTES
+        )
 
         logger.success(f"File saved at: {temp_path}")
-        return Path(temp_path)
+        return temp_path, content_hash
     except Exception as e:
         logger.error(f"Error saving_file: {e}")
         await delete_file(temp_path)
         raise
 
-async def delete_file(file_path: Path):
+async def delete_file(file_path: Optional[Path]):
+    if file_path is None:
+        return
     try:
         logger.debug(f"Deleting \"{file_path}\" file")
         await aioremove(file_path)
         logger.success(f"File \"{file_path}\" succesfully deleted!")
     except Exception as e:
         logger.error(f"Error on deleting \"{file_path}\" file: {e}")
-
-def read_file_content(file_path: Path):
-    try:
-        with open(file_path, mode='r', encoding='utf-8') as file:
-            contents = file.read()
-            return contents
-    except Exception as e:
-        logger.error(f"Error on deleting \"{file_path}\" file: {e}")
+    upload_dir = Path(file_path).parent
+    if upload_dir.name.startswith(UPLOAD_DIR_PREFIX):
+        try:
+            await aiormdir(upload_dir)
+        except OSError:
+            pass
 
 async def run_in_process(fn, app_executor, *args):
     loop = asyncio.get_event_loop()
     return await loop.run_in_executor(app_executor, fn, *args)
 
+def link_or_copy(source_path: Union[Path, str], target_path: Union[Path, str]):
+    try:
+        os.link(source_path, target_path)
+    except OSError:
+        shutil.copyfile(source_path, target_path)
+
+def file_sha256(file_path: Union[Path, str], chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ZipStreamBuffer(io.RawIOBase):
+    """Поток без `seek` для `zipfile`: записанные байты забираются через `take()`."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+def iter_zip(files: list[tuple[str, Union[Path, str]]], chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """Собрать zip-архив из файлов `(имя в архиве, путь)` и отдавать его по мере записи.
+
+    Архив не пишется на диск: `zipfile` без `seek` ставит дескрипторы данных
+    после каждого файла, поэтому в памяти держится не больше одного блока.
+    Уже сжатые `.docx` кладутся без повторного сжатия.
+    """
+    buffer = ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, path in files:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED if name.endswith(".docx") else zipfile.ZIP_DEFLATED
+            # По известному размеру `zipfile` сам решит, нужны ли поля ZIP64.
+            info.file_size = os.path.getsize(path)
+            with open(path, "rb") as source, archive.open(info, "w") as target:
+                while chunk := source.read(chunk_size):
+                    target.write(chunk)
+                    if data := buffer.take():
+                        yield data
+    yield buffer.take()
+
+def get_pdf_page_count(file_path: Union[Path, str]) -> int:
+    pdf = pypdfium2.PdfDocument(str(file_path))
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+def split_page_ranges(page_count: int, parts: int, min_pages: int = 1) -> list[tuple[int, int]]:
+    """Разбить страницы `1..page_count` на не более чем `parts` смежных диапазонов."""
+    pages_per_range = max(min_pages, math.ceil(page_count / max(1, parts)))
+    return [
+        (start, min(start + pages_per_range - 1, page_count))
+        for start in range(1, page_count + 1, pages_per_range)
+    ]
+
+def get_xlsx_sheet_weights(file_path: Union[Path, str]) -> list[tuple[str, int]]:
+    """Листы книги XLSX в порядке книги и размер XML каждого листа — оценка объёма разбора."""
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            sizes = {info.filename: info.file_size for info in archive.infolist()}
+        return [(sheet.title, sizes.get(sheet._worksheet_path.lstrip("/"), 0)) for sheet in workbook.worksheets]
+    finally:
+        workbook.close()
+
+EMPTY_WORKSHEET_XML = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData/></worksheet>'
+)
+
+def write_xlsx_sheet_subset(source_path: Union[Path, str], target_path: Union[Path, str], sheet_names: list[str]):
+    """Скопировать книгу XLSX, заменив остальные листы пустыми.
+
+    Структура книги (`workbook.xml`, имена и порядок листов, определённые имена)
+    не меняется, поэтому копия открывается так же, как исходный файл, но
+    `openpyxl` не разбирает XML чужих листов.
+    """
+    workbook = load_workbook(source_path, read_only=True)
+    try:
+        dropped = {
+            sheet._worksheet_path.lstrip("/") for sheet in workbook.worksheets if sheet.title not in sheet_names
+        }
+    finally:
+        workbook.close()
+    dropped_rels = {f"{Path(name).parent}/_rels/{Path(name).name}.rels" for name in dropped}
+    with zipfile.ZipFile(source_path) as source, zipfile.ZipFile(target_path, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            if info.filename in dropped_rels:
+                continue
+            if info.filename in dropped:
+                target.writestr(info.filename, EMPTY_WORKSHEET_XML)
+                continue
+            with source.open(info) as member, target.open(info.filename, "w", force_zip64=True) as copy:
+                shutil.copyfileobj(member, copy, 1024 * 1024)
+
+def split_weighted(weights: list[int], parts: int) -> list[list[int]]:
+    """Разбить индексы `weights` на не более чем `parts` смежных групп, минимизируя самую тяжёлую группу."""
+
+    def pack(limit: int) -> list[list[int]]:
+        groups, group_weight = [[]], 0
+        for index, weight in enumerate(weights):
+            if groups[-1] and group_weight + weight > limit:
+                groups.append([])
+                group_weight = 0
+            groups[-1].append(index)
+            group_weight += weight
+        return groups
+
+    if not weights:
+        return []
+    low, high = max(weights), sum(weights)
+    while low < high:
+        middle = (low + high) // 2
+        if len(pack(middle)) <= parts:
+            high = middle
+        else:
+            low = middle + 1
+    return pack(low)
+
+LIBREOFFICE_FILTERS = {
+    "docx": "MS Word 2007 XML",
+    "xlsx": "Calc MS Excel 2007 XML",
+    "pptx": "Impress MS PowerPoint 2007 XML",
+}
+
 def convert_doc_to(
     input_file_path: Union[Path, str],
     output_format: str,
     output_dir: Optional[Union[Path, str]] = None,
+    profile_dir: Optional[Union[Path, str]] = None,
+    timeout: Optional[float] = None,
 ) -> Path:
+    """Сконвертировать файл одноразовым `soffice --convert-to`.
+
+    `profile_dir` — отдельный профиль пользователя LibreOffice: без него
+    параллельные запуски конкурируют за общий профиль. При превышении
+    `timeout` процесс убивается и выбрасывается `subprocess.TimeoutExpired`.
+    """
     input_path = Path(input_file_path).resolve()
 
     if not input_path.exists():
@@ -78,21 +249,19 @@ def convert_doc_to(
         outdir = Path(output_dir).resolve()
         outdir.mkdir(parents=True, exist_ok=True)
 
-    format_filters = {
-        "docx": "MS Word 2007 XML",
-        "xlsx": "Calc MS Excel 2007 XML",
-        "pptx": "Impress MS PowerPoint 2007 XML",
-    }
-
-    filter_name = format_filters.get(output_format.lower())
+    filter_name = LIBREOFFICE_FILTERS.get(output_format.lower())
     if not filter_name:
         raise ValueError(f"Unsupported output format: {output_format}")
 
     cmd = [
-        "soffice",
+        settings.LIBREOFFICE_BINARY,
         "--headless",
         "--nologo",
         "--nofirststartwizard",
+    ]
+    if profile_dir is not None:
+        cmd.append(f"-env:UserInstallation={Path(profile_dir).resolve().as_uri()}")
+    cmd += [
         "--convert-to",
         f"{output_format}:{filter_name}",
         "--outdir",
@@ -105,6 +274,7 @@ def convert_doc_to(
         capture_output=True,
         text=True,
         check=False,
+        timeout=timeout,
     )
 
     if result.returncode != 0:
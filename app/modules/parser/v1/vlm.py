@@ -0,0 +1,186 @@
+from functools import lru_cache
+from io import BytesIO
+from typing import Optional
+import asyncio
+import base64
+import os
+import re
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from loguru import logger
+from docling.backend.md_backend import MarkdownDocumentBackend
+from docling.datamodel.base_models import InputFormat
+from docling.datamodel.document import InputDocument
+from docling_core.types.doc import BoundingBox, DocItem, DoclingDocument, ProvenanceItem, Size
+
+from settings import settings
+from modules.parser.v1.exceptions import ServiceUnavailable, TimeoutError
+
+CODE_BLOCK_PATTERN = re.compile(r"^```(?:\w*\n)?(.*?)```(\n)*$", re.DOTALL)
+
+
+class VLMClient:
+    """Клиент OpenAI-совместимого `/v1/chat/completions` для OCR одного изображения.
+
+    Синхронные вызовы идут через `requests.Session` с пулом keep-alive
+    соединений (сессия создаётся заново после fork), асинхронные — через
+    `aiohttp.ClientSession`, привязанную к циклу событий. Ошибки соединения и
+    HTTP-ошибки превращаются в `ServiceUnavailable`, таймауты — в `TimeoutError`.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model_name: str,
+        api_key: Optional[str],
+        timeout: float = settings.VLM_TIMEOUT_SECS,
+        pool_size: int = max(4, settings.PICTURE_OCR_WORKER_CONCURRENCY),
+    ):
+        self.base_url = base_url
+        self.model_name = model_name
+        self.api_key = api_key
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.url = f"{base_url}/v1/chat/completions"
+        self._session: Optional[requests.Session] = None
+        self._session_pid: Optional[int] = None
+        self._async_session: Optional[aiohttp.ClientSession] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None or self._session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(self.headers)
+            self._session = session
+            self._session_pid = os.getpid()
+        return self._session
+
+    def _get_async_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._async_session is None or self._async_session.closed or self._async_loop is not loop:
+            self._async_session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._async_loop = loop
+        return self._async_session
+
+    def build_payload(
+        self,
+        image_bytes: bytes,
+        mime_type: str,
+        prompt: str,
+        max_tokens: int = settings.VLM_MAX_TOKENS,
+        temperature: float = 0.7,
+    ) -> dict:
+        image_base64 = base64.b64encode(image_bytes).decode("ascii")
+        return {
+            "model": self.model_name,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "skip_special_tokens": False,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{image_base64}"}},
+                        {"type": "text", "text": prompt},
+                    ],
+                }
+            ],
+        }
+
+    @staticmethod
+    def extract_text(response: dict) -> str:
+        try:
+            message = response["choices"][0]["message"]
+        except (KeyError, IndexError, TypeError):
+            logger.error(f"Unexpected VLM response: {str(response)[:500]}")
+            return ""
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        return content.strip()
+
+    def recognize(self, image_bytes: bytes, mime_type: str, prompt: str, **kwargs) -> str:
+        payload = self.build_payload(image_bytes, mime_type, prompt, **kwargs)
+        try:
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            return self.extract_text(response.json())
+        except requests.exceptions.Timeout as e:
+            logger.error(f"VLM request timed out: {e}")
+            raise TimeoutError()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"VLM is not available: {e}")
+            raise ServiceUnavailable("VLM", self.base_url)
+
+    async def arecognize(self, image_bytes: bytes, mime_type: str, prompt: str, **kwargs) -> str:
+        payload = self.build_payload(image_bytes, mime_type, prompt, **kwargs)
+        try:
+            async with self._get_async_session().post(self.url, json=payload) as response:
+                response.raise_for_status()
+                return self.extract_text(await response.json(content_type=None))
+        except asyncio.TimeoutError as e:
+            logger.error(f"VLM request timed out: {e}")
+            raise TimeoutError()
+        except (aiohttp.ClientError, ValueError) as e:
+            logger.error(f"VLM is not available: {e}")
+            raise ServiceUnavailable("VLM", self.base_url)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    async def aclose(self):
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+        self._async_session = None
+        self._async_loop = None
+
+
+@lru_cache(maxsize=8)
+def get_vlm_client(base_url: str, model_name: str, api_key: Optional[str]) -> VLMClient:
+    return VLMClient(base_url, model_name, api_key)
+
+
+def markdown_to_document(
+    markdown: str,
+    name: str,
+    page_no: int = 1,
+    page_size: Optional[tuple[int, int]] = None,
+) -> DoclingDocument:
+    """Собрать `DoclingDocument` из Markdown-ответа VLM так же, как `VlmPipeline`.
+
+    Обёртка ```` ``` ```` вокруг ответа снимается; все элементы получают
+    провенанс страницы `page_no` размером `page_size`.
+    """
+    match = CODE_BLOCK_PATTERN.search(markdown)
+    if match:
+        markdown = match.group(1)
+    stream = BytesIO(markdown.encode("utf-8"))
+    in_doc = InputDocument(
+        path_or_stream=stream,
+        filename=name,
+        format=InputFormat.MD,
+        backend=MarkdownDocumentBackend,
+    )
+    doc = MarkdownDocumentBackend(in_doc=in_doc, path_or_stream=stream).convert()
+    for item, _level in doc.iterate_items(with_groups=True, traverse_pictures=True):
+        if isinstance(item, DocItem):
+            item.prov = [ProvenanceItem(page_no=page_no, bbox=BoundingBox(t=0.0, b=0.0, l=0.0, r=0.0), charspan=[0, 0])]
+    width, height = page_size or (1, 1)
+    doc.add_page(page_no=page_no, size=Size(width=width, height=height))
+    return doc
@@ -0,0 +1,282 @@
+import os
+import tempfile
+import time
+from multiprocessing.sharedctypes import Synchronized
+from pathlib import Path
+from typing import Union
+
+from loguru import logger
+from docling_core.types.doc import DoclingDocument
+
+from modules.parser.v1.abc.abc import ParserABC
+from modules.parser.v1.abc.factory import ParserFactory
+from modules.parser.v1.cache import document_cache
+from modules.parser.v1.exporters import document_json
+from modules.parser.v1.file_parsers import PDFParser, PDFHybridParser, DocParser, PPTXParser, XLSXParser, HTMLParser
+from modules.parser.v1.file_parsers.html_stream import UnsupportedHTML
+from modules.parser.v1.handoff import DocumentHandoff, pack_result, strip_images
+from modules.parser.v1.schemas import ParserJob, ParserMods, ParserParams
+
+
+def _build_pdf(tmp_dir: Path) -> Path:
+    from PIL import Image, ImageDraw
+
+    path = tmp_dir / "warmup.pdf"
+    image = Image.new("RGB", (595, 842), "white")
+    draw = ImageDraw.Draw(image)
+    draw.text((72, 72), "Document parser warmup", fill="black")
+    draw.rectangle((72, 120, 523, 240), outline="black")
+    image.save(path, format="PDF")
+    return path
+
+
+def _build_docx(tmp_dir: Path) -> Path:
+    import docx
+
+    path = tmp_dir / "warmup.docx"
+    document = docx.Document()
+    document.add_heading("Document parser warmup", level=1)
+    document.add_paragraph("Warmup paragraph.")
+    table = document.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "key"
+    table.cell(0, 1).text = "value"
+    document.save(path)
+    return path
+
+
+def _build_pptx(tmp_dir: Path) -> Path:
+    import pptx
+
+    path = tmp_dir / "warmup.pptx"
+    presentation = pptx.Presentation()
+    slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+    slide.shapes.title.text = "Document parser warmup"
+    slide.placeholders[1].text = "Warmup slide."
+    presentation.save(path)
+    return path
+
+
+def _build_xlsx(tmp_dir: Path) -> Path:
+    import openpyxl
+
+    path = tmp_dir / "warmup.xlsx"
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["key", "value"])
+    sheet.append(["warmup", 1])
+    workbook.save(path)
+    return path
+
+
+def _build_html(tmp_dir: Path) -> Path:
+    path = tmp_dir / "warmup.html"
+    path.write_text(
+        "<html><body><h1>Document parser warmup</h1><p>Warmup paragraph.</p>"
+        "<table><tr><td>key</td><td>value</td></tr></table></body></html>",
+        encoding="utf-8",
+    )
+    return path
+
+
+def warmup_worker() -> list[str]:
+    """Прогреть воркер: прогнать синтетический документ каждого формата через его парсер.
+
+    Пайплайны и модели остаются в кэше конвертеров воркера, поэтому первый
+    настоящий запрос не платит за их загрузку. Возвращает форматы, прогрев
+    которых не удался.
+    """
+    warmup_documents = [
+        ("pdf", _build_pdf, PDFParser),
+        ("docx", _build_docx, DocParser),
+        ("pptx", _build_pptx, PPTXParser),
+        ("xlsx", _build_xlsx, XLSXParser),
+        ("html", _build_html, HTMLParser),
+    ]
+    started = time.perf_counter()
+    failed = []
+    with tempfile.TemporaryDirectory(prefix="warmup_") as tmp_dir:
+        for name, build, parser_cls in warmup_documents:
+            format_started = time.perf_counter()
+            try:
+                file_path = build(Path(tmp_dir))
+                parser_cls(ParserParams(file_path=file_path)).parse(ParserMods.TO_TEXT)
+                logger.debug(f"Worker {os.getpid()}: {name} pipeline warmed in {time.perf_counter() - format_started:.2f}s")
+            except Exception as e:
+                logger.error(f"Worker {os.getpid()}: {name} warmup failed: {e}")
+                failed.append(name)
+    if failed:
+        logger.error(f"Worker {os.getpid()} warmup failed for {', '.join(failed)}")
+    else:
+        logger.success(f"Worker {os.getpid()} warmed up in {time.perf_counter() - started:.2f}s")
+    return failed
+
+
+def init_worker(warm_workers: Synchronized, failed_workers: Synchronized, warmup: bool):
+    """Инициализатор процесса `ProcessPoolExecutor`.
+
+    После (опционального) прогрева увеличивает общий счётчик `warm_workers`,
+    по которому `/ready` определяет готовность сервиса, а если прогрев хотя
+    бы одного формата не удался — `failed_workers`.
+    """
+    counter = warm_workers
+    if warmup and warmup_worker():
+        counter = failed_workers
+    with counter.get_lock():
+        counter.value += 1
+
+
+def ping() -> int:
+    return os.getpid()
+
+
+def store_document(cache_key: str, doc: DoclingDocument):
+    try:
+        document_cache.put(cache_key, doc)
+        logger.debug(f"Worker {os.getpid()}: document stored in cache ({cache_key[:12]})")
+    except Exception as e:
+        logger.warning(f"Worker {os.getpid()}: failed to store document in cache: {e}")
+
+
+# Режимы, которые выгружаются из готового документа с параметрами `ParserJob`.
+DOCUMENT_EXPORT_MODES = (ParserMods.TO_BUNDLE, ParserMods.TO_JSON)
+
+
+def export_result(parser: ParserABC, doc: DoclingDocument, job: ParserJob):
+    """Выгрузить документ в режиме `job.mode`; для `TO_BUNDLE` — во все `job.outputs`.
+
+    Для `TO_DOCLING` из документа убираются изображения, которые не попадут в
+    выдачу (см. `ParserJob.keep_picture_images`).
+    """
+    match job.mode:
+        case ParserMods.TO_BUNDLE:
+            return parser.exporter.export_bundle(doc, job.outputs)
+        case ParserMods.TO_JSON:
+            return parser.exporter.save_json(doc, job.json_options)
+        case ParserMods.TO_DOCLING:
+            keep_pictures = job.keep_picture_images
+            if keep_pictures is None:
+                keep_pictures = bool(job.parser_params.include_image_in_output)
+            return strip_images(doc, keep_pictures)
+        case _:
+            return parser.export(doc, job.mode)
+
+
+def parse_job(job: ParserJob):
+    """Точка входа воркера: создать парсер по `ParserJob` и выполнить разбор.
+
+    Если у задачи есть `cache_key`, готовый `DoclingDocument` сохраняется в
+    `DocumentCache` до выгрузки в режиме `job.mode`. Документ режима
+    `TO_DOCLING` возвращается как `DocumentHandoff`.
+    """
+    parser = ParserFactory(job.parser_params).get_parser()
+    if job.mode not in (*DOCUMENT_EXPORT_MODES, ParserMods.TO_DOCLING):
+        if parser.streams(job.mode):
+            try:
+                return parser.stream(job.mode)
+            except UnsupportedHTML as e:
+                # Документ всё равно строит Docling — ниже, чтобы его можно было кэшировать.
+                logger.debug(f"{Path(job.parser_params.file_path).name}: streaming is not possible ({e}), using Docling")
+        elif not (job.cache_key and parser.cacheable):
+            return parser.parse(job.mode)
+    doc = parser.parse(ParserMods.TO_DOCLING)
+    if not isinstance(doc, DoclingDocument):
+        if job.mode not in DOCUMENT_EXPORT_MODES:
+            return doc
+        # Парсер вернул пустой результат вместо документа (см. `ImageParser.parse`).
+        doc = DoclingDocument(name=Path(job.parser_params.file_path).stem)
+    # Парсер может отказаться от кэширования уже после разбора (частичный результат).
+    if job.cache_key and parser.cacheable:
+        store_document(job.cache_key, doc)
+    return pack_result(export_result(parser, doc, job))
+
+
+def export_document(doc: DoclingDocument, job: ParserJob):
+    """Выгрузить готовый (например, взятый из кэша) документ в режиме `job.mode`."""
+    parser = ParserFactory(job.parser_params).get_parser()
+    return export_result(parser, doc, job)
+
+
+def pdf_parser_cls(parser_params: ParserParams) -> type[PDFParser]:
+    return PDFHybridParser if parser_params.hybrid_pdf_parse else PDFParser
+
+
+def parse_pdf_shard(job: ParserJob, page_range: tuple[int, int]) -> tuple[DocumentHandoff, bool]:
+    """Разобрать диапазон страниц PDF; вернуть документ и признак, можно ли его кэшировать."""
+    parser = pdf_parser_cls(job.parser_params)(job.parser_params, page_range=page_range)
+    return DocumentHandoff.pack(parser.parse(ParserMods.TO_DOCLING)), parser.cacheable
+
+
+def parse_pdf_pages(job: ParserJob, page_range: tuple[int, int]) -> str:
+    """Разобрать диапазон страниц PDF в Markdown для потоковой выдачи.
+
+    Фрагменты после первого начинаются с `page_break_placeholder`, поэтому
+    их конкатенация совпадает с Markdown всего документа.
+    """
+    parser = pdf_parser_cls(job.parser_params)(job.parser_params, page_range=page_range)
+    markdown = parser.parse(ParserMods.TO_TEXT)
+    if page_range[0] > 1:
+        markdown = parser.page_break_placeholder + markdown
+    return markdown
+
+
+def parse_pdf_pages_json(job: ParserJob, page_range: tuple[int, int]) -> bytes:
+    """Разобрать диапазон страниц PDF в JSON `DoclingDocument` для потоковой выдачи.
+
+    Между процессами передаются готовые байты JSON, а не сам документ.
+    """
+    parser = pdf_parser_cls(job.parser_params)(job.parser_params, page_range=page_range)
+    return document_json(parser.parse(ParserMods.TO_DOCLING), job.json_options.exclude)
+
+
+def load_shards(shards: list[tuple[Union[DocumentHandoff, str], bool]]) -> list[Union[DoclingDocument, str]]:
+    """Распаковать результаты шардов; временные файлы удаляются и при ошибке."""
+    try:
+        return [result.load() if isinstance(result, DocumentHandoff) else result for result, _ in shards]
+    finally:
+        for result, _ in shards:
+            if isinstance(result, DocumentHandoff):
+                result.discard()
+
+
+def merge_pdf_shards(shards: list[tuple[DocumentHandoff, bool]], job: ParserJob):
+    """Склеить шарды PDF в порядке страниц и выгрузить результат в режиме `job.mode`.
+
+    Документ кэшируется, только если кэшировать можно каждый шард.
+    """
+    docs = load_shards(shards)
+    doc = DoclingDocument.concatenate(docs)
+    doc.name = docs[0].name
+    if job.cache_key and all(cacheable for _, cacheable in shards):
+        store_document(job.cache_key, doc)
+    return pack_result(export_result(PDFParser(job.parser_params), doc, job))
+
+
+def parse_xlsx_shard(job: ParserJob, sheet_names: list[str]) -> tuple[Union[DocumentHandoff, str], bool]:
+    """Разобрать группу листов XLSX.
+
+    Для текста и Markdown книга, подходящая для потоковой выгрузки, сразу
+    возвращает Markdown своих листов, иначе — `DocumentHandoff` с
+    `DoclingDocument`. Второй элемент — можно ли результат кэшировать.
+    """
+    parser = XLSXParser(job.parser_params, sheet_names=sheet_names)
+    if parser.streams(job.mode):
+        return parser.parse(ParserMods.TO_TEXT), parser.cacheable
+    return DocumentHandoff.pack(parser.parse(ParserMods.TO_DOCLING)), parser.cacheable
+
+
+def merge_xlsx_shards(shards: list[tuple[Union[DocumentHandoff, str], bool]], job: ParserJob):
+    """Склеить группы листов в порядке книги и выгрузить результат в режиме `job.mode`."""
+    parser = XLSXParser(job.parser_params)
+    results = load_shards(shards)
+    if all(isinstance(result, str) for result in results):
+        markdown = parser.page_break_placeholder.join(result for result in results if result)
+        if job.mode == ParserMods.TO_TEXT:
+            return markdown
+        with tempfile.NamedTemporaryFile(suffix=".md", delete=False, mode="w", encoding="utf-8") as tmp_file:
+            tmp_file.write(markdown)
+            return tmp_file.name
+    doc = DoclingDocument.concatenate(results)
+    doc.name = results[0].name
+    if job.cache_key and all(cacheable for _, cacheable in shards):
+        store_document(job.cache_key, doc)
+    return pack_result(export_result(parser, doc, job))
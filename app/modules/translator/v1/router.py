@@ -4,9 +4,9 @@ from fastapi import APIRouter, Depends, Request
 from fastapi.responses import FileResponse
 from loguru import logger
 
-from modules.parser.v1.abc.factory import ParserFactory
-from modules.parser.v1.schemas import FileFormats, ParserMods, ParserParams
-from modules.parser.v1.utils import delete_file, run_in_process, save_file
+from modules.parser.v1.schemas import FileFormats, ParserJob, ParserMods, ParserParams
+from modules.parser.v1.service import run_parser_job
+from modules.parser.v1.utils import delete_file, save_file
 from modules.translator.v1.schemas import TranslatorRequest, TranslatorTextResponse
 from modules.translator.v1.service import CustomModelTranslator
 from settings import settings
@@ -39,7 +39,7 @@ router = APIRouter(prefix="/api/v1/parser")
 ### Важные параметры
 1. `source_language` — исходный язык документа или `auto`.
 2. `target_language` — целевой язык в формате `iso639-1`.
-3. `parse_images`, `include_image_in_output`, `full_vlm_pdf_parse` — параметры парсинга перед переводом.
+3. `parse_images`, `include_image_in_output`, `full_vlm_pdf_parse`, `hybrid_pdf_parse`, `profile` — параметры парсинга перед переводом.
 
 ### Возвращаемый объект
 ```python
@@ -52,6 +52,7 @@ async def translate_file_to_text(
     request_fastapi: Request,
     translator_data: TranslatorRequest = Depends(),
 ) -> TranslatorTextResponse:
+    file_path = None
     try:
         source_language = translator_data.source_language
         target_language = translator_data.target_language
@@ -61,19 +62,20 @@ async def translate_file_to_text(
             target_language,
         )
         file = translator_data.file
-        file_path = await save_file(file)
+        file_path, content_hash = await save_file(file)
         parser_params = ParserParams(
             file_path=file_path,
+            content_hash=content_hash,
             parse_images=translator_data.parse_images,
             include_image_in_output=translator_data.include_image_in_output,
             full_vlm_pdf_parse=translator_data.full_vlm_pdf_parse,
+            hybrid_pdf_parse=translator_data.hybrid_pdf_parse,
+            profile=translator_data.profile,
         )
 
-        parser = ParserFactory(parser_params).get_parser()
-        parsed = await run_in_process(
-            parser.parse,
+        parsed = await run_parser_job(
             request_fastapi.app.state.executor,
-            ParserMods.TO_DOCLING,
+            ParserJob(parser_params=parser_params, mode=ParserMods.TO_DOCLING),
         )
         translator = CustomModelTranslator(
             parsed,
@@ -115,7 +117,7 @@ async def translate_file_to_text(
 ### Важные параметры
 1. `source_language` — исходный язык документа или `auto`.
 2. `target_language` — целевой язык в формате `iso639-1`.
-3. `parse_images`, `include_image_in_output`, `full_vlm_pdf_parse` — параметры парсинга перед переводом.
+3. `parse_images`, `include_image_in_output`, `full_vlm_pdf_parse`, `hybrid_pdf_parse`, `profile` — параметры парсинга перед переводом.
 
 ### Возвращаемый объект
 ```python
@@ -128,6 +130,7 @@ async def translate_file_to_file(
     request_fastapi: Request,
     translator_data: TranslatorRequest = Depends(),
 ):
+    file_path = None
     try:
         source_language = translator_data.source_language
         target_language = translator_data.target_language
@@ -137,19 +140,20 @@ async def translate_file_to_file(
             target_language,
         )
         file = translator_data.file
-        file_path = await save_file(file)
+        file_path, content_hash = await save_file(file)
         parser_params = ParserParams(
             file_path=file_path,
+            content_hash=content_hash,
             parse_images=translator_data.parse_images,
             include_image_in_output=translator_data.include_image_in_output,
             full_vlm_pdf_parse=translator_data.full_vlm_pdf_parse,
+            hybrid_pdf_parse=translator_data.hybrid_pdf_parse,
+            profile=translator_data.profile,
         )
 
-        parser = ParserFactory(parser_params).get_parser()
-        parsed = await run_in_process(
-            parser.parse,
+        parsed = await run_parser_job(
             request_fastapi.app.state.executor,
-            ParserMods.TO_DOCLING,
+            ParserJob(parser_params=parser_params, mode=ParserMods.TO_DOCLING),
         )
         translator = CustomModelTranslator(
             parsed,
@@ -194,7 +198,7 @@ async def translate_file_to_file(
 ### Важные параметры
 1. `source_language` — исходный язык документа или `auto`.
 2. `target_language` — целевой язык в формате `iso639-1`.
-3. `parse_images`, `include_image_in_output`, `full_vlm_pdf_parse` — параметры парсинга перед переводом.
+3. `parse_images`, `include_image_in_output`, `full_vlm_pdf_parse`, `hybrid_pdf_parse`, `profile` — параметры парсинга перед переводом.
 
 ### Возвращаемый объект
 ```python
@@ -207,6 +211,7 @@ async def translate_file_to_word(
     request_fastapi: Request,
     translator_data: TranslatorRequest = Depends(),
 ):
+    file_path = None
     try:
         source_language = translator_data.source_language
         target_language = translator_data.target_language
@@ -216,19 +221,20 @@ async def translate_file_to_word(
             target_language,
         )
         file = translator_data.file
-        file_path = await save_file(file)
+        file_path, content_hash = await save_file(file)
         parser_params = ParserParams(
             file_path=file_path,
+            content_hash=content_hash,
             parse_images=translator_data.parse_images,
             include_image_in_output=translator_data.include_image_in_output,
             full_vlm_pdf_parse=translator_data.full_vlm_pdf_parse,
+            hybrid_pdf_parse=translator_data.hybrid_pdf_parse,
+            profile=translator_data.profile,
         )
 
-        parser = ParserFactory(parser_params).get_parser()
-        parsed = await run_in_process(
-            parser.parse,
+        parsed = await run_parser_job(
             request_fastapi.app.state.executor,
-            ParserMods.TO_DOCLING,
+            ParserJob(parser_params=parser_params, mode=ParserMods.TO_DOCLING),
         )
         translator = CustomModelTranslator(
             parsed,
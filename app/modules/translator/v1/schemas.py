@@ -9,6 +9,7 @@ from loguru import logger
 
 from settings import settings
 from modules.parser.v1.exceptions import ContentNotSupportedError
+from modules.parser.v1.schemas import ParseProfile
 from modules.translator.v1.exceptions import InvalidLanguageCode
 
 
@@ -26,6 +27,14 @@ class TranslatorRequest(BaseModel):
         description="Обрабатывать PDF целиком через VLM. Полезно для сложных PDF.",
         default=False,
     )
+    hybrid_pdf_parse: Optional[bool] = Field(
+        description="Разбирать через VLM только страницы PDF без текстового слоя.",
+        default=False,
+    )
+    profile: Optional[ParseProfile] = Field(
+        description="Профиль разбора: `fast`, `balanced` или `accurate`. По умолчанию — `PARSE_PROFILE`.",
+        default=None,
+    )
     source_language: Optional[str] = Field(
         description=(
             "Исходный язык документа в формате ISO 639-1. Можно передать `auto`, "
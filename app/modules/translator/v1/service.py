@@ -1,9 +1,6 @@
 import asyncio
 from pathlib import Path
-import shutil
-import tempfile
 
-import pypandoc
 from tqdm.asyncio import tqdm
 from loguru import logger
 
@@ -18,6 +15,7 @@ from modules.translator.v1.utils import retry
 
 from settings import settings
 from modules.translator.v1.exceptions import LanguageNotSupported
+from modules.parser.v1.docx_writer import export_to_word
 
 
 class CustomModelTranslator(AbstractTranslator):
@@ -125,29 +123,7 @@ class CustomModelTranslator(AbstractTranslator):
                 return markdown
             
             case ParserMods.TO_WORD:
-                logger.debug("Saving to Word")
-                artifacts_dir = Path(tempfile.mkdtemp(prefix="artifacts_"))
-                doc_with_refs = docling_data._make_copy_with_refmode(
-                                        reference_path=artifacts_dir,
-                                        artifacts_dir=artifacts_dir,
-                                        image_mode=self.image_mode,
-                                        page_no=None
-                                    )
-                markdown = doc_with_refs.export_to_markdown(image_mode=self.image_mode, 
-                                                  page_break_placeholder=self.page_break_placeholder)
-                with NamedTemporaryFile(suffix=".docx", delete=False) as tmp_file:
-                    pypandoc.convert_text(markdown, 
-                            "docx", 
-                            format="md", 
-                            outputfile=tmp_file.name,
-                            extra_args=[
-                                '--standalone',
-                                f'--resource-path={artifacts_dir}',
-                                '--wrap=none'    
-                            ])
-                    shutil.rmtree(artifacts_dir, ignore_errors=True)
-                    return tmp_file.name
-
+                return export_to_word(docling_data, self.image_mode, self.page_break_placeholder)
             case _:
                 logger.error("Unknown parse mode!")
                 raise ValueError
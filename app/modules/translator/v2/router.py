@@ -99,14 +99,17 @@ async def translate_file_to_word_v2(
             detail="Сервис менеджера задач недоступен. Попробуйте позже.",
         )
 
-    file_path = await save_file(translator_data.file)
+    file_path, content_hash = await save_file(translator_data.file)
     original_filename = translator_data.file.filename
 
     parser_params = ParserParams(
         file_path=file_path,
+        content_hash=content_hash,
         parse_images=translator_data.parse_images,
         include_image_in_output=translator_data.include_image_in_output,
         full_vlm_pdf_parse=translator_data.full_vlm_pdf_parse,
+        hybrid_pdf_parse=translator_data.hybrid_pdf_parse,
+        profile=translator_data.profile,
     )
 
     service = TranslatorV2Service(
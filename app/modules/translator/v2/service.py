@@ -1,16 +1,13 @@
 import asyncio
-import shutil
-import tempfile
 from pathlib import Path
-from tempfile import NamedTemporaryFile
 
-import pypandoc
 from docling_core.types.doc import DoclingDocument, TableItem, TextItem
 from loguru import logger
 
-from modules.parser.v1.abc.factory import ParserFactory
-from modules.parser.v1.schemas import ParserMods, ParserParams
-from modules.parser.v1.utils import delete_file, run_in_process
+from modules.parser.v1.docx_writer import export_to_word
+from modules.parser.v1.schemas import ParserJob, ParserMods, ParserParams
+from modules.parser.v1.service import run_parser_job
+from modules.parser.v1.utils import delete_file
 from modules.resource_manager.service import ResourceManagerService
 from modules.translator.v1.exceptions import LanguageNotSupported
 from modules.translator.v1.service import CustomModelTranslator
@@ -106,9 +103,9 @@ class TranslatorV2Service:
                 task_id,
                 original_filename,
             )
-            parser = ParserFactory(parser_params).get_parser()
-            docling_doc: DoclingDocument = await run_in_process(
-                parser.parse, executor, ParserMods.TO_DOCLING
+            docling_doc: DoclingDocument = await run_parser_job(
+                executor,
+                ParserJob(parser_params=parser_params, mode=ParserMods.TO_DOCLING, keep_picture_images=False),
             )
             await self._update(
                 task_key, response_data, 15, TaskStatus.PROCESSING,
@@ -289,30 +286,9 @@ class TranslatorV2Service:
         docling_doc: DoclingDocument,
     ) -> str:
         """Экспортировать переведённый `DoclingDocument` во временный `.docx`."""
-        artifacts_dir = Path(tempfile.mkdtemp(prefix="artifacts_"))
-        try:
-            doc_with_refs = docling_doc._make_copy_with_refmode(
-                reference_path=artifacts_dir,
-                artifacts_dir=artifacts_dir,
-                image_mode=translator.image_mode,
-                page_no=None,
-            )
-            markdown = doc_with_refs.export_to_markdown(
-                image_mode=translator.image_mode,
-                page_break_placeholder=translator.page_break_placeholder,
-            )
-            with NamedTemporaryFile(suffix=".docx", delete=False) as tmp:
-                pypandoc.convert_text(
-                    markdown,
-                    "docx",
-                    format="md",
-                    outputfile=tmp.name,
-                    extra_args=[
-                        "--standalone",
-                        f"--resource-path={artifacts_dir}",
-                        "--wrap=none",
-                    ],
-                )
-                return tmp.name
-        finally:
-            shutil.rmtree(artifacts_dir, ignore_errors=True)
+        return await asyncio.to_thread(
+            export_to_word,
+            docling_doc,
+            translator.image_mode,
+            translator.page_break_placeholder,
+        )
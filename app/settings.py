@@ -2,6 +2,7 @@ from typing import List
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+import tempfile
 import multiprocessing
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -17,12 +18,62 @@ class Settings(BaseSettings):
     PORT: int
     ML_DIR: str = str(Path(__file__).parent.parent / "ml")
     PARSER_WORKERS: int = multiprocessing.cpu_count()
+    PARSER_WARMUP: bool = False
+    CONVERTER_CACHE_SIZE: int = 8
+    PARSE_PROFILE: str = "balanced"
+    PDF_SHARD_THRESHOLD_PAGES: int = 100
+    PDF_SHARD_MIN_PAGES: int = 20
+    XLSX_SHARD_MIN_SHEETS: int = 4
+    XLSX_SHARD_MIN_BYTES: int = 4 * 1024 ** 2
+    PARSER_STREAM_CHUNK_PAGES: int = 1
+    PARSER_STREAM_WINDOW: int = 2
+    DOCUMENT_HANDOFF_FILE_MIN_BYTES: int = 4 * 1024 ** 2
+    TXT_ENCODING_SAMPLE_BYTES: int = 64 * 1024
+    TXT_CHUNK_BYTES: int = 1024 ** 2
+    TXT_MMAP_MIN_BYTES: int = 64 * 1024 ** 2
+    XLSX_STREAM_ENABLED: bool = True
+    XLSX_STREAM_MIN_BYTES: int = 1024 ** 2
+    HTML_STREAM_ENABLED: bool = True
+    WORD_EXPORT_ENGINE: str = "native"
+    UPLOAD_SPOOL_DIR: str = tempfile.gettempdir()
+    UPLOAD_MAX_BYTES: int = 512 * 1024 ** 2
+    UPLOAD_CHUNK_BYTES: int = 1024 ** 2
+    DOCUMENT_CACHE_ENABLED: bool = True
+    DOCUMENT_CACHE_DIR: str = str(Path(tempfile.gettempdir()) / "document-parser" / "documents")
+    DOCUMENT_CACHE_MAX_BYTES: int = 2 * 1024 ** 3
+    DOCUMENT_CACHE_TTL_SECS: int = 7 * 24 * 60 * 60
+    OCR_CACHE_ENABLED: bool = True
+    OCR_CACHE_DIR: str = str(Path(tempfile.gettempdir()) / "document-parser" / "ocr")
+    OCR_CACHE_MAX_BYTES: int = 256 * 1024 ** 2
+    OCR_CACHE_TTL_SECS: int = 30 * 24 * 60 * 60
+    OCR_CACHE_PERCEPTUAL: bool = False
+    LIBREOFFICE_BINARY: str = "soffice"
+    LIBREOFFICE_POOL_SIZE: int = 2
+    LIBREOFFICE_UNO_PATH: str = "/usr/lib/python3/dist-packages"
+    LIBREOFFICE_STARTUP_TIMEOUT_SECS: int = 60
+    LIBREOFFICE_CONVERT_TIMEOUT_SECS: int = 180
+    LIBREOFFICE_HEALTHCHECK_SECS: int = 30
 
     VLM_BASE_URL: str = "localhost:8097"
     VLM_MODEL_NAME: str = "Qwen2.5-VL-7B-Instruct-Q6_K"
     VLM_API_KEY: str = "no-key-required"
     VLM_MAX_TOKENS: int = 16000
     VLM_TIMEOUT_SECS: int = 50
+    VLM_DIRECT_CLIENT: bool = True
+    VLM_IMAGE_PREPROCESS: bool = True
+    VLM_IMAGE_MAX_PIXELS: int = 2_500_000
+    VLM_IMAGE_FORMAT: str = "jpeg"
+    VLM_IMAGE_QUALITY: int = 85
+    VLM_IMAGE_GRAYSCALE: bool = True
+    VLM_IMAGE_TRIM: bool = True
+    VLM_IMAGE_PATCH_SIZE: int = 28
+    PDF_VLM_PAGE_CONCURRENCY: int = 4
+    PDF_VLM_RENDER_SCALE: float = 2.0
+    PDF_HYBRID_MIN_CHARS: int = 32
+    PDF_HYBRID_MIN_TEXT_COVERAGE: float = 0.01
+    PDF_HYBRID_MAX_GARBLED_RATIO: float = 0.1
+    PICTURE_OCR_CONCURRENCY: int = 4
+    PICTURE_OCR_WORKER_CONCURRENCY: int = 4
     
     TRANSLATOR_ADDRESS: str = "http://localhost:8000"
     TRANSLATE_URI: str = "/translate/text"
@@ -49,6 +100,8 @@ class Settings(BaseSettings):
         "text/html",
         "image/tiff",
         "application/msword",
+        "application/vnd.ms-excel",
+        "application/vnd.ms-powerpoint",
         "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
         "application/vnd.openxmlformats-officedocument.presentationml.presentation",
         "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
@@ -66,6 +119,6 @@ class Settings(BaseSettings):
     
     @property
     def ARTIFACTS_PATH(cls):
-        return Path(__file__).parent.parent.joinpath("ml")
+        return Path(cls.ML_DIR)
     
 settings = Settings()
@@ -0,0 +1,137 @@
+"""Передача `DoclingDocument` из воркера: `pickle` целиком против `DocumentHandoff`.
+
+Корпус — синтетическая презентация со слайдами-картинками и книга XLSX на
+200 тыс. ячеек (см. `bench_xlsx_stream.py`), либо переданные файлы. Для
+каждого документа задача `TO_DOCLING` выполняется в `ProcessPoolExecutor`
+двумя способами: прежним (воркер возвращает документ с картинками, пул
+распаковывает его в своём потоке) и через `parse_job` с
+`keep_picture_images=False`, как у переводчика v2. Печатаются размер
+сериализованного документа, сколько байт прошло через канал пула, время
+распаковки в основном процессе и наибольшая задержка тика event loop
+(10 мс) за время ожидания результата и его распаковки.
+
+    python benchmarks/bench_docling_handoff.py [file ...]
+"""
+import asyncio
+import io
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+os.environ.setdefault("ENV_FILE", str(ROOT / ".env.production"))
+
+from bench_xlsx_stream import build_workbook  # noqa: E402
+
+SLIDES = 120
+WORKBOOK_CELLS = 200_000
+TICK_SECS = 0.01
+
+
+def build_deck(path: Path):
+    from PIL import Image
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    presentation = Presentation()
+    generator = random.Random(0)
+    for index in range(SLIDES):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[5])
+        slide.shapes.title.text = f"Слайд {index}: итоги квартала"
+        image = Image.frombytes("RGB", (480, 360), generator.randbytes(480 * 360 * 3))
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        buffer.seek(0)
+        slide.shapes.add_picture(buffer, Inches(1), Inches(2), width=Inches(6))
+    presentation.save(path)
+
+
+def build_corpus(tmp_dir: Path) -> list[Path]:
+    deck_path = tmp_dir / "deck.pptx"
+    build_deck(deck_path)
+    workbook_path = tmp_dir / "workbook.xlsx"
+    build_workbook(workbook_path, WORKBOOK_CELLS)
+    return [deck_path, workbook_path]
+
+
+def parse_document(job):
+    """Прежний результат воркера: документ `parser.parse(TO_DOCLING)` как есть."""
+    from modules.parser.v1.abc.factory import ParserFactory
+    from modules.parser.v1.schemas import ParserMods
+
+    return ParserFactory(job.parser_params).get_parser().parse(ParserMods.TO_DOCLING)
+
+
+async def measure(executor, function, job):
+    from modules.parser.v1.handoff import DocumentHandoff
+
+    max_lag = 0.0
+
+    async def ticker():
+        nonlocal max_lag
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(TICK_SECS)
+            max_lag = max(max_lag, time.perf_counter() - started - TICK_SECS)
+
+    task = asyncio.ensure_future(ticker())
+    await asyncio.sleep(TICK_SECS)
+    result = await asyncio.get_running_loop().run_in_executor(executor, function, job)
+    if isinstance(result, DocumentHandoff):
+        transferred = len(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        size = result.size
+        started = time.perf_counter()
+        await asyncio.to_thread(result.load)
+        load_time = time.perf_counter() - started
+    else:
+        # Пул уже распаковал документ в своём потоке; замеряем распаковку повторно.
+        data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        transferred = size = len(data)
+        started = time.perf_counter()
+        pickle.loads(data)
+        load_time = time.perf_counter() - started
+    await asyncio.sleep(TICK_SECS)
+    task.cancel()
+    return size, transferred, load_time, max_lag
+
+
+async def run(paths: list[Path]):
+    from modules.parser.v1.schemas import ParserJob, ParserMods, ParserParams
+    from modules.parser.v1.worker import parse_job
+
+    print(
+        f"{'file':<16} {'':>4} {'document':>9} {'pipe':>9} {'unpickle':>9} {'max lag':>8}"
+    )
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        for path in paths:
+            job = ParserJob(
+                parser_params=ParserParams(file_path=str(path)),
+                mode=ParserMods.TO_DOCLING,
+                keep_picture_images=False,
+            )
+            for name, function in (("old", parse_document), ("new", parse_job)):
+                size, transferred, load_time, max_lag = await measure(executor, function, job)
+                print(
+                    f"{path.name[:16]:<16} {name:>4} {size / 1024 ** 2:>7.1f}MB {transferred / 1024 ** 2:>7.2f}MB "
+                    f"{load_time:>8.2f}s {max_lag:>7.2f}s"
+                )
+
+
+def main():
+    from settings import settings
+
+    settings.DOCUMENT_CACHE_ENABLED = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = [Path(arg) for arg in sys.argv[1:]] or build_corpus(Path(tmp_dir))
+        asyncio.run(run(paths))
+
+
+if __name__ == "__main__":
+    main()
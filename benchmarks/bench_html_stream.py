@@ -0,0 +1,118 @@
+"""HTML в Markdown: Docling против потокового пути `html_stream`.
+
+По умолчанию корпус — синтетические выгрузки почты (письма с абзацами,
+ссылками, `<br>` и таблицами реквизитов) и вики-страницы (заголовки, вложенные
+списки, таблицы) размером около 1, 5 и 20 МБ; вместо них можно передать свои
+HTML-файлы. Каждый путь запускается в отдельном процессе; печатаются время,
+пиковый RSS и доля слов выгрузки Docling, найденных в потоковой выгрузке
+(сравниваются мультимножества слов без разметки Markdown).
+
+    python benchmarks/bench_html_stream.py [file.html ...]
+"""
+from collections import Counter
+import multiprocessing
+import os
+import re
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+os.environ.setdefault("ENV_FILE", str(ROOT / ".env.production"))
+
+SIZES_MB = (1, 5, 20)
+WORD_RE = re.compile(r"\w+")
+
+
+def email_message(index: int) -> str:
+    return (
+        f"<div class=\"message\"><h2>Re: Счёт № {index} от контрагента ООО «Ромашка-{index % 97}»</h2>"
+        f"<p><b>От:</b> manager_{index % 13}@example.com<br><b>Кому:</b> buh@example.com<br>"
+        f"<b>Дата:</b> 2024-0{index % 9 + 1}-1{index % 9}</p>"
+        f"<p>Добрый день! Направляем счёт на оплату по договору № {index}/24. "
+        f"Подробности в <a href=\"https://crm.example.com/deals/{index}\">карточке сделки</a>.</p>"
+        "<table><tr><th>Позиция</th><th>Кол-во</th><th>Сумма</th></tr>"
+        f"<tr><td>Услуги за {index % 12 + 1} месяц</td><td>{index % 5 + 1}</td><td>{index * 17 % 100000}</td></tr>"
+        f"<tr><td colspan=\"2\">Итого</td><td>{index * 17 % 100000}</td></tr></table>"
+        "<p>С уважением,<br>отдел продаж</p></div>\n"
+    )
+
+
+def wiki_section(index: int) -> str:
+    return (
+        f"<h2>Раздел {index}</h2><p>Описание процесса <i>согласования</i> версии {index}: "
+        f"см. <a href=\"/wiki/page_{index}\">страницу регламента</a> и <code>config_{index}.yaml</code>.</p>"
+        f"<h3>Шаги</h3><ol><li>Подготовить заявку</li><li>Согласовать с руководителем"
+        f"<ul><li>по почте</li><li>в системе документооборота</li></ul></li><li>Передать в архив</li></ol>"
+        "<table><thead><tr><th>Роль</th><th>Ответственный</th><th>Срок, дней</th></tr></thead><tbody>"
+        f"<tr><td rowspan=\"2\">Исполнитель</td><td>Иванов И. И.</td><td>{index % 10 + 1}</td></tr>"
+        f"<tr><td>Петров П. П.</td><td>{index % 7 + 2}</td></tr></tbody></table>\n"
+    )
+
+
+def build_corpus(tmp_dir: Path) -> list[Path]:
+    paths = []
+    for name, block in (("email", email_message), ("wiki", wiki_section)):
+        for size_mb in SIZES_MB:
+            path = tmp_dir / f"{name}_{size_mb}mb.html"
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{name}</title>"
+                           "<style>td{padding:2px}</style></head><body>\n")
+                index = 0
+                while file.tell() < size_mb * 1024 ** 2:
+                    file.write(block(index))
+                    index += 1
+                file.write("</body></html>\n")
+            paths.append(path)
+    return paths
+
+
+def run_path(file_path: str, streaming: bool, results):
+    from settings import settings
+    from modules.parser.v1.file_parsers import HTMLParser
+    from modules.parser.v1.schemas import ParserMods, ParserParams
+
+    settings.HTML_STREAM_ENABLED = streaming
+    started = time.perf_counter()
+    markdown = HTMLParser(ParserParams(file_path=file_path)).parse(ParserMods.TO_TEXT)
+    elapsed = time.perf_counter() - started
+    results.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, markdown))
+
+
+def measure(context, file_path: str, streaming: bool):
+    results = context.Queue()
+    process = context.Process(target=run_path, args=(file_path, streaming, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def word_recall(reference: str, candidate: str) -> float:
+    """Доля слов `reference` (с кратностью), которые есть в `candidate`."""
+    expected = Counter(WORD_RE.findall(reference.replace("\\_", "_")))
+    found = Counter(WORD_RE.findall(candidate.replace("\\_", "_")))
+    total = sum(expected.values())
+    return sum((expected & found).values()) / total if total else 1.0
+
+
+def main():
+    context = multiprocessing.get_context("spawn")
+    print(f"{'file':<20} {'size':>8} {'docling':>10} {'RSS':>8} {'stream':>10} {'RSS':>8} {'speedup':>8} {'recall':>7}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = [Path(arg) for arg in sys.argv[1:]] or build_corpus(Path(tmp_dir))
+        for path in paths:
+            docling_time, docling_rss, docling_markdown = measure(context, str(path), streaming=False)
+            stream_time, stream_rss, stream_markdown = measure(context, str(path), streaming=True)
+            print(
+                f"{path.name[:20]:<20} {path.stat().st_size / 1024 ** 2:>6.1f}MB "
+                f"{docling_time:>9.2f}s {docling_rss:>6.0f}MB {stream_time:>9.2f}s {stream_rss:>6.0f}MB "
+                f"{docling_time / stream_time:>7.1f}x {word_recall(docling_markdown, stream_markdown):>6.1%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
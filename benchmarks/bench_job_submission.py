@@ -0,0 +1,56 @@
+"""Накладные расходы на отправку задачи парсинга в ProcessPoolExecutor.
+
+Сравнивает старую схему (в воркер уходит bound-метод `parser.parse`, то есть
+весь экземпляр парсера) с новой (`parse_job` + `ParserJob`).
+
+    python benchmarks/bench_job_submission.py [path/to/file.pdf]
+"""
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+os.environ.setdefault("ENV_FILE", str(ROOT / ".env.production"))
+
+from modules.parser.v1.file_parsers import PDFParser  # noqa: E402
+from modules.parser.v1.schemas import ParserJob, ParserMods, ParserParams  # noqa: E402
+from modules.parser.v1.worker import parse_job  # noqa: E402
+
+ROUNDS = 200
+
+
+def _noop(fn, *args):
+    return None
+
+
+def measure(name: str, executor: ProcessPoolExecutor, payload: tuple):
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+    pickle_us = (time.perf_counter() - started) / ROUNDS * 1e6
+
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        executor.submit(_noop, *payload).result()
+    submit_us = (time.perf_counter() - started) / ROUNDS * 1e6
+
+    print(f"{name:<28} {len(data):>10} B {pickle_us:>12.1f} us {submit_us:>12.1f} us")
+
+
+def main():
+    file_path = Path(sys.argv[1]) if len(sys.argv) > 1 else ROOT / "document.pdf"
+    parser_params = ParserParams(file_path=file_path)
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        executor.submit(_noop, None).result()
+        print(f"{'payload':<28} {'pickled':>12} {'pickle':>15} {'submit+wait':>15}")
+        measure("bound parser.parse (before)", executor, (PDFParser(parser_params).parse, ParserMods.TO_TEXT))
+        measure("parse_job + ParserJob", executor, (parse_job, ParserJob(parser_params=parser_params, mode=ParserMods.TO_TEXT)))
+
+
+if __name__ == "__main__":
+    main()
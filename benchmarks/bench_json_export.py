@@ -0,0 +1,69 @@
+"""JSON `DoclingDocument`: `save_as_json` против `document_json`.
+
+Документы строятся Docling из синтетических выгрузок почты и вики
+(см. `bench_html_stream.py`) размером около 0.1 и 1 МБ или из переданных
+файлов любого поддерживаемого формата. Для каждого документа печатаются время
+и размер `save_as_json`, `document_json` целиком и без сеток таблиц
+(`table_grids`), а также размер последнего варианта в gzip.
+
+    python benchmarks/bench_json_export.py [file ...]
+"""
+import gzip
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+os.environ.setdefault("ENV_FILE", str(ROOT / ".env.production"))
+
+from bench_word_export import build_corpus  # noqa: E402
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - started, result
+
+
+def save_as_json(doc, tmp_dir: Path) -> bytes:
+    path = tmp_dir / "doc.json"
+    doc.save_as_json(path, indent=None)
+    data = path.read_bytes()
+    os.remove(path)
+    return data
+
+
+def main():
+    from settings import settings
+    from modules.parser.v1.abc.factory import ParserFactory
+    from modules.parser.v1.exporters import document_json
+    from modules.parser.v1.schemas import JsonHeavyField, ParserMods, ParserParams
+
+    settings.HTML_STREAM_ENABLED = False
+    print(
+        f"{'file':<20} {'size':>8} {'save_as_json':>18} {'document_json':>18} "
+        f"{'no table_grids':>18} {'gzip':>8}"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = [Path(arg) for arg in sys.argv[1:]] or build_corpus(Path(tmp_dir))
+        for path in paths:
+            doc = ParserFactory(ParserParams(file_path=str(path))).get_parser().parse(ParserMods.TO_DOCLING)
+            old_time, old_data = timed(save_as_json, doc, Path(tmp_dir))
+            new_time, new_data = timed(document_json, doc)
+            lean_time, lean_data = timed(document_json, doc, [JsonHeavyField.TABLE_GRIDS])
+            compressed = gzip.compress(lean_data, compresslevel=6)
+            print(
+                f"{path.name[:20]:<20} {path.stat().st_size / 1024 ** 2:>6.1f}MB "
+                f"{old_time:>7.2f}s {len(old_data) / 1024 ** 2:>7.1f}MB "
+                f"{new_time:>7.2f}s {len(new_data) / 1024 ** 2:>7.1f}MB "
+                f"{lean_time:>7.2f}s {len(lean_data) / 1024 ** 2:>7.1f}MB "
+                f"{len(compressed) / 1024 ** 2:>6.1f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
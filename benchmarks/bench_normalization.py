@@ -0,0 +1,157 @@
+"""Нормализация текста: прежняя цепочка `clean_text`/`to_utf8`/`normalize_unicode` против `normalization`.
+
+Сначала сверяет результат на эталонном наборе строк (mojibake, HTML-сущности,
+`/uniXXXX`, невидимые пробелы, лигатуры, полноширинные символы, разложенные
+символы, случайные строки) для всех трёх цепочек, которые используют парсеры,
+и завершается с ошибкой при любом расхождении. Затем измеряет время на
+таблице из 100 000 ячеек.
+
+    python benchmarks/bench_normalization.py [cells]
+"""
+import os
+import random
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+os.environ.setdefault("ENV_FILE", str(ROOT / ".env.production"))
+
+import ftfy  # noqa: E402
+
+from modules.parser.v1.normalization import normalize_text, normalize_texts  # noqa: E402
+
+
+def legacy_clean_text(text: str):
+    def replace_uni(match):
+        try:
+            return chr(int(match.group(1), 16))
+        except ValueError:
+            return match.group(0)
+
+    text = re.sub(r'/uni([0-9A-Fa-f]{4})', replace_uni, text)
+    invisible_spaces = [
+        '\u00A0', '\u1680', '\u2000', '\u2001', '\u2002', '\u2003', '\u2004', '\u2005',
+        '\u2006', '\u2007', '\u2008', '\u2009', '\u200A', '\u202F', '\u205F', '\u3000',
+        '\u00AD', '\u2060', '\uFEFF', '\u200B', '\u200C', '\u200D', '\u0009',
+    ]
+    text = text.replace('\ufffd', '.')
+    for sp in invisible_spaces:
+        text = text.replace(sp, ' ')
+    return text
+
+
+def legacy_normalize_unicode(text: str) -> str:
+    if not text:
+        return text
+    return unicodedata.normalize("NFC", text)
+
+
+# Цепочки из парсеров: (название, прежняя реализация, параметры `normalize_text`).
+CHAINS = [
+    ("text", lambda text: ftfy.fix_text(legacy_clean_text(text)), {}),
+    ("docx text", lambda text: ftfy.fix_text(legacy_clean_text(legacy_normalize_unicode(text))), {"nfc": True}),
+    ("docx cell", legacy_clean_text, {"fix": False}),
+]
+
+GOLDEN = [
+    "",
+    "Plain ASCII line",
+    "Договор поставки № 17/2024 от 01.02.2024",
+    "Сумма:\u00a0100\u202f000 руб.",
+    "/uni0041/uni0431/uniFFFD/uniZZZZ",
+    "Ð¿Ñ€Ð¸Ð²ÐµÑ‚ Ð¼Ð¸Ñ€",
+    "âœ” No problems",
+    "Broken text&hellip; it&#x2019;s ﬂubberiﬁc!",
+    "a &lt; b &amp;&amp; <b>c</b> &gt; d",
+    "\uff2c\uff2f\uff35\uff24\u3000\uff2e\uff2f\uff29\uff33\uff25\uff33",
+    "“кавычки” и ‘ещё’ «ёлочки»",
+    "йой, é, Ё",
+    "line one\r\nline two\rline three\u2028four\x85five",
+    "tab\tseparated\tvalues",
+    "control\x00\x07\x1b[31mred\x1b[0m\x7f",
+    "zero\u200bwidth\u200cjoin\u200dword\u2060\ufeff",
+    "soft\u00adhyphen",
+    "replacement \ufffd char",
+    "C1 \x80\x93\x9f controls",
+    "surrogate \ud83d alone",
+    "emoji 👍🏽 and flags 🏴\U000e0067\U000e0062\U000e0077\U000e006c\U000e0073\U000e007f",
+    "Ĳssel ǅemal ﬀ ﬃ",
+    "mixed Latin-1: cafÃ© crÃ¨me brÃ»lÃ©e",
+    "Windows-1252 in Latin-1: \x93quoted\x94",
+    "中文 日本語 한국어 العربية עברית",
+    "x\n" * 3,
+]
+
+FUZZ_ALPHABET = (
+    "abcXYZ019 .,;:-_/\\&<>\"'\n\r\t"
+    "абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВЁЙ"
+    "\u00a0\u00ad\u200b\u200d\u2009\u3000\ufeff\ufffd\u0301\u0306\u0308"
+    "ÃÐÑâ€™œ\x80\x85\x93\x9f\ufb01\ufb02\uff21\uff11\u2018\u2019\u201c\u201d\u02bc\x1b\x00\x7f"
+)
+
+
+def fuzz_strings(count: int, seed: int = 17) -> list[str]:
+    rng = random.Random(seed)
+    strings = []
+    for _ in range(count):
+        length = rng.randint(0, 40)
+        text = "".join(rng.choice(FUZZ_ALPHABET) for _ in range(length))
+        if rng.random() < 0.2:
+            text += f"/uni{rng.randint(0, 0xFFFF):04X}"
+        strings.append(text)
+    return strings
+
+
+def check_golden() -> int:
+    mismatches = 0
+    corpus = GOLDEN + fuzz_strings(20000)
+    for name, legacy, options in CHAINS:
+        for text in corpus:
+            expected = legacy(text)
+            actual = normalize_text(text, **options)
+            if expected != actual:
+                mismatches += 1
+                print(f"MISMATCH [{name}] {text!r}: expected {expected!r}, got {actual!r}")
+    print(f"golden: {len(corpus)} strings x {len(CHAINS)} chains, {mismatches} mismatches")
+    return mismatches
+
+
+def spreadsheet_cells(count: int, seed: int = 3) -> list[str]:
+    rng = random.Random(seed)
+    words = ["Итого", "ООО «Ромашка»", "Поставка", "Invoice", "n/a", "шт.", "руб.", "Москва", "Total", "—"]
+    cells = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.4:
+            cells.append(f"{rng.randint(0, 10 ** 6)}")
+        elif kind < 0.6:
+            cells.append(f"{rng.randint(0, 10 ** 5)},{rng.randint(0, 99):02d}\u00a0руб.")
+        else:
+            cells.append(" ".join(rng.choice(words) for _ in range(rng.randint(1, 4))))
+    return cells
+
+
+def main():
+    if check_golden():
+        sys.exit(1)
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    cells = spreadsheet_cells(count)
+
+    started = time.perf_counter()
+    expected = [ftfy.fix_text(legacy_clean_text(cell)) for cell in cells]
+    legacy_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = normalize_texts(cells)
+    engine_s = time.perf_counter() - started
+
+    assert expected == actual
+    print(f"{count} cells: legacy {legacy_s:.3f}s, normalization {engine_s:.3f}s ({legacy_s / engine_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
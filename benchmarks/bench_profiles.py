@@ -0,0 +1,58 @@
+"""Время и пиковая память разбора одного файла по профилям `fast` / `balanced` / `accurate`.
+
+Каждый профиль запускается в отдельном процессе, чтобы пиковый RSS не
+смешивался между профилями. Первый разбор строит конвертер и загружает модели
+из `ML_DIR`, поэтому время считается по последующим прогонам. `DocumentCache`
+не участвует: парсер вызывается напрямую.
+
+    python benchmarks/bench_profiles.py path/to/file.pdf [rounds] [--images]
+
+`--images` включает `include_image_in_output`, то есть рендеринг картинок.
+"""
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+os.environ.setdefault("ENV_FILE", str(ROOT / ".env.production"))
+
+
+def run_profile(file_path: str, profile: str, rounds: int, images: bool, results):
+    from modules.parser.v1.abc.factory import ParserFactory
+    from modules.parser.v1.schemas import ParseProfile, ParserMods, ParserParams
+
+    params = ParserParams(file_path=file_path, profile=ParseProfile(profile), include_image_in_output=images)
+    ParserFactory(params).get_parser().parse(ParserMods.TO_TEXT)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        ParserFactory(params).get_parser().parse(ParserMods.TO_TEXT)
+    per_file = (time.perf_counter() - started) / rounds
+    results.put((profile, per_file, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    file_path = args[0]
+    rounds = int(args[1]) if len(args) > 1 else 3
+    images = "--images" in sys.argv
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    print(f"{'profile':<10} {'per file':>10} {'peak RSS':>12}")
+    for profile in ("fast", "balanced", "accurate"):
+        process = context.Process(target=run_profile, args=(file_path, profile, rounds, images, results))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            print(f"{profile:<10} failed (exit code {process.exitcode})")
+            continue
+        name, per_file, peak_mb = results.get()
+        print(f"{name:<10} {per_file:>9.2f}s {peak_mb:>9.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
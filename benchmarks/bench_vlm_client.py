@@ -0,0 +1,161 @@
+"""Накладные расходы на одно изображение: Docling `VlmPipeline` против `VLMClient`.
+
+Поднимает локальный заглушечный OpenAI-совместимый сервер, который сразу
+отвечает фиксированным Markdown, поэтому измеряется только работа сервиса:
+сборка конвертера, кодирование изображения, HTTP и сборка `DoclingDocument`.
+Асинхронный `VLMClient.arecognize` измеряется отдельно (подготовка изображения
+через `prepare_image` и запрос, без `ImageParser` и кэша OCR), и
+для него проверяется, что недоступный сервер даёт `ServiceUnavailable`, а
+медленный — `TimeoutError`.
+
+    python benchmarks/bench_vlm_client.py [path/to/image.png] [rounds]
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+os.environ.setdefault("ENV_FILE", str(ROOT / ".env.production"))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from settings import settings  # noqa: E402
+from modules.parser.v1.file_parsers import ImageParser  # noqa: E402
+from modules.parser.v1.exceptions import ServiceUnavailable, TimeoutError  # noqa: E402
+from modules.parser.v1.preprocessing import prepare_image  # noqa: E402
+from modules.parser.v1.schemas import ParserMods  # noqa: E402
+from modules.parser.v1.vlm import VLMClient  # noqa: E402
+
+RESPONSE = {
+    "id": "stub",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "stub",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": "# Счёт\n\n| Позиция | Сумма |\n|---|---|\n| Услуги | 100 |\n"},
+            "finish_reason": "stop",
+        }
+    ],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}
+
+
+class StubVLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = set()
+    delay = 0.0
+
+    def do_POST(self):
+        StubVLMHandler.connections.add(self.client_address)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(StubVLMHandler.delay)
+        body = json.dumps(RESPONSE).encode("utf-8")
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Клиент уже отключился по таймауту (проверка `TimeoutError`).
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+def sample_image() -> Image.Image:
+    image = Image.new("RGB", (1240, 1754), "white")
+    draw = ImageDraw.Draw(image)
+    for line in range(60):
+        draw.text((80, 80 + line * 26), f"Строка {line}: lorem ipsum dolor sit amet {line * 17}", fill="black")
+    return image
+
+
+def measure(name: str, image, base_url: str, rounds: int):
+    StubVLMHandler.connections.clear()
+    ImageParser(image, vlm_base_url=base_url, vlm_model_name="stub").parse(ParserMods.TO_TEXT)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        ImageParser(image, vlm_base_url=base_url, vlm_model_name="stub").parse(ParserMods.TO_TEXT)
+    per_image_ms = (time.perf_counter() - started) / rounds * 1000
+    print(f"{name:<24} {per_image_ms:>10.2f} ms {len(StubVLMHandler.connections):>12}")
+
+
+async def measure_async(image, base_url: str, rounds: int):
+    client = VLMClient(base_url, "stub", None)
+    StubVLMHandler.connections.clear()
+
+    async def recognize():
+        prepared = prepare_image(image)
+        await client.arecognize(prepared.image_bytes, prepared.mime_type, "OCR")
+
+    await recognize()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await recognize()
+    per_image_ms = (time.perf_counter() - started) / rounds * 1000
+    await client.aclose()
+    print(f"{'VLMClient.arecognize':<24} {per_image_ms:>10.2f} ms {len(StubVLMHandler.connections):>12}")
+
+
+async def check_async_errors(base_url: str, unused_url: str) -> bool:
+    failures = []
+    client = VLMClient(unused_url, "stub", None)
+    try:
+        await client.arecognize(b"", "image/png", "OCR")
+        failures.append("unreachable server: no error")
+    except ServiceUnavailable:
+        pass
+    await client.aclose()
+
+    StubVLMHandler.delay = 0.5
+    client = VLMClient(base_url, "stub", None, timeout=0.1)
+    try:
+        await client.arecognize(b"", "image/png", "OCR")
+        failures.append("slow server: no error")
+    except TimeoutError:
+        pass
+    finally:
+        StubVLMHandler.delay = 0.0
+    await client.aclose()
+    for failure in failures:
+        print(f"  async error mapping: {failure}")
+    return not failures
+
+
+def main():
+    image = Image.open(sys.argv[1]) if len(sys.argv) > 1 else sample_image()
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubVLMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    # Иначе повторы одного изображения отвечаются из кэша OCR без запроса к VLM.
+    settings.OCR_CACHE_ENABLED = False
+    print(f"{'path':<24} {'per image':>13} {'connections':>12}")
+    settings.VLM_DIRECT_CLIENT = False
+    measure("docling VlmPipeline", image, base_url, rounds)
+    settings.VLM_DIRECT_CLIENT = True
+    measure("VLMClient", image, base_url, rounds)
+    asyncio.run(measure_async(image, base_url, rounds))
+
+    unused = ThreadingHTTPServer(("127.0.0.1", 0), StubVLMHandler)
+    unused_url = f"http://127.0.0.1:{unused.server_port}"
+    unused.server_close()
+    errors_mapped = asyncio.run(check_async_errors(base_url, unused_url))
+    server.shutdown()
+    sys.exit(0 if errors_mapped else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Экспорт в Word: собственный писатель `.docx` против Markdown и pandoc.
+
+Документы строятся Docling из синтетических выгрузок почты и вики
+(см. `bench_html_stream.py`) размером около 0.1 и 1 МБ или из переданных
+файлов любого поддерживаемого формата. Для каждого документа печатается время
+`export_to_word` с `WORD_EXPORT_ENGINE=native` и `pandoc`; если pandoc не
+установлен, вместо него замеряется только его подготовка (копия документа с
+картинками во временном каталоге и выгрузка Markdown).
+
+    python benchmarks/bench_word_export.py [file ...]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+os.environ.setdefault("ENV_FILE", str(ROOT / ".env.production"))
+
+from bench_html_stream import email_message, wiki_section  # noqa: E402
+
+SIZES_MB = (0.1, 1)
+PAGE_BREAK = "<!-- page break -->"
+
+
+def build_corpus(tmp_dir: Path) -> list[Path]:
+    paths = []
+    for name, block in (("email", email_message), ("wiki", wiki_section)):
+        for size_mb in SIZES_MB:
+            path = tmp_dir / f"{name}_{size_mb}mb.html"
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(f"<html><head><meta charset=\"utf-8\"><title>{name}</title></head><body>\n")
+                index = 0
+                while file.tell() < size_mb * 1024 ** 2:
+                    file.write(block(index))
+                    index += 1
+                file.write("</body></html>\n")
+            paths.append(path)
+    return paths
+
+
+def pandoc_preparation(doc, image_mode):
+    """Часть прежнего пути до запуска pandoc."""
+    artifacts_dir = Path(tempfile.mkdtemp(prefix="artifacts_"))
+    try:
+        doc_with_refs = doc._make_copy_with_refmode(
+            reference_path=artifacts_dir,
+            artifacts_dir=artifacts_dir,
+            image_mode=image_mode,
+            page_no=None,
+        )
+        doc_with_refs.export_to_markdown(image_mode=image_mode, page_break_placeholder=PAGE_BREAK)
+    finally:
+        shutil.rmtree(artifacts_dir, ignore_errors=True)
+
+
+def timed(function, *args) -> float:
+    started = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - started
+    if isinstance(result, str) and result.endswith(".docx"):
+        os.remove(result)
+    return elapsed
+
+
+def main():
+    from docling_core.types.doc import ImageRefMode
+
+    from settings import settings
+    from modules.parser.v1.abc.factory import ParserFactory
+    from modules.parser.v1.docx_writer import export_to_word
+    from modules.parser.v1.schemas import ParserMods, ParserParams
+
+    settings.HTML_STREAM_ENABLED = False
+    has_pandoc = shutil.which("pandoc") is not None
+    image_mode = ImageRefMode.EMBEDDED
+    print(f"{'file':<20} {'size':>8} {'native':>9} {'pandoc' if has_pandoc else 'md only':>9} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = [Path(arg) for arg in sys.argv[1:]] or build_corpus(Path(tmp_dir))
+        for path in paths:
+            parser = ParserFactory(ParserParams(file_path=str(path))).get_parser()
+            doc = parser.parse(ParserMods.TO_DOCLING)
+            settings.WORD_EXPORT_ENGINE = "native"
+            native_time = timed(export_to_word, doc, image_mode, PAGE_BREAK)
+            if has_pandoc:
+                settings.WORD_EXPORT_ENGINE = "pandoc"
+                old_time = timed(export_to_word, doc, image_mode, PAGE_BREAK)
+            else:
+                old_time = timed(pandoc_preparation, doc, image_mode)
+            print(
+                f"{path.name[:20]:<20} {path.stat().st_size / 1024 ** 2:>6.1f}MB "
+                f"{native_time:>8.2f}s {old_time:>8.2f}s {old_time / native_time:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""XLSX в Markdown: Docling против потокового пути `xlsx_stream` на синтетических книгах.
+
+Для книг на 10 тыс., 100 тыс. и 1 млн ячеек (10 столбцов: текст, числа,
+даты) каждый путь запускается в отдельном процессе; печатаются время и пиковый
+RSS. Таблицы из обоих ответов сравниваются по ячейкам (числа — с точностью
+форматирования `tabulate`), при расхождении скрипт завершается с ошибкой.
+Так же проверяется книга 4×4 с неверным `<dimension ref="A1"/>`: потоковый
+путь не должен терять ячейки за его пределами.
+
+    python benchmarks/bench_xlsx_stream.py [cells ...]
+"""
+import datetime
+import math
+import multiprocessing
+import os
+import re
+import resource
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+os.environ.setdefault("ENV_FILE", str(ROOT / ".env.production"))
+
+from openpyxl import Workbook  # noqa: E402
+
+COLUMNS = 10
+
+
+def build_workbook(path: Path, cells: int):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Данные")
+    sheet.append([f"Столбец {column}" for column in range(COLUMNS)])
+    start = datetime.datetime(2024, 1, 1)
+    for row in range(cells // COLUMNS - 1):
+        sheet.append([
+            f"Контрагент {row % 997}",
+            f"Договор № {row}",
+            row,
+            row * 1.25,
+            start + datetime.timedelta(days=row % 365),
+            "Оплачено" if row % 3 else "Ожидает | оплаты",
+            row % 7,
+            f"ИНН {7700000000 + row}",
+            None if row % 5 == 0 else "комментарий",
+            round(row / 3, 2),
+        ])
+    workbook.save(path)
+
+
+def build_wrong_dimension_workbook(path: Path):
+    """Книга 4×4, в XML листа которой `<dimension>` указывает на одну ячейку A1."""
+    workbook = Workbook()
+    for row in range(1, 5):
+        workbook.active.append([f"c{row}{column}" for column in range(1, 5)])
+    workbook.save(path)
+    with zipfile.ZipFile(path) as archive:
+        parts = {name: archive.read(name) for name in archive.namelist()}
+    parts["xl/worksheets/sheet1.xml"] = re.sub(
+        rb'<dimension ref="[^"]*"/>', b'<dimension ref="A1"/>', parts["xl/worksheets/sheet1.xml"]
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in parts.items():
+            archive.writestr(name, data)
+
+
+def run_path(file_path: str, streaming: bool, results):
+    from settings import settings
+    from modules.parser.v1.file_parsers import XLSXParser
+    from modules.parser.v1.schemas import ParserMods, ParserParams
+
+    settings.XLSX_STREAM_ENABLED = streaming
+    settings.XLSX_STREAM_MIN_BYTES = 0
+    started = time.perf_counter()
+    markdown = XLSXParser(ParserParams(file_path=file_path)).parse(ParserMods.TO_TEXT)
+    elapsed = time.perf_counter() - started
+    results.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, markdown))
+
+
+def table_rows(markdown: str) -> list[list[str]]:
+    rows = []
+    for line in markdown.splitlines():
+        if not line.startswith("|") or set(line) <= set("|-: "):
+            continue
+        rows.append([cell.strip() for cell in line.strip()[1:-1].split("|")])
+    return rows
+
+
+def same_cell(left: str, right: str) -> bool:
+    if left == right:
+        return True
+    try:
+        return math.isclose(float(left), float(right), rel_tol=1e-5)
+    except ValueError:
+        return False
+
+
+def compare(docling_markdown: str, stream_markdown: str) -> int:
+    docling_rows, stream_rows = table_rows(docling_markdown), table_rows(stream_markdown)
+    if len(docling_rows) != len(stream_rows):
+        print(f"  row count differs: {len(docling_rows)} vs {len(stream_rows)}")
+        return 1
+    mismatches = 0
+    for index, (left, right) in enumerate(zip(docling_rows, stream_rows)):
+        if len(left) != len(right) or not all(same_cell(a, b) for a, b in zip(left, right)):
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"  row {index}: {left} != {right}")
+    return mismatches
+
+
+def measure(context, file_path: str, streaming: bool):
+    results = context.Queue()
+    process = context.Process(target=run_path, args=(file_path, streaming, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    context = multiprocessing.get_context("spawn")
+    failed = False
+    print(f"{'cells':>10} {'file':>9} {'docling':>10} {'RSS':>8} {'stream':>10} {'RSS':>8} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "wrong_dimension.xlsx"
+        build_wrong_dimension_workbook(path)
+        _, _, stream_markdown = measure(context, str(path), streaming=True)
+        cells = sum(len(row) for row in table_rows(stream_markdown))
+        print(f"wrong <dimension>: {cells} of 16 cells streamed")
+        if cells != 16 or compare(measure(context, str(path), streaming=False)[2], stream_markdown):
+            failed = True
+        for cells in sizes:
+            path = Path(tmp_dir) / f"synthetic_{cells}.xlsx"
+            build_workbook(path, cells)
+            docling_time, docling_rss, docling_markdown = measure(context, str(path), streaming=False)
+            stream_time, stream_rss, stream_markdown = measure(context, str(path), streaming=True)
+            print(
+                f"{cells:>10} {path.stat().st_size / 1024 ** 2:>7.1f}MB "
+                f"{docling_time:>9.2f}s {docling_rss:>6.0f}MB {stream_time:>9.2f}s {stream_rss:>6.0f}MB "
+                f"{docling_time / stream_time:>7.1f}x"
+            )
+            if compare(docling_markdown, stream_markdown):
+                failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()